@@ -39,9 +39,26 @@ class ConversationConfig(KebabBaseModel):
     group_open_status: str | None = None
     group_close_status: str | None = None
     item_selector: str # 单个对话项的选择器
+    item_id_attribute: str | None = Field("href", description="对话项(或其内部元素)上标识对话的属性, 用于区分同名对话")
+    content_selector: str | None = None # 对话内容容器选择器, 用于计算内容签名判断对话是否有更新
+
+
+class ApiExportConfig(KebabBaseModel):
+    list_endpoint: str # 分页获取对话列表的接口, 支持 {page} 占位符
+    detail_endpoint: str # 获取单个对话完整内容的接口, 支持 {chat_id} 占位符
+    data_key: str = Field("data", description="接口响应中数据所在的字段")
+    id_key: str = Field("id", description="对话 ID 字段")
+    title_key: str = Field("title", description="对话标题字段")
+    updated_key: str | None = Field("updated_at", description="对话更新时间字段, 用于增量导出判断")
+    token_storage_key: str | None = Field(None, description="localStorage 中保存访问 token 的键, 留空则只依赖 cookie")
+    start_page: int = Field(1, description="列表接口起始页码")
+    max_pages: int = Field(1000, description="最多拉取的列表页数")
+    concurrency: int = Field(8, ge=1, description="并发请求对话详情的数量")
 
 
 class ExportConfig(KebabBaseModel):
+    mode: str = Field("ui", description="导出方式: ui 逐个点击菜单导出 / api 复用登录态直接请求接口批量导出")
+    api: ApiExportConfig | None = None # api 导出方式的接口配置
 
     trigger_button_selector: str # 触发导出菜单的按钮选择器
     trigger_mode: str = Field("hover", description="触发菜单的触发方式")
@@ -56,6 +73,16 @@ class ExportConfig(KebabBaseModel):
         description="用于识别‘导出为 JSON’子菜单项的关键词（若无子菜单可为空）"
     )
     timeout: int = Field(10000, description="等待导出选项出现超时时间（毫秒）")
+    concurrency: int = Field(1, ge=1, description="并发导出的工作页面数（1 为逐个串行导出）")
+    incremental: bool = Field(False, description="是否开启增量导出（跳过导出清单中未变化的对话）")
+
+
+class BrowserConfig(KebabBaseModel):
+    headless: bool | None = Field(None, description="是否无头运行, 留空则在已有登录状态时自动无头运行")
+    block_resource_types: List[str] = Field(
+        ["image", "font", "media"],
+        description="拦截的资源类型(Playwright resource_type), 减少带宽和内存占用"
+    )
 
 
 class CrawlerConfig(KebabBaseModel):
@@ -64,6 +91,7 @@ class CrawlerConfig(KebabBaseModel):
     login: LoginConfig = Field(default_factory=LoginConfig)
     conversation: ConversationConfig = Field(default_factory=ConversationConfig)
     export: ExportConfig = Field(default_factory=ExportConfig)
+    browser: BrowserConfig = Field(default_factory=BrowserConfig)
     download_dir: Optional[str] = Field("", description="程序控制的下载目录（留空则使用浏览器默认）")
 
 
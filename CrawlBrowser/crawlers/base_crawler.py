@@ -1,18 +1,39 @@
-import json
 import asyncio
-from typing import Dict, List
+import re
+import time
+from typing import Awaitable, Callable, Dict, List
 import logging
 from pathlib import Path
+from urllib.parse import urljoin
 from abc import ABC, abstractmethod
 from playwright.async_api import async_playwright, Page, Download, Playwright, TimeoutError, BrowserContext, Browser, \
-    ElementHandle
+    ElementHandle, Route
+
+try:
+    import psutil
+except ImportError:  # 可选依赖, 未安装时不输出浏览器内存
+    psutil = None
 
 from CrawlBrowser.config.crawler_config import load_config_from_yaml
+from CrawlBrowser.crawlers.export_manifest import ExportManifest
+from utils import json_codec
 
 logging.basicConfig(level=logging.INFO,
                     format="%(asctime)s %(levelname)s-%(threadName)s: %(message)s",
                     datefmt="%Y-%m-%d %H:%M:%S")
 
+# 文件名中不允许出现的字符(路径分隔符、Windows 保留字符、控制字符)
+_INVALID_FILENAME_CHARS = re.compile(r'[\\/:*?"<>|\x00-\x1f]+')
+
+
+# 地址已切换到点击的对话但文本与点击前相同时, 文本保持稳定这么久(秒)才视为加载完成(两个对话内容恰好相同)
+_SAME_CONTENT_SETTLE = 1.0
+
+
+def safe_filename(name: str) -> str:
+    """把对话标题等文本清理成可用的文件名片段"""
+    return _INVALID_FILENAME_CHARS.sub("-", name).strip(" .-")
+
 class ExportCrawler(ABC):
     def __init__(self, platform_config_path: str | Path):
         if isinstance(platform_config_path, Path):
@@ -32,20 +53,127 @@ class ExportCrawler(ABC):
             self.download_dir.mkdir(exist_ok=True)
         else:
             self.download_dir = base_dir / "downloads"/ Path(platform_config_path).stem
+        # 导出清单(增量导出)
+        self.manifest = None
+        if self.config.export.incremental:
+            self.manifest = ExportManifest(
+                base_dir / "manifests" / f"{Path(platform_config_path).stem}_manifest.json",
+                self.platform_name
+            )
+            if self.config.export.mode == "ui" and not self.config.conversation.content_selector:
+                logging.warning("增量导出未配置 content-selector, 无法判断对话是否更新, 每个对话都会重新导出")
 
         self._chat_groups = None # 对话分组
+        # 每导出一个文件后的回调(例如把文件交给下游解析流水线)
+        self.on_exported: Callable[[Path], Awaitable[None]] | None = None
+        # 判断文件是否已在本次爬取中导出(断点续爬时由流水线根据检查点提供)
+        self.is_exported: Callable[[Path], bool] | None = None
+        # 常驻浏览器, 多次导出调用之间复用
+        self._playwright: Playwright | None = None
+        self._browser: Browser | None = None
+        self._headless = False
+        self._blocked_resource_types = set(self.config.browser.block_resource_types)
 
+    async def __aenter__(self):
+        await self.start()
+        return self
 
-    async def check_auth_valid(self, browser: Browser):
-        """检查认证是否过期"""
-        # 加载认证状态
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+    async def start(self, headless: bool | None = None) -> Browser:
+        """
+        启动(或复用)常驻浏览器
+        未显式配置 headless 时: 已有登录状态则无头运行, 否则有头运行以便手动登录
+        :param headless: 覆盖配置中的 headless(重新有头启动以便手动登录时使用)
+        """
+        if self._browser is not None and self._browser.is_connected():
+            return self._browser
+        if self._playwright is None:
+            self._playwright = await async_playwright().start()
+        if headless is None:
+            headless = self.config.browser.headless
+        if headless is None:
+            headless = self.auth_state_path.exists()
+        self._headless = headless
+        self._browser = await self._playwright.chromium.launch(headless=headless)
+        logging.info(f"已启动浏览器 (headless={headless}, 屏蔽资源类型: {sorted(self._blocked_resource_types)})")
+        return self._browser
+
+    async def close(self):
+        """关闭常驻浏览器"""
+        if self._browser is not None:
+            await self._browser.close()
+            self._browser = None
+        if self._playwright is not None:
+            await self._playwright.stop()
+            self._playwright = None
+
+    async def _block_heavy_resources(self, route: Route):
+        """拦截图片、字体等与导出无关的重资源请求"""
+        if route.request.resource_type in self._blocked_resource_types:
+            await route.abort()
+        else:
+            await route.continue_()
+
+    async def new_context(self, browser: Browser) -> BrowserContext:
+        """创建带登录状态(若存在)和资源拦截的浏览器上下文"""
         if self.auth_state_path.exists():
             logging.info(f"尝试用认证状态: {self.auth_state_path} 进行登录...")
             context = await browser.new_context(storage_state=str(self.auth_state_path),
                                                 accept_downloads=True)
         else:
             context = await browser.new_context(accept_downloads=True)
+        if self._blocked_resource_types:
+            await context.route("**/*", self._block_heavy_resources)
+        return context
+
+    async def report_metrics(self, page: Page, stage: str, load_started: float | None = None):
+        """
+        输出页面加载耗时、页面 JS 堆内存和浏览器进程树 RSS, 便于对比不同浏览器配置的开销
+        :param page:
+        :param stage: 阶段名称
+        :param load_started: 页面开始加载的时间(time.perf_counter), 为空时不输出加载耗时
+        """
+        metrics = [stage]
+        if load_started is not None:
+            metrics.append(f"页面加载耗时 {(time.perf_counter() - load_started) * 1000:.0f} ms")
+        try:
+            js_heap = await page.evaluate("() => performance.memory ? performance.memory.usedJSHeapSize : null")
+            if js_heap:
+                metrics.append(f"页面 JS 堆 {js_heap / 1024 / 1024:.1f} MB")
+        except Exception:
+            # 页面已关闭等情况下忽略
+            pass
+        browser_rss = self._browser_rss()
+        if browser_rss is not None:
+            metrics.append(f"浏览器进程树 RSS {browser_rss / 1024 / 1024:.1f} MB")
+        logging.info(", ".join(metrics))
+
+    @staticmethod
+    def _browser_rss() -> int | None:
+        """
+        统计浏览器进程树的当前 RSS 总和(字节)
+        Playwright 驱动和 Chromium 的各个进程都是当前进程的子孙进程; 未安装 psutil 时返回 None
+        """
+        if psutil is None:
+            return None
+        total = 0
+        for child in psutil.Process().children(recursive=True):
+            try:
+                total += child.memory_info().rss
+            except (psutil.NoSuchProcess, psutil.AccessDenied):
+                continue
+        return total
+
+    async def check_auth_valid(self, browser: Browser):
+        """检查认证是否过期"""
+        # 新的上下文中分组元素需重新获取
+        self._chat_groups = None
+        # 加载认证状态
+        context = await self.new_context(browser)
         page = await context.new_page()
+        load_started = time.perf_counter()
         await page.goto(self.config.base_url)
         # 等待登录成功指示器
         indicator = self.login_config.indicator_selector
@@ -54,17 +182,36 @@ class ExportCrawler(ABC):
         try:
             await page.wait_for_selector(indicator, timeout=self.login_config.check_timeout)
             logging.info("登录成功!")
+            await self.report_metrics(page, "登录完成", load_started)
         except TimeoutError:
             logging.info("登录失败, 可能是auth状态过期, 尝试重新登录...")
+            if self._headless and self.login_config.mode == "manual" and self.config.browser.headless is None:
+                # 自动选择的无头模式无法手动登录, 重新以有头模式启动浏览器
+                context, page = await self._relaunch_headed(context)
             await self.login_and_save_state(context, page)
 
         return context, page
 
+    async def _relaunch_headed(self, context: BrowserContext):
+        """关闭无头浏览器并以有头模式重新启动, 返回新的上下文和已打开首页的页面"""
+        logging.info("登录状态已失效, 以有头模式重新启动浏览器以便手动登录...")
+        await context.close()
+        await self._browser.close()
+        self._browser = None
+        browser = await self.start(headless=False)
+        context = await self.new_context(browser)
+        page = await context.new_page()
+        await page.goto(self.config.base_url)
+        return context, page
+
 
     async def login_and_save_state(self, context: BrowserContext, page: Page):
         """登录并保存认证状态"""
         logging.info("进入登录认证环节...")
         if self.login_config.mode == "manual":
+            if self._headless:
+                # 只有显式配置 headless: true 时才会走到这里
+                raise RuntimeError("无头模式下无法手动登录, 请将 browser.headless 设为 false 或留空后重新运行")
             logging.info(f"请在浏览器中登录 {self.platform_name}...")
             # 等待登录成功指示器
             indicator = self.login_config.indicator_selector
@@ -81,8 +228,7 @@ class ExportCrawler(ABC):
             raise ValueError("未定义的登录模式")
         storage = await context.storage_state()
         self.auth_state_path.parent.mkdir(exist_ok=True)
-        with open(self.auth_state_path, "w", encoding="utf-8") as f:
-            json.dump(storage, f, ensure_ascii=False, indent=2)
+        json_codec.dump(storage, self.auth_state_path, indent=True)
         logging.info(f"认证状态已保存至 {self.auth_state_path}")
 
 
@@ -155,10 +301,16 @@ class ExportCrawler(ABC):
 
     async def export_all_conversations(self):
         """导出所有对话"""
-        async with async_playwright() as p:
-            browser = await p.chromium.launch(headless=False)
+        standalone = self._browser is None
+        context = page = None
+        try:
+            browser = await self.start()
             # 检查登录状态
             context, page = await self.check_auth_valid(browser)
+            if self.config.export.mode == "api":
+                # 复用登录态直接请求接口批量导出
+                await self.export_via_api(context, page)
+                return
 
             conversation_config = self.config.conversation
             # 导出被分组的对话记录
@@ -168,16 +320,24 @@ class ExportCrawler(ABC):
             # 导出未分组的对话记录
             await page.wait_for_selector(conversation_config.item_selector)
             items = await page.query_selector_all(conversation_config.item_selector)
-            await self.perform_export(page, items)
-            await context.close()
-            await browser.close()
+            if self.config.export.concurrency > 1:
+                await self.perform_export_concurrent(context, len(items))
+            else:
+                await self.perform_export(page, items)
+        finally:
+            self._save_manifest()
+            if context is not None:
+                await self.report_metrics(page, "导出结束")
+                await context.close()
+            if standalone:
+                await self.close()
 
     async def export_conversation(self, index: int):
         """导出单个对话（调用子类实现具体点击逻辑）"""
-        async with async_playwright() as p:
-            browser = await p.chromium.launch(
-                headless=False,
-            )
+        standalone = self._browser is None
+        context = None
+        try:
+            browser = await self.start()
             # 检查登录状态
             context, page = await self.check_auth_valid(browser)
             conversation_config = self.config.conversation
@@ -197,9 +357,108 @@ class ExportCrawler(ABC):
                 raise IndexError(f"对话索引 {index} 超出范围（共 {len(conversation_items)} 个）")
 
             await self.perform_export(page, [conversation_items[index]])
+        finally:
+            self._save_manifest()
+            if context is not None:
+                await context.close()
+            if standalone:
+                await self.close()
+
+    async def _api_headers(self, page: Page) -> Dict[str, str]:
+        """构造接口请求头, 配置了 token 存储键时从 localStorage 读取 token"""
+        api_config = self.config.export.api
+        headers = {"Accept": "application/json"}
+        if api_config.token_storage_key:
+            token = await page.evaluate("key => window.localStorage.getItem(key)", api_config.token_storage_key)
+            if token:
+                headers["Authorization"] = f"Bearer {token}"
+            else:
+                logging.warning(f"localStorage 中未找到 token: {api_config.token_storage_key}, 仅使用 cookie 请求")
+        return headers
+
+    async def _api_get(self, context: BrowserContext, endpoint: str, headers: Dict[str, str]):
+        """复用 context 的登录态请求接口, 返回响应中的数据字段"""
+        url = urljoin(self.config.base_url, endpoint)
+        response = await context.request.get(url, headers=headers, timeout=self.config.export.timeout)
+        if not response.ok:
+            raise RuntimeError(f"接口请求失败: {url} -> {response.status} {response.status_text}")
+        payload = await response.json()
+        if isinstance(payload, dict):
+            return payload.get(self.config.export.api.data_key)
+        return payload
 
-            await context.close()
-            await browser.close()
+    async def list_conversations_via_api(self, context: BrowserContext, headers: Dict[str, str]) -> List[dict]:
+        """
+        分页拉取对话列表(只含 ID、标题、更新时间等元信息)
+        :param context: 已登录的浏览器上下文
+        :param headers: 请求头
+        :return: 对话元信息列表
+        """
+        api_config = self.config.export.api
+        conversations = []
+        seen_ids = set()
+        for page_no in range(api_config.start_page, api_config.start_page + api_config.max_pages):
+            items = await self._api_get(context, api_config.list_endpoint.format(page=page_no), headers)
+            new_items = [item for item in items or [] if item.get(api_config.id_key) not in seen_ids]
+            if not new_items:
+                # 空页或接口忽略了页码(返回重复数据)时结束分页
+                break
+            seen_ids.update(item.get(api_config.id_key) for item in new_items)
+            conversations.extend(new_items)
+        logging.info(f"共获取到 {len(conversations)} 个对话")
+        return conversations
+
+    async def export_via_api(self, context: BrowserContext, page: Page) -> List[Path]:
+        """
+        接口批量导出: 复用浏览器登录态(context.request)直接请求对话 JSON,
+        每个对话只需一次 HTTP 请求, 不再逐个点击菜单和等待下载.
+        输出文件与界面导出一致(单个对话窗口列表), 可直接交给 QwenParser 解析
+        :param context: 已登录的浏览器上下文
+        :param page: 已登录的页面(用于读取 localStorage 中的 token)
+        :return: 导出的文件路径列表
+        """
+        api_config = self.config.export.api
+        if api_config is None:
+            raise ValueError("api 导出方式需要配置 export.api")
+        headers = await self._api_headers(page)
+        conversations = await self.list_conversations_via_api(context, headers)
+        self.download_dir.mkdir(parents=True, exist_ok=True)
+        semaphore = asyncio.Semaphore(api_config.concurrency)
+
+        async def export_one(meta: dict) -> Path | None:
+            title = (meta.get(api_config.title_key) or "").strip()
+            chat_id = meta.get(api_config.id_key)
+            # 以对话 ID 作为清单键和文件名后缀, 同名对话不会互相覆盖
+            safe_title = safe_filename(title)
+            safe_id = safe_filename(str(chat_id))
+            final_path = self.download_dir / (f"chat_{safe_title}_{safe_id}.json" if safe_title else f"chat_{safe_id}.json")
+            if await self._skip_exported(final_path):
+                return final_path
+            key = signature = None
+            if self.manifest is not None:
+                key = ExportManifest.make_key(str(chat_id))
+                updated = meta.get(api_config.updated_key) if api_config.updated_key else None
+                signature = None if updated is None else str(updated)
+                if self.manifest.is_unchanged(key, signature):
+                    self.manifest.touch(key)
+                    logging.info(f"⏭️ 对话未变化, 跳过: {key}")
+                    return None
+            async with semaphore:
+                try:
+                    detail = await self._api_get(context, api_config.detail_endpoint.format(chat_id=chat_id), headers)
+                except Exception as e:
+                    logging.error(f"❌ 导出对话失败: {title or chat_id} {e!r}")
+                    return None
+            json_codec.dump([detail], final_path)
+            logging.info(f"✅ 导出成功: {final_path}")
+            if self.manifest is not None:
+                self.manifest.record(key, final_path, signature)
+            if self.on_exported is not None:
+                await self.on_exported(final_path)
+            return final_path
+
+        results = await asyncio.gather(*(export_one(meta) for meta in conversations))
+        return [path for path in results if path is not None]
 
     @abstractmethod
     async def _perform_export(self, page: Page) -> Download:
@@ -218,16 +477,184 @@ class ExportCrawler(ABC):
         :return:
         """
         for chat_item in items:
-            await chat_item.click()
-            download = await self._perform_export(page)
-            title = await chat_item.text_content()
-
-            final_path = self.download_dir
-            if group_name is not None:
-                # 建立分组目录
-                final_path = self.download_dir / group_name
-                final_path.mkdir(exist_ok=True)
-            final_path = final_path / f"chat_{title.strip()}.json"
-
-            await download.save_as(final_path)
-            logging.info(f"✅ 导出成功: {final_path}")
\ No newline at end of file
+            await self._export_item(page, chat_item, group_name)
+
+    async def perform_export_concurrent(self, context: BrowserContext, total: int, group_name: str = None) -> None:
+        """
+        多页面并发导出: 在同一个已登录的 context 中开启若干工作页面(共享 storage_state),
+        通过 asyncio 队列把对话索引分发给各个页面, 各页面独立完成点击、导出与保存
+        :param context: 已登录的浏览器上下文
+        :param total: 侧边栏对话总数
+        :param group_name: 分组名
+        :return:
+        """
+        concurrency = min(self.config.export.concurrency, total)
+        if concurrency <= 0:
+            logging.info("没有需要导出的对话")
+            return
+        queue: asyncio.Queue[int] = asyncio.Queue()
+        for index in range(total):
+            queue.put_nowait(index)
+        logging.info(f"开启 {concurrency} 个工作页面并发导出 {total} 个对话")
+        results = await asyncio.gather(
+            *(self._export_worker(context, queue, group_name) for _ in range(concurrency)),
+            return_exceptions=True
+        )
+        for result in results:
+            if isinstance(result, Exception):
+                logging.error(f"工作页面异常退出: {result!r}")
+
+    async def _open_worker_page(self, context: BrowserContext) -> Page:
+        """打开一个工作页面并等待侧边栏对话加载完成"""
+        conversation_config = self.config.conversation
+        page = await context.new_page()
+        await page.goto(self.config.base_url)
+        await page.wait_for_selector(conversation_config.item_selector, state="visible",
+                                     timeout=conversation_config.load_sidebar_timeout)
+        return page
+
+    async def _export_worker(self, context: BrowserContext, queue: asyncio.Queue, group_name: str = None) -> None:
+        """
+        工作页面: 不断从队列中取出对话索引并导出, 队列为空时退出
+        单个对话导出失败只记录日志, 不影响其余对话
+        """
+        page = await self._open_worker_page(context)
+        try:
+            while True:
+                try:
+                    index = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    break
+                try:
+                    items = await page.query_selector_all(self.config.conversation.item_selector)
+                    if index >= len(items):
+                        logging.warning(f"对话索引 {index} 超出范围（共 {len(items)} 个）, 已跳过")
+                        continue
+                    await self._export_item(page, items[index], group_name)
+                except Exception as e:
+                    logging.error(f"❌ 导出第 {index} 个对话失败: {e!r}")
+                finally:
+                    queue.task_done()
+        finally:
+            await page.close()
+
+    async def _content_text(self, page: Page) -> str | None:
+        """读取当前对话内容容器的文本, 未配置内容选择器或容器不存在时返回 None"""
+        content_selector = self.config.conversation.content_selector
+        if not content_selector:
+            return None
+        content = await page.query_selector(content_selector)
+        return None if content is None else await content.inner_text()
+
+    async def _item_id(self, chat_item: ElementHandle) -> str | None:
+        """
+        读取侧边栏对话项的稳定 ID: 对话项(或其内部元素)上配置的属性, 链接只取最后一段路径
+        :param chat_item: 侧边栏对话js对象
+        :return: 对话 ID; 未配置属性或取不到时返回 None
+        """
+        attribute = self.config.conversation.item_id_attribute
+        if not attribute:
+            return None
+        value = await chat_item.get_attribute(attribute)
+        if value is None:
+            inner = await chat_item.query_selector(f"[{attribute}]")
+            value = await inner.get_attribute(attribute) if inner is not None else None
+        if not value:
+            return None
+        return value.split("?")[0].rstrip("/").rsplit("/", 1)[-1] or None
+
+    async def _conversation_signature(self, page: Page, previous: str | None = None, chat_id: str | None = None,
+                                      active: bool = False) -> str | None:
+        """
+        等待点击后的对话内容加载完成并计算签名
+        点击的对话本来就已打开时直接计算; 否则内容容器里可能仍是上一个对话的内容: 已知对话 ID 时先等待地址切换到该对话,
+        再等到文本与点击前不同且连续两次读取一致; 文本与点击前相同(两个对话内容恰好相同)时,
+        地址切换后文本保持稳定足够久才采用
+        :param page:
+        :param previous: 点击前内容容器的文本
+        :param chat_id: 点击的对话 ID(地址中包含该 ID 说明已切换到该对话)
+        :param active: 点击前该对话是否已经打开
+        :return: 内容签名; 未配置内容选择器或超时仍未加载出新内容时返回 None(视为有变化)
+        """
+        conversation_config = self.config.conversation
+        if not conversation_config.content_selector:
+            return None
+        deadline = time.monotonic() + conversation_config.load_content_timeout / 1000
+        last = since = None
+        while time.monotonic() < deadline:
+            if chat_id is None or chat_id in page.url:
+                text = await self._content_text(page)
+                if text is None:
+                    pass
+                elif active and text == previous:
+                    # 点击的对话本来就已打开, 内容不会重新加载
+                    return ExportManifest.hash_text(text)
+                elif text != last:
+                    last, since = text, time.monotonic()
+                elif text != previous or (chat_id is not None and time.monotonic() - since >= _SAME_CONTENT_SETTLE):
+                    return ExportManifest.hash_text(text)
+            await asyncio.sleep(0.25)
+        logging.info("对话内容未在超时前更新, 无法计算内容签名")
+        return None
+
+    async def _skip_exported(self, path: Path) -> bool:
+        """
+        断点续爬: 文件已在本次爬取中导出时跳过下载, 但仍交给下游(下游会跳过已处理完的文件)
+        :param path: 导出文件的保存路径
+        :return: 是否跳过
+        """
+        if self.is_exported is None or not self.is_exported(path):
+            return False
+        logging.info(f"⏭️ 本次爬取中已导出, 跳过: {path}")
+        if self.on_exported is not None:
+            await self.on_exported(path)
+        return True
+
+    def _save_manifest(self):
+        """导出清单落盘"""
+        if self.manifest is not None:
+            self.manifest.save()
+
+    async def _export_item(self, page: Page, chat_item: ElementHandle, group_name: str = None) -> Path | None:
+        """
+        点击单个对话并导出, 返回保存路径; 本次爬取中已导出时不点击直接返回该路径, 增量模式下对话未变化时跳过并返回 None
+        :param page:
+        :param chat_item: 侧边栏对话js对象
+        :param group_name: 分组名
+        :return:
+        """
+        title = await chat_item.text_content()
+        chat_id = await self._item_id(chat_item)
+        final_path = self.download_dir
+        if group_name is not None:
+            # 建立分组目录
+            final_path = self.download_dir / group_name
+            final_path.mkdir(exist_ok=True)
+        # 文件名带上对话 ID, 同名对话不会互相覆盖
+        safe_title = safe_filename(title)
+        name = "_".join(part for part in (safe_title, safe_filename(chat_id or "")) if part)
+        final_path = final_path / f"chat_{name}.json"
+        if await self._skip_exported(final_path):
+            return final_path
+
+        previous, active = None, False
+        if self.manifest is not None:
+            previous = await self._content_text(page)
+            active = chat_id is not None and chat_id in page.url
+        await chat_item.click()
+        key = signature = None
+        if self.manifest is not None:
+            key = ExportManifest.make_key(title, group_name, chat_id)
+            signature = await self._conversation_signature(page, previous, chat_id, active)
+            if self.manifest.is_unchanged(key, signature):
+                self.manifest.touch(key)
+                logging.info(f"⏭️ 对话未变化, 跳过: {key}")
+                return None
+        download = await self._perform_export(page)
+        await download.save_as(final_path)
+        logging.info(f"✅ 导出成功: {final_path}")
+        if self.manifest is not None:
+            self.manifest.record(key, final_path, signature)
+        if self.on_exported is not None:
+            await self.on_exported(final_path)
+        return final_path
@@ -1,82 +1,86 @@
 import asyncio
 import logging
-from typing import Dict
+from typing import Dict, List
 
 from .base_crawler import ExportCrawler
-from playwright.async_api import Page, Download
+from playwright.async_api import Page, Download, Locator
+
+# 在浏览器端一次性完成关键词匹配, 返回命中的菜单项下标和菜单项总数,
+# 避免逐个菜单项调用 text_content() 带来的多次往返
+_FIND_MENU_ITEM_JS = """(elements, [keywords, start]) => {
+    for (let i = start; i < elements.length; i++) {
+        const text = (elements[i].textContent || "").trim();
+        if (keywords.some(kw => text.includes(kw))) {
+            return {index: i, count: elements.length, text: text};
+        }
+    }
+    return {index: -1, count: elements.length, text: null};
+}"""
 
 
 class QwenExportCrawler(ExportCrawler):
+    async def _find_menu_item(self, items: Locator, keywords: List[str], start: int = 0) -> Dict:
+        """一次 evaluate 查找文本包含关键词的菜单项"""
+        return await items.evaluate_all(_FIND_MENU_ITEM_JS, [keywords, start])
+
     async def _perform_export(self, page: Page) -> Download:
         export_config = self.config.export
+        # 菜单操作整体共享一个截止时间, 任何一步都不会无限等待
+        deadline = asyncio.get_running_loop().time() + export_config.timeout / 1000
+
+        def remaining() -> float:
+            """距截止时间剩余的毫秒数"""
+            left = (deadline - asyncio.get_running_loop().time()) * 1000
+            if left <= 0:
+                raise TimeoutError(f"导出菜单操作超时（{export_config.timeout} 毫秒）")
+            return left
 
         # 1. 点击导出触发按钮
-        trigger_sel = export_config.trigger_button_selector
-        menu_button = await page.wait_for_selector(trigger_sel, timeout=export_config.timeout)
-        await menu_button.click()
-        print("已点击导出菜单按钮")
+        await page.locator(export_config.trigger_button_selector).first.click(timeout=remaining())
+        logging.info("已点击导出菜单按钮")
 
         # 2. 等待菜单项
-        menu_item_sel = export_config.menu_item_selector
-        await page.wait_for_selector(menu_item_sel, timeout=export_config.timeout)
-        menu_items = await page.query_selector_all(menu_item_sel)
+        menu_items = page.locator(export_config.menu_item_selector)
+        await menu_items.first.wait_for(timeout=remaining())
 
         # 3. 查找主“下载/导出”项
         main_keywords = export_config.main_export_keywords
-        main_item = None
-        for item in menu_items:
-            text = await item.text_content()
-            if text:
-                text = text.strip()
-                if any(kw in text for kw in main_keywords):
-                    main_item = item
-                    print(f"找到主菜单项: {text}")
-                    break
-        if not main_item:
+        found = await self._find_menu_item(menu_items, main_keywords)
+        if found["index"] < 0:
             raise RuntimeError(f"未找到主导出菜单项，关键词: {main_keywords}")
+        logging.info(f"找到主菜单项: {found['text']}")
+        main_item = menu_items.nth(found["index"])
+
+        json_keywords = export_config.json_export_keywords
+        if not json_keywords:
+            # 无子菜单：点击主项即下载
+            async with page.expect_download(timeout=remaining()) as download_info:
+                await main_item.click(timeout=remaining())
+            return await download_info.value
 
         # 4. 是否 hover 触发子菜单？
         if export_config.trigger_mode == "hover":
-            await main_item.hover()
+            await main_item.hover(timeout=remaining())
         else:
-            await main_item.click()
+            await main_item.click(timeout=remaining())
+
         # 等待子菜单出现
-        cnt = 0
-        sub_menu_items = None
-        while cnt < 2:
-            # 至多尝试 2 次
-            await asyncio.sleep(0.1)
-            new_menu_items = await page.query_selector_all(menu_item_sel)
-            if len(new_menu_items) > len(menu_items):
-                sub_menu_items = new_menu_items[len(menu_items):]
-                logging.info(f"已找到子菜单项 {len(sub_menu_items)} 个")
-                break
-        if not sub_menu_items:
-            raise RuntimeError("未找到子菜单项")
-        # 5. 查找“导出为 JSON”子项（如有）
-        json_keywords = export_config.json_export_keywords
-        if json_keywords:
-            json_item = None
-            for item in sub_menu_items:
-                text = await item.text_content()
-                if text:
-                    text = text.strip()
-                    if any(kw in text for kw in json_keywords):
-                        json_item = item
-                        print(f"找到 JSON 导出项: {text}")
-                        break
-            if not json_item:
-                raise RuntimeError(f"未找到 JSON 导出子菜单项，关键词: {json_keywords}")
+        if export_config.sub_menu_selector:
+            sub_menu_items = page.locator(export_config.sub_menu_selector).locator(export_config.menu_item_selector)
+            start = 0
+        else:
+            # 子菜单项与主菜单项共用选择器: 等待出现第 count+1 个菜单项
+            sub_menu_items = menu_items
+            start = found["count"]
+        await sub_menu_items.nth(start).wait_for(state="attached", timeout=remaining())
 
-            # 触发下载
-            async with page.expect_download() as download_info:
-                await json_item.click()
-            return await download_info.value
+        # 5. 查找“导出为 JSON”子项
+        json_found = await self._find_menu_item(sub_menu_items, json_keywords, start)
+        if json_found["index"] < 0:
+            raise RuntimeError(f"未找到 JSON 导出子菜单项，关键词: {json_keywords}")
+        logging.info(f"找到 JSON 导出项: {json_found['text']}")
 
-        else:
-            # 无子菜单：点击主项即下载
-            async with page.expect_download() as download_info:
-                # 如果前面已点击主项触发了下载，expect_download 会捕获它
-                # 无需额外操作，但确保上下文处于下载监听状态
-                pass
-            return await download_info.value
\ No newline at end of file
+        # 触发下载
+        async with page.expect_download(timeout=remaining()) as download_info:
+            await sub_menu_items.nth(json_found["index"]).click(timeout=remaining())
+        return await download_info.value
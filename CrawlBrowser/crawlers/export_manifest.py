@@ -0,0 +1,120 @@
+import hashlib
+import logging
+import os
+import time
+from pathlib import Path
+
+from utils import json_codec
+
+
+class ExportManifest:
+    """
+    导出清单: 持久化记录每个已导出对话的最近导出时间、内容签名和文件哈希, 用于增量导出
+    文件结构:
+    {
+        "平台名": {
+            "分组名/对话标题#对话ID": {
+                "last_seen": 1700000000.0,  # 最近一次在侧边栏中看到该对话的时间
+                "exported_at": 1700000000.0,  # 最近一次导出的时间
+                "signature": "...",  # 对话内容签名(未配置内容选择器时为 None)
+                "content_hash": "...",  # 导出文件的 sha256
+                "path": "..."  # 导出文件路径
+            }
+        }
+    }
+    """
+
+    def __init__(self, path: Path, platform: str, flush_every: int = 20):
+        """
+        :param path: 清单文件路径
+        :param platform: 平台名, 作为清单的一级键
+        :param flush_every: 每记录多少次导出自动落盘一次
+        """
+        self.path = path
+        self.platform = platform
+        self.flush_every = flush_every
+        self._data: dict[str, dict[str, dict]] = {}
+        self._pending = 0
+        self.load()
+
+    @property
+    def entries(self) -> dict[str, dict]:
+        """当前平台的所有清单条目"""
+        return self._data.setdefault(self.platform, {})
+
+    def load(self) -> None:
+        """从磁盘加载清单, 文件不存在或损坏时从空清单开始"""
+        if not self.path.exists():
+            return
+        try:
+            self._data = json_codec.load(self.path)
+            logging.info(f"已加载导出清单: {self.path} ({len(self.entries)} 条记录)")
+        except (OSError, ValueError) as e:
+            logging.warning(f"导出清单读取失败, 将重新建立: {e!r}")
+            self._data = {}
+
+    def save(self) -> None:
+        """原子写入清单(先写临时文件再替换), 避免中途崩溃导致清单损坏"""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(self.path.suffix + ".tmp")
+        json_codec.dump(self._data, tmp_path, indent=True)
+        os.replace(tmp_path, self.path)
+        self._pending = 0
+
+    @staticmethod
+    def make_key(title: str, group_name: str | None = None, chat_id: str | None = None) -> str:
+        """根据分组名、对话标题(或对话 ID)和对话 ID 生成清单键, 同名对话的键不同"""
+        key = title.strip()
+        if chat_id:
+            key = f"{key}#{chat_id}"
+        return f"{group_name.strip()}/{key}" if group_name else key
+
+    @staticmethod
+    def hash_text(text: str) -> str:
+        """计算文本签名"""
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def hash_file(path: Path) -> str:
+        """计算文件内容的 sha256"""
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+        return digest.hexdigest()
+
+    def is_unchanged(self, key: str, signature: str | None = None) -> bool:
+        """
+        判断对话自上次导出后是否未发生变化
+        - 清单中没有记录或导出文件已被删除: 视为有变化
+        - 提供了签名: 签名一致才视为未变化
+        - 未提供签名(未配置内容选择器/接口无更新时间/内容未加载出来): 无法判断, 视为有变化
+        """
+        entry = self.entries.get(key)
+        if entry is None:
+            return False
+        if not Path(entry.get("path", "")).exists():
+            return False
+        if signature is None:
+            return False
+        return entry.get("signature") == signature
+
+    def touch(self, key: str) -> None:
+        """更新对话的最近可见时间(跳过导出时调用)"""
+        entry = self.entries.get(key)
+        if entry is not None:
+            entry["last_seen"] = time.time()
+
+    def record(self, key: str, path: Path, signature: str | None = None) -> None:
+        """记录一次成功的导出, 每 flush_every 次自动落盘"""
+        now = time.time()
+        self.entries[key] = {
+            "last_seen": now,
+            "exported_at": now,
+            "signature": signature,
+            "content_hash": self.hash_file(path),
+            "path": str(path),
+        }
+        self._pending += 1
+        if self._pending >= self.flush_every:
+            self.save()
@@ -139,3 +139,48 @@ SIMPLE_WORKFLOW_USER_PROMPT_TEMPLATE = """Process the following conversation:
 
 Determine if it's valuable. If so, provide the summary, categories, and other details. If not, just indicate it's not valuable."""
 
+
+
+# Batched Filter Agent Prompts
+FILTER_BATCH_SYSTEM_PROMPT = FILTER_SYSTEM_PROMPT + """
+
+You will receive many independent Q/A records at once. Each record starts with its index in square brackets, e.g. "[3]".
+Judge every record on its own against the criteria above and return exactly one verdict per record, using the record's index."""
+
+FILTER_BATCH_USER_PROMPT_TEMPLATE = """Evaluate each of the following {count} records:
+
+{records}
+
+Return one verdict for every record index."""
+
+
+# Map-Reduce Summarizer Prompts (for conversations longer than one context window)
+SUMMARIZER_REDUCE_SYSTEM_PROMPT = """You are an expert at merging partial summaries of one long technical conversation into a single knowledge base entry.
+
+You will receive summaries of consecutive parts of the same conversation, in order.
+Merge them into one coherent summary:
+- Preserve all important technical details, code snippets, and specific solutions
+- Remove repetition between parts and keep the logical flow
+- Use clear headings and bullet points for readability"""
+
+SUMMARIZER_REDUCE_USER_PROMPT_TEMPLATE = """Merge the following {count} partial summaries of the conversation "{title}":
+
+{summaries}
+
+Provide the merged summary."""
+
+
+# Cluster Categorizer Prompts (one call per cluster of similar entries)
+CATEGORIZER_CLUSTER_SYSTEM_PROMPT = CATEGORIZER_SYSTEM_PROMPT + """
+
+You will receive several example entries that were grouped together because they cover the same topic.
+Assign categories that fit the whole group, and use the title field for a short name of the shared topic.
+Reuse an existing category name whenever one fits, so the knowledge base stays consistent."""
+
+CATEGORIZER_CLUSTER_USER_PROMPT_TEMPLATE = """Categorize the topic shared by the following {count} entries:
+
+{examples}
+
+Existing categories: {known_categories}
+
+Provide categories for the whole group, a short topic title and a filename."""
@@ -0,0 +1,198 @@
+"""
+批量过滤
+
+FILTER_* 提示词每次只评估一个对话, 而大多数问答都很短, 系统提示词占据了主要的 token 和延迟.
+本模块把多条记录按上下文预算打包进一次结构化输出请求, 模型返回逐条判定后再映射回原记录;
+批量结果缺失或请求失败的记录回退到单条过滤. 提供预过滤器时, 明显的记录在本地判定, 只有不确定的记录才请求 LLM.
+"""
+
+from collections.abc import Mapping, Sequence
+from functools import partial
+
+from agents.prompts.prompts import (
+    FILTER_BATCH_SYSTEM_PROMPT,
+    FILTER_BATCH_USER_PROMPT_TEMPLATE,
+    FILTER_SYSTEM_PROMPT,
+    FILTER_USER_PROMPT_TEMPLATE,
+)
+from agents.workflow.parser.utils.text_handler import format_record
+from agents.workflow.prefilter import Decision, HeuristicPrefilter
+from agents.workflow.schemas import BatchFilterResult, FilterResult
+from utils.llm_client import LLMClient
+from utils.llm_scheduler import RateLimitedScheduler
+from utils.logger import get_agent_logger
+from utils.tokens import count_tokens, truncate_to_tokens
+
+logger = get_agent_logger()
+
+
+class BatchFilter:
+    """
+    批量过滤器: 一次请求判定多条问答记录
+
+    Example:
+        >>> batch_filter = BatchFilter(get_llm_client(), context_budget=24000)
+        >>> verdicts = await batch_filter.filter(records)
+        >>> kept = [r for r, v in zip(records, verdicts) if v and v.is_valuable]
+    """
+
+    def __init__(
+        self,
+        client: LLMClient,
+        context_budget: int = 24000,
+        max_record_tokens: int = 1500,
+        max_batch_size: int = 40,
+        output_tokens_per_record: int = 60,
+        scheduler: RateLimitedScheduler | None = None,
+        prefilter: HeuristicPrefilter | None = None
+    ):
+        """
+        Args:
+            client: LLM 客户端
+            context_budget: 单次请求的 token 预算(输入 + 预留输出)
+            max_record_tokens: 单条记录在过滤时最多保留的 token 数, 超出部分截断
+            max_batch_size: 单次请求最多包含的记录数
+            output_tokens_per_record: 每条判定预留的输出 token 数
+            scheduler: 请求调度器, 默认并发 5
+            prefilter: 本地预过滤器, 为空时所有记录都交给 LLM
+        """
+        self.client = client
+        self.context_budget = context_budget
+        self.max_record_tokens = max_record_tokens
+        self.max_batch_size = max_batch_size
+        self.output_tokens_per_record = output_tokens_per_record
+        self.scheduler = scheduler or RateLimitedScheduler(max_concurrency=5)
+        self._prompt_tokens = count_tokens(FILTER_BATCH_SYSTEM_PROMPT) + count_tokens(FILTER_BATCH_USER_PROMPT_TEMPLATE)
+        self.prefilter = prefilter
+        self.batch_calls = 0
+        self.single_calls = 0
+        # 预过滤节省的批量请求数
+        self.calls_saved = 0
+
+    def _render(self, record: Mapping[str, str]) -> str:
+        """渲染单条记录(截断过长的内容)"""
+        return truncate_to_tokens(format_record(record), self.max_record_tokens)
+
+    def pack(self, texts: Sequence[str]) -> list[tuple[list[int], int]]:
+        """
+        按 token 预算把记录贪心打包成批次
+
+        Args:
+            texts: 渲染后的记录文本
+
+        Returns:
+            [(批次内记录下标列表, 批次估算 token 数), ...]
+        """
+        budget = self.context_budget - self._prompt_tokens
+        batches: list[tuple[list[int], int]] = []
+        batch: list[int] = []
+        used = 0
+        for index, text in enumerate(texts):
+            # 记录正文 + "[index] " 标签和分隔 + 预留输出
+            cost = count_tokens(text) + 8 + self.output_tokens_per_record
+            if batch and (used + cost > budget or len(batch) >= self.max_batch_size):
+                batches.append((batch, used))
+                batch, used = [], 0
+            batch.append(index)
+            used += cost
+        if batch:
+            batches.append((batch, used))
+        return batches
+
+    async def _filter_batch(self, indices: list[int], texts: Sequence[str]) -> dict[int, FilterResult]:
+        """执行一次批量请求, 返回 {记录下标: 判定}"""
+        # 批次内使用从 1 开始的局部编号, 输出更短
+        records_text = "\n\n".join(f"[{local}] {texts[index]}" for local, index in enumerate(indices, start=1))
+        messages = [
+            {"role": "system", "content": FILTER_BATCH_SYSTEM_PROMPT},
+            {"role": "user", "content": FILTER_BATCH_USER_PROMPT_TEMPLATE.format(count=len(indices), records=records_text)},
+        ]
+        self.batch_calls += 1
+        result = await self.client.astructured_completion(BatchFilterResult, messages)
+        verdicts: dict[int, FilterResult] = {}
+        for verdict in result.verdicts:
+            if 1 <= verdict.index <= len(indices):
+                verdicts.setdefault(indices[verdict.index - 1],
+                                    FilterResult(is_valuable=verdict.is_valuable, reason=verdict.reason))
+        return verdicts
+
+    async def filter_single(self, record: Mapping[str, str]) -> FilterResult:
+        """使用原有 FILTER_* 提示词过滤单条记录"""
+        messages = [
+            {"role": "system", "content": FILTER_SYSTEM_PROMPT},
+            {"role": "user", "content": FILTER_USER_PROMPT_TEMPLATE.format(conversation=self._render(record))},
+        ]
+        self.single_calls += 1
+        return await self.client.astructured_completion(FilterResult, messages)
+
+    async def filter(self, records: Sequence[Mapping[str, str]]) -> list[FilterResult | None]:
+        """
+        批量过滤记录
+
+        Args:
+            records: 问答记录 (ChatRecord 或 dict)
+
+        Returns:
+            与 records 一一对应的判定结果, 单条回退也失败的记录为 None
+        """
+        texts = [self._render(record) for record in records]
+        verdicts: list[FilterResult | None] = [None] * len(records)
+        pending = list(range(len(records)))
+        prefiltered = {}
+        if self.prefilter is not None:
+            pending = []
+            for index, record in enumerate(records):
+                result = self.prefilter.score(record)
+                if result.decision is Decision.AMBIGUOUS:
+                    pending.append(index)
+                    prefiltered[index] = result
+                else:
+                    verdicts[index] = FilterResult(is_valuable=result.decision is Decision.ACCEPT,
+                                                   reason=f"prefilter: {result.reason}")
+
+        # 批次内下标是 pending 中的位置
+        batches = [
+            ([pending[position] for position in positions], tokens)
+            for positions, tokens in self.pack([texts[index] for index in pending])
+        ]
+        if self.prefilter is not None:
+            self.calls_saved += len(self.pack(texts)) - len(batches)
+
+        results = await self.scheduler.map(
+            [partial(self._filter_batch, indices, texts) for indices, _ in batches],
+            tokens=[tokens + self._prompt_tokens for _, tokens in batches]
+        )
+        missing: list[int] = []
+        for (indices, _), result in zip(batches, results):
+            if not result.ok:
+                logger.warning("Batch filter request failed, falling back to single filter: %r", result.error)
+                missing.extend(indices)
+                continue
+            for index in indices:
+                verdict = result.value.get(index)
+                if verdict is None:
+                    missing.append(index)
+                else:
+                    verdicts[index] = verdict
+
+        if missing:
+            logger.info("Batch filter missing %d verdicts, falling back to single filter", len(missing))
+            single_results = await self.scheduler.map(
+                [partial(self.filter_single, records[index]) for index in missing],
+                tokens=[count_tokens(texts[index]) + self._prompt_tokens for index in missing]
+            )
+            for index, result in zip(missing, single_results):
+                if result.ok:
+                    verdicts[index] = result.value
+                else:
+                    logger.error("Filter failed for record %d: %r", index, result.error)
+
+        if self.prefilter is not None:
+            # LLM 的判定作为分类器的训练样本
+            for index in pending:
+                if verdicts[index] is not None:
+                    self.prefilter.learn(records[index], verdicts[index].is_valuable, prefiltered[index])
+        # batch_calls/single_calls 是累计值(并发调用时会交错), 这里记录本次调用的次数
+        logger.info("Filtered %d records with %d batch calls and %d single calls",
+                    len(records), len(batches), len(missing))
+        return verdicts
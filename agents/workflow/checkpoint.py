@@ -0,0 +1,168 @@
+"""
+流水线检查点
+
+长时间的爬取或 LLM 处理中途崩溃后, 重新运行会从头开始, 已经付费的 LLM 结果也随之丢失.
+本模块把每个导出文件和每个对话窗口的处理阶段及中间结果(过滤判定、总结、分类)持久化在 SQLite 中,
+每完成一个阶段立即提交; 重启后流水线从各对话停下的阶段继续, 已完成的工作不会重做.
+"""
+
+import hashlib
+import sqlite3
+import time
+from collections.abc import Iterable, Mapping
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+from agents.workflow.dedup import record_hash
+from utils import json_codec
+from utils.logger import get_tool_logger
+
+logger = get_tool_logger()
+
+# 处理阶段, 按先后顺序排列
+DOWNLOADED = "downloaded"
+PARSED = "parsed"
+FILTERED = "filtered"
+SUMMARIZED = "summarized"
+CATEGORIZED = "categorized"
+WRITTEN = "written"
+# 过滤后没有保留任何记录, 与 WRITTEN 一样视为处理完成
+DROPPED = "dropped"
+
+STAGES = (DOWNLOADED, PARSED, FILTERED, SUMMARIZED, CATEGORIZED, WRITTEN)
+_ORDER = {stage: order for order, stage in enumerate(STAGES)}
+_ORDER[DROPPED] = _ORDER[WRITTEN]
+
+
+def stage_reached(stage: str | None, target: str) -> bool:
+    """判断 stage 是否已经达到(或越过) target 阶段"""
+    return stage is not None and _ORDER[stage] >= _ORDER[target]
+
+
+def conversation_key(records: Iterable[Mapping[str, str]]) -> str:
+    """
+    计算对话窗口的检查点键(基于全部记录内容, 对话新增消息后键随之改变)
+
+    Args:
+        records: 对话窗口的问答记录
+
+    Returns:
+        32 位十六进制摘要
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    for record in records:
+        digest.update(record_hash(record))
+    return digest.hexdigest()
+
+
+def file_key(path: str | Path) -> str:
+    """导出文件的检查点键"""
+    return f"file:{Path(path).resolve()}"
+
+
+def crawl_key(platform: str) -> str:
+    """一次爬取的检查点键(每个平台同时只有一次未完成的爬取)"""
+    return f"crawl:{platform}"
+
+
+def file_signature(path: str | Path) -> list[int]:
+    """文件签名(大小和修改时间), 文件被重新导出后签名改变"""
+    stat = Path(path).stat()
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+@dataclass
+class Checkpoint:
+    """单个对象的检查点"""
+    key: str
+    stage: str
+    payload: dict[str, Any] = field(default_factory=dict)
+    updated: float = 0.0
+
+    @property
+    def done(self) -> bool:
+        return stage_reached(self.stage, WRITTEN)
+
+
+class CheckpointStore:
+    """
+    SQLite 检查点存储
+
+    Example:
+        >>> with CheckpointStore("cache/checkpoints.sqlite3") as store:
+        ...     store.mark(key, FILTERED, kept=[...])
+        ...     store.get(key).stage
+        'filtered'
+    """
+
+    def __init__(self, db_path: str | Path | None = None):
+        """
+        Args:
+            db_path: SQLite 文件路径, 为空时只保存在内存中(不跨运行)
+        """
+        if db_path is not None:
+            Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(db_path) if db_path is not None else ":memory:")
+        # WAL 模式下每个阶段单独提交的开销很小, 崩溃时也不会损坏已提交的检查点
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS checkpoints ("
+            "key TEXT PRIMARY KEY, stage TEXT NOT NULL, payload TEXT NOT NULL, updated REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def get(self, key: str) -> Checkpoint | None:
+        """读取检查点, 不存在时返回 None"""
+        row = self._conn.execute(
+            "SELECT stage, payload, updated FROM checkpoints WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        return Checkpoint(key, row[0], json_codec.loads(row[1]), row[2])
+
+    def mark(self, key: str, stage: str, **payload: Any) -> Checkpoint:
+        """
+        记录对象到达某个阶段并立即提交
+
+        Args:
+            key: 检查点键
+            stage: 到达的阶段
+            **payload: 该阶段的中间结果, 与之前阶段的结果合并保存
+
+        Returns:
+            更新后的检查点
+        """
+        if stage not in _ORDER:
+            raise ValueError(f"Unknown stage: {stage}")
+        current = self.get(key)
+        merged = {**current.payload, **payload} if current is not None else payload
+        checkpoint = Checkpoint(key, stage, merged, time.time())
+        self._conn.execute(
+            "INSERT OR REPLACE INTO checkpoints (key, stage, payload, updated) VALUES (?, ?, ?, ?)",
+            (key, stage, json_codec.dumps(merged), checkpoint.updated)
+        )
+        self._conn.commit()
+        return checkpoint
+
+    def is_done(self, key: str) -> bool:
+        """对象是否已经处理完成(已写入或已丢弃)"""
+        checkpoint = self.get(key)
+        return checkpoint is not None and checkpoint.done
+
+    def remove(self, key: str) -> None:
+        self._conn.execute("DELETE FROM checkpoints WHERE key = ?", (key,))
+        self._conn.commit()
+
+    def stage_counts(self) -> dict[str, int]:
+        """各阶段的对象数量"""
+        return dict(self._conn.execute("SELECT stage, COUNT(*) FROM checkpoints GROUP BY stage").fetchall())
@@ -0,0 +1,422 @@
+"""
+基于向量的近重复合并与主题聚类
+
+CATEGORIZER_* 提示词每次只为一个条目分类, 同类内容得到的分类名称不一致, 而且每个条目都要一次 LLM 调用.
+本模块先在本地把条目向量化(有 sentence-transformers 时使用 CPU 模型, 否则使用哈希 TF-IDF),
+用 NumPy 矩阵运算计算余弦相似度, 合并近重复条目并按主题聚类, 每个簇只调用一次分类.
+簇中心与分类的对应关系保存为分类提示, 之后相似的条目直接复用已有分类.
+"""
+
+import asyncio
+import re
+import zlib
+from collections.abc import Sequence
+from dataclasses import dataclass, field
+from functools import partial
+from pathlib import Path
+
+import numpy as np
+
+from agents.prompts.prompts import CATEGORIZER_CLUSTER_SYSTEM_PROMPT, CATEGORIZER_CLUSTER_USER_PROMPT_TEMPLATE
+from agents.workflow.dedup import normalize_text
+from agents.workflow.knowledge_base import KnowledgeEntry, sanitize_path_part
+from agents.workflow.schemas import CategoryResult
+from utils import json_codec
+from utils.llm_client import LLMClient
+from utils.llm_scheduler import RateLimitedScheduler
+from utils.logger import get_agent_logger
+from utils.tokens import truncate_to_tokens
+
+try:
+    from sentence_transformers import SentenceTransformer
+except ImportError:  # 可选依赖
+    SentenceTransformer = None
+
+logger = get_agent_logger()
+
+DEFAULT_EMBEDDING_MODEL = "paraphrase-multilingual-MiniLM-L12-v2"
+
+_WORD_RE = re.compile(r"[a-z0-9_]+")
+
+
+def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    """按行做 L2 归一化(零向量保持为零), 归一化后点积即余弦相似度"""
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return (matrix / norms).astype(np.float32, copy=False)
+
+
+class HashingTfidfEmbedder:
+    """
+    哈希 TF-IDF 向量化: 英文单词 + 字符 n-gram(适合中文), 特征哈希到固定维度
+    文档频率跨批次累计; 需要跨运行比较向量时用 state_dict/load_state_dict 持久化文档频率
+    """
+
+    def __init__(self, dim: int = 4096, ngram_range: tuple[int, int] = (2, 3), max_chars: int = 4000):
+        """
+        Args:
+            dim: 向量维度
+            ngram_range: 字符 n-gram 长度范围
+            max_chars: 每个文本参与向量化的最大字符数
+        """
+        self.name = f"hashing-tfidf-{dim}"
+        self.dim = dim
+        self.ngram_range = ngram_range
+        self.max_chars = max_chars
+        self.doc_freq = np.zeros(dim, dtype=np.float64)
+        self.docs = 0
+
+    def _features(self, text: str) -> list[int]:
+        text = normalize_text(text)[:self.max_chars]
+        features = [zlib.crc32(word.encode("utf-8")) for word in _WORD_RE.findall(text)]
+        compact = text.replace(" ", "")
+        low, high = self.ngram_range
+        for n in range(low, high + 1):
+            features.extend(zlib.crc32(compact[i:i + n].encode("utf-8")) for i in range(len(compact) - n + 1))
+        return [feature % self.dim for feature in features]
+
+    def embed(self, texts: Sequence[str], update: bool = True) -> np.ndarray:
+        """
+        向量化文本
+
+        Args:
+            texts: 文本列表
+            update: 是否把这些文本计入文档频率(查询文本应传 False)
+
+        Returns:
+            (len(texts), dim) 的 float32 矩阵
+        """
+        counts = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            features = self._features(text)
+            if features:
+                counts[row] = np.bincount(features, minlength=self.dim)
+        if update:
+            self.doc_freq += (counts > 0).sum(axis=0)
+            self.docs += len(texts)
+        idf = (np.log((1 + self.docs) / (1 + self.doc_freq)) + 1).astype(np.float32)
+        # 次线性 TF, 避免长文本中的高频片段占据主导
+        return normalize_rows(np.log1p(counts) * idf)
+
+    def state_dict(self) -> dict[str, np.ndarray]:
+        """文档频率状态(可直接传给 np.savez)"""
+        return {"doc_freq": self.doc_freq, "docs": np.array(self.docs)}
+
+    def load_state_dict(self, state) -> None:
+        """恢复文档频率状态; 维度不一致时忽略"""
+        doc_freq = np.asarray(state["doc_freq"], dtype=np.float64)
+        if doc_freq.shape != (self.dim,):
+            logger.warning("Ignoring TF-IDF state with dimension %d (expected %d)", len(doc_freq), self.dim)
+            return
+        self.doc_freq = doc_freq.copy()
+        self.docs = int(state["docs"])
+
+
+class SentenceTransformerEmbedder:
+    """sentence-transformers 模型向量化(CPU 即可运行)"""
+
+    def __init__(self, model_name: str = DEFAULT_EMBEDDING_MODEL, device: str = "cpu", batch_size: int = 32):
+        if SentenceTransformer is None:
+            raise ImportError("sentence-transformers is not installed")
+        self.name = model_name
+        self.batch_size = batch_size
+        self.model = SentenceTransformer(model_name, device=device)
+
+    def embed(self, texts: Sequence[str], update: bool = True) -> np.ndarray:
+        embeddings = self.model.encode(
+            list(texts), batch_size=self.batch_size, normalize_embeddings=True, show_progress_bar=False
+        )
+        return np.asarray(embeddings, dtype=np.float32)
+
+
+def get_embedder(model_name: str | None = DEFAULT_EMBEDDING_MODEL, fallback_dim: int = 4096):
+    """
+    获取向量化器: 优先使用 sentence-transformers 模型, 不可用时回退到哈希 TF-IDF
+
+    Args:
+        model_name: 模型名称, 为空时直接使用 TF-IDF
+        fallback_dim: TF-IDF 向量维度
+    """
+    if model_name and SentenceTransformer is not None:
+        try:
+            return SentenceTransformerEmbedder(model_name)
+        except Exception as e:
+            logger.warning("Failed to load embedding model %s, falling back to TF-IDF: %r", model_name, e)
+    return HashingTfidfEmbedder(dim=fallback_dim)
+
+
+def greedy_clusters(embeddings: np.ndarray, threshold: float) -> np.ndarray:
+    """
+    密度优先的贪心聚类: 相似邻居最多的未分配项成为簇中心, 吸收所有与之相似度不低于阈值的未分配项
+    相似度矩阵一次性计算, 适用于单批几千条以内的数据
+
+    Args:
+        embeddings: 已归一化的向量矩阵
+        threshold: 余弦相似度阈值
+
+    Returns:
+        每一项的簇编号(从 0 开始)
+    """
+    labels = np.full(len(embeddings), -1, dtype=np.int64)
+    if not len(embeddings):
+        return labels
+    neighbors = (embeddings @ embeddings.T) >= threshold
+    order = np.argsort(-neighbors.sum(axis=1), kind="stable")
+    label = 0
+    for leader in order:
+        if labels[leader] >= 0:
+            continue
+        labels[neighbors[leader] & (labels < 0)] = label
+        labels[leader] = label
+        label += 1
+    return labels
+
+
+@dataclass
+class Cluster:
+    """主题簇"""
+    label: int
+    # 去重后保留的条目下标, 按与簇中心的相似度降序排列
+    members: list[int]
+    centroid: np.ndarray
+    # 被合并的近重复条目下标 -> 保留的条目下标
+    duplicates: dict[int, int] = field(default_factory=dict)
+    topic: str = ""
+    categories: list[str] | None = None
+    # LLM 为簇拟定的文件名(只有单条目簇直接使用)
+    filename: str = ""
+
+
+def build_clusters(
+    embeddings: np.ndarray,
+    lengths: Sequence[int],
+    cluster_threshold: float = 0.45,
+    duplicate_threshold: float = 0.9
+) -> list[Cluster]:
+    """
+    聚类并合并簇内的近重复条目
+
+    Args:
+        embeddings: 已归一化的向量矩阵
+        lengths: 各条目的内容长度, 近重复条目中保留最长的一个
+        cluster_threshold: 主题聚类的相似度阈值
+        duplicate_threshold: 近重复判定的相似度阈值
+
+    Returns:
+        簇列表, 按簇大小降序排列
+    """
+    clusters = []
+    labels = greedy_clusters(embeddings, cluster_threshold)
+    for label in range(labels.max() + 1 if len(labels) else 0):
+        indices = np.flatnonzero(labels == label)
+        vectors = embeddings[indices]
+        duplicates: dict[int, int] = {}
+        kept: list[int] = []
+        dup_labels = greedy_clusters(vectors, duplicate_threshold)
+        for dup_label in range(dup_labels.max() + 1):
+            group = indices[dup_labels == dup_label]
+            keep = max(group, key=lambda index: lengths[index])
+            kept.append(int(keep))
+            duplicates.update({int(index): int(keep) for index in group if index != keep})
+        centroid = normalize_rows(vectors.mean(axis=0, keepdims=True))[0]
+        kept.sort(key=lambda index: -float(embeddings[index] @ centroid))
+        clusters.append(Cluster(label, kept, centroid, duplicates))
+    clusters.sort(key=lambda cluster: -len(cluster.members))
+    return clusters
+
+
+class CategoryHints:
+    """
+    分类提示: 簇中心 → 分类, 可持久化
+    新簇与已有簇中心足够相似时直接复用分类; 已有分类名称也会提供给 LLM 以保持命名一致
+    向量化器有状态(TF-IDF 文档频率)时一并保存, 之后的运行在同样的 IDF 下计算簇中心
+    """
+
+    def __init__(self, path: str | Path | None = None, threshold: float = 0.6):
+        """
+        Args:
+            path: 持久化文件(.npz), 为空时只保存在内存中
+            threshold: 复用分类的相似度阈值
+        """
+        self.path = Path(path) if path is not None else None
+        self.threshold = threshold
+        self.embedder_name: str | None = None
+        self.centroids = np.zeros((0, 0), dtype=np.float32)
+        self.categories: list[list[str]] = []
+        # 出现过的全部分类名称(更换向量化器后仍然保留)
+        self.known: set[str] = set()
+        # 向量化器状态(state_dict), 没有状态的向量化器为 None
+        self.embedder_state: dict[str, np.ndarray] | None = None
+        if self.path is not None and self.path.exists():
+            self.load()
+
+    def load(self) -> None:
+        with np.load(self.path, allow_pickle=False) as data:
+            self.centroids = data["centroids"].astype(np.float32)
+            meta = json_codec.loads(str(data["meta"]))
+            state = {name.removeprefix("embedder_"): data[name] for name in data.files if name.startswith("embedder_")}
+        self.embedder_state = state or None
+        self.embedder_name = meta["embedder"]
+        self.categories = meta["categories"]
+        self.known = set(meta["known"])
+
+    def save(self) -> None:
+        if self.path is None:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        meta = json_codec.dumps({
+            "embedder": self.embedder_name, "categories": self.categories, "known": sorted(self.known)
+        })
+        state = {f"embedder_{name}": value for name, value in (self.embedder_state or {}).items()}
+        with open(self.path, "wb") as f:
+            np.savez(f, centroids=self.centroids, meta=np.array(meta), **state)
+
+    def restore_embedder(self, embedder) -> None:
+        """把保存的向量化器状态恢复到尚未使用过的同名向量化器上"""
+        if (self.embedder_state is not None and self.embedder_name == embedder.name
+                and hasattr(embedder, "load_state_dict") and not getattr(embedder, "docs", 0)):
+            embedder.load_state_dict(self.embedder_state)
+
+    def bind(self, embedder_name: str, dim: int) -> None:
+        """绑定向量化器; 与已保存的向量化器不同时丢弃簇中心, 只保留分类名称"""
+        if self.embedder_name == embedder_name and self.centroids.shape[1:] == (dim,):
+            return
+        if len(self.centroids):
+            logger.info("Embedder changed to %s, category hint centroids discarded", embedder_name)
+        self.embedder_name = embedder_name
+        self.centroids = np.zeros((0, dim), dtype=np.float32)
+        self.categories = []
+        self.embedder_state = None
+
+    def match(self, centroid: np.ndarray) -> list[str] | None:
+        """查找与簇中心足够相似的已有分类"""
+        if not len(self.centroids):
+            return None
+        similarity = self.centroids @ centroid
+        best = int(np.argmax(similarity))
+        return list(self.categories[best]) if similarity[best] >= self.threshold else None
+
+    def add(self, centroid: np.ndarray, categories: list[str]) -> None:
+        self.centroids = np.vstack([self.centroids, centroid[None, :]]).astype(np.float32)
+        self.categories.append(list(categories))
+        self.known.update(categories)
+
+    def known_categories(self) -> list[str]:
+        return sorted(self.known)
+
+
+class TopicClusterer:
+    """
+    聚类分类器: 每个主题簇只调用一次分类
+
+    Example:
+        >>> clusterer = TopicClusterer(get_llm_client(), hints=CategoryHints("cache/category_hints.npz"))
+        >>> clusters = await clusterer.categorize(entries)
+    """
+
+    def __init__(
+        self,
+        client: LLMClient,
+        embedder=None,
+        hints: CategoryHints | None = None,
+        cluster_threshold: float = 0.45,
+        duplicate_threshold: float = 0.9,
+        max_examples: int = 5,
+        example_tokens: int = 400,
+        scheduler: RateLimitedScheduler | None = None
+    ):
+        """
+        Args:
+            client: LLM 客户端
+            embedder: 向量化器, 默认通过 get_embedder() 获取
+            hints: 分类提示, 默认只保存在内存中
+            cluster_threshold: 主题聚类的相似度阈值
+            duplicate_threshold: 近重复判定的相似度阈值
+            max_examples: 每个簇发送给 LLM 的示例条目数
+            example_tokens: 每个示例条目保留的 token 数
+            scheduler: 请求调度器, 默认并发 5
+        """
+        self.client = client
+        self.embedder = embedder or get_embedder()
+        self.hints = hints or CategoryHints()
+        self.cluster_threshold = cluster_threshold
+        self.duplicate_threshold = duplicate_threshold
+        self.max_examples = max_examples
+        self.example_tokens = example_tokens
+        self.scheduler = scheduler or RateLimitedScheduler(max_concurrency=5)
+        self.calls = 0
+        self.hint_hits = 0
+
+    def cluster(self, entries: Sequence[KnowledgeEntry]) -> list[Cluster]:
+        """向量化并聚类条目(CPU 密集, 不调用 LLM)"""
+        texts = [f"{entry.title}\n{entry.content}" for entry in entries]
+        self.hints.restore_embedder(self.embedder)
+        embeddings = self.embedder.embed(texts)
+        self.hints.bind(self.embedder.name, embeddings.shape[1])
+        return build_clusters(
+            embeddings, [len(entry.content) for entry in entries],
+            self.cluster_threshold, self.duplicate_threshold
+        )
+
+    async def _categorize_cluster(self, cluster: Cluster, entries: Sequence[KnowledgeEntry]) -> CategoryResult:
+        """为一个簇调用一次分类"""
+        examples = "\n\n".join(
+            f"## {entries[index].title}\n{truncate_to_tokens(entries[index].content, self.example_tokens)}"
+            for index in cluster.members[:self.max_examples]
+        )
+        messages = [
+            {"role": "system", "content": CATEGORIZER_CLUSTER_SYSTEM_PROMPT},
+            {"role": "user", "content": CATEGORIZER_CLUSTER_USER_PROMPT_TEMPLATE.format(
+                count=len(cluster.members), examples=examples,
+                known_categories=", ".join(self.hints.known_categories()) or "(none yet)")},
+        ]
+        self.calls += 1
+        return await self.client.astructured_completion(CategoryResult, messages)
+
+    async def categorize(self, entries: Sequence[KnowledgeEntry]) -> list[Cluster]:
+        """
+        聚类并分类条目, 分类结果写入各簇保留的条目
+
+        Args:
+            entries: 已总结的知识库条目
+
+        Returns:
+            簇列表; 分类失败的簇 categories 为 None, 近重复条目记录在 duplicates 中
+        """
+        if not entries:
+            return []
+        clusters = await asyncio.to_thread(self.cluster, entries)
+        pending = []
+        for cluster in clusters:
+            cluster.categories = self.hints.match(cluster.centroid)
+            if cluster.categories is None:
+                pending.append(cluster)
+            else:
+                self.hint_hits += 1
+
+        results = await self.scheduler.map([partial(self._categorize_cluster, cluster, entries) for cluster in pending])
+        for cluster, result in zip(pending, results):
+            if not result.ok:
+                logger.error("Categorization failed for a cluster of %d entries: %r", len(cluster.members), result.error)
+                continue
+            cluster.topic = result.value.title
+            cluster.categories = result.value.categories
+            cluster.filename = result.value.suggested_filename
+            self.hints.add(cluster.centroid, cluster.categories)
+        if hasattr(self.embedder, "state_dict"):
+            self.hints.embedder_state = self.embedder.state_dict()
+        self.hints.save()
+
+        for cluster in clusters:
+            if cluster.categories is not None:
+                for index in cluster.members:
+                    entry = entries[index]
+                    entry.categories = list(cluster.categories)
+                    if not entry.filename:
+                        # 簇文件名描述的是整个主题, 多条目簇按各自标题命名
+                        use_cluster_name = len(cluster.members) == 1 and cluster.filename
+                        entry.filename = cluster.filename if use_cluster_name else sanitize_path_part(entry.title)
+        duplicates = sum(len(cluster.duplicates) for cluster in clusters)
+        logger.info("Categorized %d entries in %d clusters with %d calls (%d hint hits, %d near-duplicates)",
+                    len(entries), len(clusters), len(pending), len(clusters) - len(pending), duplicates)
+        return clusters
@@ -0,0 +1,154 @@
+"""
+问答记录去重
+
+同一个对话可能同时出现在分组目录、顶层目录和全量导出中, 解析后会产生重复记录,
+每条重复记录都会多消耗一次 LLM 调用. 本模块在解析之后、进入 LLMClient 之前,
+对 (title, question, answer) 做规范化并计算哈希, 丢弃已经见过的记录.
+已见哈希持久化在 SQLite 中, 重复运行时同样生效, 内存占用与历史记录数量无关.
+"""
+
+import hashlib
+import re
+import sqlite3
+import unicodedata
+from collections.abc import Iterable, Iterator, Mapping
+from pathlib import Path
+
+from agents.workflow.parser.core.record import Conversation
+from utils.logger import get_tool_logger
+
+logger = get_tool_logger()
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def normalize_text(text: str | None) -> str:
+    """规范化文本: NFKC 归一化、合并空白、忽略大小写"""
+    if not text:
+        return ""
+    text = unicodedata.normalize("NFKC", text)
+    return _WHITESPACE_RE.sub(" ", text).strip().casefold()
+
+
+def record_hash(record: Mapping[str, str], include_title: bool = True) -> bytes:
+    """
+    计算记录的内容哈希
+
+    Args:
+        record: 问答记录 (ChatRecord 或 dict)
+        include_title: 是否把标题计入哈希
+
+    Returns:
+        16 字节的 blake2b 摘要
+    """
+    fields = [record["question"], record["answer"]]
+    if include_title:
+        fields.insert(0, record["title"])
+    payload = "\x1f".join(normalize_text(field) for field in fields)
+    return hashlib.blake2b(payload.encode("utf-8"), digest_size=16).digest()
+
+
+class RecordDeduplicator:
+    """
+    基于内容哈希的记录去重器, 已见集合持久化在 SQLite 中
+
+    Example:
+        >>> with RecordDeduplicator("cache/seen_records.sqlite3") as dedup:
+        ...     for conversation in dedup.filter(parse_chat_dir(download_dir, "qwen")):
+        ...         handle(conversation)
+        ...         dedup.mark_seen(conversation)
+    """
+
+    def __init__(self, db_path: str | Path | None = None, include_title: bool = True):
+        """
+        Args:
+            db_path: SQLite 文件路径, 为空时只在内存中去重(不跨运行)
+            include_title: 是否把标题计入哈希
+        """
+        if db_path is not None:
+            Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self.include_title = include_title
+        self._conn = sqlite3.connect(str(db_path) if db_path is not None else ":memory:")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS seen_records (hash BLOB PRIMARY KEY)")
+        self._conn.commit()
+        # 本次运行中已经放行但尚未持久化的哈希(mark=False, 即默认情况下使用)
+        self._pending: set[bytes] = set()
+        self.kept = 0
+        self.dropped = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def close(self) -> None:
+        """关闭数据库连接"""
+        self._conn.close()
+
+    def is_seen(self, record: Mapping[str, str]) -> bool:
+        """判断记录是否已经见过(已持久化或本次运行已放行)"""
+        digest = record_hash(record, self.include_title)
+        if digest in self._pending:
+            return True
+        row = self._conn.execute("SELECT 1 FROM seen_records WHERE hash = ?", (digest,)).fetchone()
+        return row is not None
+
+    def mark_seen(self, records: Iterable[Mapping[str, str]]) -> None:
+        """把记录持久化为已见(例如在记录处理完成后调用)"""
+        digests = [record_hash(record, self.include_title) for record in records]
+        with self._conn:
+            self._conn.executemany("INSERT OR IGNORE INTO seen_records (hash) VALUES (?)",
+                                   ((digest,) for digest in digests))
+        self._pending.difference_update(digests)
+
+    def filter_conversation(self, conversation: Conversation, mark: bool = False) -> Conversation:
+        """
+        过滤单个对话窗口中的重复记录
+
+        Args:
+            conversation: 对话窗口
+            mark: 是否立即把放行的记录持久化为已见; 默认为 False, 只在本次运行内去重,
+                  由调用方在处理(写入)成功后调用 mark_seen, 避免中途崩溃导致记录被永久跳过
+
+        Returns:
+            只包含新记录的对话窗口
+        """
+        result = Conversation(conversation.title)
+        with self._conn:
+            for record in conversation:
+                digest = record_hash(record, self.include_title)
+                if digest in self._pending:
+                    self.dropped += 1
+                    continue
+                if mark:
+                    cursor = self._conn.execute("INSERT OR IGNORE INTO seen_records (hash) VALUES (?)", (digest,))
+                    is_new = cursor.rowcount == 1
+                else:
+                    is_new = self._conn.execute("SELECT 1 FROM seen_records WHERE hash = ?",
+                                                (digest,)).fetchone() is None
+                    if is_new:
+                        self._pending.add(digest)
+                if is_new:
+                    result.append(record)
+                    self.kept += 1
+                else:
+                    self.dropped += 1
+        return result
+
+    def filter(self, conversations: Iterable[Conversation], mark: bool = False) -> Iterator[Conversation]:
+        """
+        逐个过滤对话窗口, 跳过去重后为空的窗口
+
+        Args:
+            conversations: 对话窗口序列 (可以是流式解析的生成器)
+            mark: 参见 filter_conversation
+
+        Yields:
+            只包含新记录的对话窗口
+        """
+        for conversation in conversations:
+            result = self.filter_conversation(conversation, mark)
+            if result:
+                yield result
+        logger.info("dedup kept %d records, dropped %d duplicates", self.kept, self.dropped)
@@ -0,0 +1,173 @@
+"""
+分层抽样评估
+
+EVALUATOR_USER_PROMPT_TEMPLATE 会把完整的原始对话和处理结果一起发回 LLM, 对每个保留的条目都评估
+几乎让 token 消耗翻倍. 本模块按 (一级分类, 长度区间) 分层抽样评估, 并持续统计每层的评估结果:
+- 平时每层只评估少量样本: 前 min_per_stratum 个加上按 rate 抽样的部分
+- 某层最近的失败率超过阈值时升级为全量评估, 失败率回落后恢复抽样
+这样 QA 开销随处理量按比例增长, 质量下降时又能及时发现并纠正.
+"""
+
+from collections import deque
+from dataclasses import dataclass, field
+
+from agents.workflow.knowledge_base import KnowledgeEntry
+from utils.logger import get_agent_logger
+
+logger = get_agent_logger()
+
+
+@dataclass
+class StratumStats:
+    """单个分层的评估统计"""
+    seen: int = 0
+    evaluated: int = 0
+    failures: int = 0
+    score_total: int = 0
+    # 最近的评估结果(True 表示失败), 用于判断是否升级
+    recent: deque = field(default_factory=deque)
+    escalated: bool = False
+
+    @property
+    def failure_rate(self) -> float:
+        """最近评估的失败率"""
+        return sum(self.recent) / len(self.recent) if self.recent else 0.0
+
+    @property
+    def mean_score(self) -> float:
+        return self.score_total / self.evaluated if self.evaluated else 0.0
+
+
+class EvaluationSampler:
+    """
+    评估抽样器: 决定哪些条目需要评估, 并记录评估结果
+
+    Example:
+        >>> sampler = EvaluationSampler(rate=0.05, failure_threshold=0.2)
+        >>> executor = WorkflowExecutor(get_llm_client(), evaluation=sampler)
+        >>> ...
+        >>> sampler.report()
+    """
+
+    def __init__(
+        self,
+        rate: float = 0.05,
+        min_per_stratum: int = 3,
+        failure_threshold: float = 0.2,
+        min_samples: int = 10,
+        window: int = 50,
+        min_score: int = 6,
+        length_buckets: tuple[int, ...] = (1000, 4000)
+    ):
+        """
+        Args:
+            rate: 正常情况下每层的抽样比例
+            min_per_stratum: 每层至少评估的条目数(新出现的分层先评估这么多条)
+            failure_threshold: 最近失败率超过该值时该层升级为全量评估
+            min_samples: 最近评估数达到该值后才判断是否升级
+            window: 计算最近失败率的窗口大小
+            min_score: 得分低于该值视为失败
+            length_buckets: 划分长度区间的 token 数边界
+        """
+        self.rate = rate
+        self.min_per_stratum = min_per_stratum
+        self.failure_threshold = failure_threshold
+        self.min_samples = min_samples
+        self.window = window
+        self.min_score = min_score
+        self.length_buckets = tuple(sorted(length_buckets))
+        self.strata: dict[tuple[str, str], StratumStats] = {}
+
+    def length_bucket(self, tokens: int) -> str:
+        """长度区间标签, 如 '<1000'、'1000-4000'、'>=4000'"""
+        lower = None
+        for bound in self.length_buckets:
+            if tokens < bound:
+                return f"<{bound}" if lower is None else f"{lower}-{bound}"
+            lower = bound
+        return f">={lower}" if lower is not None else "all"
+
+    def stratum(self, entry: KnowledgeEntry, tokens: int) -> tuple[str, str]:
+        """条目所属的分层: (一级分类, 长度区间)"""
+        category = entry.categories[0].split("/")[0].strip() if entry.categories else ""
+        return category or "未分类", self.length_bucket(tokens)
+
+    def _stats(self, stratum: tuple[str, str]) -> StratumStats:
+        stats = self.strata.get(stratum)
+        if stats is None:
+            stats = self.strata[stratum] = StratumStats(recent=deque(maxlen=self.window))
+        return stats
+
+    def should_evaluate(self, key: str, entry: KnowledgeEntry, tokens: int) -> bool:
+        """
+        判断条目是否需要评估
+
+        Args:
+            key: 对话的稳定标识(十六进制哈希), 用于确定性抽样, 重复运行时抽中的条目不变
+            entry: 处理结果
+            tokens: 原始对话的 token 数
+        """
+        stats = self._stats(self.stratum(entry, tokens))
+        stats.seen += 1
+        if stats.escalated or stats.seen <= self.min_per_stratum:
+            return True
+        return int(key[:8], 16) / 0xFFFFFFFF < self.rate
+
+    def record(self, entry: KnowledgeEntry, tokens: int, score: int) -> bool:
+        """
+        记录一次评估结果并更新该层的升级状态
+
+        Returns:
+            是否通过评估
+        """
+        stratum = self.stratum(entry, tokens)
+        stats = self._stats(stratum)
+        passed = score >= self.min_score
+        stats.evaluated += 1
+        stats.score_total += score
+        stats.failures += not passed
+        stats.recent.append(not passed)
+
+        escalated = len(stats.recent) >= self.min_samples and stats.failure_rate > self.failure_threshold
+        if escalated != stats.escalated:
+            stats.escalated = escalated
+            if escalated:
+                logger.warning("Failure rate %.0f%% in stratum %s exceeds %.0f%%, evaluating every entry",
+                               stats.failure_rate * 100, "/".join(stratum), self.failure_threshold * 100)
+            else:
+                logger.info("Failure rate in stratum %s back to %.0f%%, resuming sampled evaluation",
+                            "/".join(stratum), stats.failure_rate * 100)
+        return passed
+
+    @property
+    def escalated(self) -> list[tuple[str, str]]:
+        """当前处于全量评估的分层"""
+        return [stratum for stratum, stats in self.strata.items() if stats.escalated]
+
+    def report(self) -> dict:
+        """输出并返回评估统计"""
+        seen = sum(stats.seen for stats in self.strata.values())
+        evaluated = sum(stats.evaluated for stats in self.strata.values())
+        failures = sum(stats.failures for stats in self.strata.values())
+        report = {
+            "seen": seen,
+            "evaluated": evaluated,
+            "evaluated_ratio": evaluated / seen if seen else 0.0,
+            "failures": failures,
+            "failure_rate": failures / evaluated if evaluated else 0.0,
+            "escalated": ["/".join(stratum) for stratum in self.escalated],
+            "strata": {
+                "/".join(stratum): {
+                    "seen": stats.seen,
+                    "evaluated": stats.evaluated,
+                    "failures": stats.failures,
+                    "mean_score": stats.mean_score,
+                    "recent_failure_rate": stats.failure_rate,
+                }
+                for stratum, stats in self.strata.items()
+            },
+        }
+        logger.info("Evaluated %d of %d entries (%.1f%%), %d failed; escalated strata: %s",
+                    evaluated, seen, report["evaluated_ratio"] * 100, failures,
+                    ", ".join(report["escalated"]) or "none")
+        return report
@@ -0,0 +1,284 @@
+"""
+单次调用工作流执行器
+
+分阶段处理一个对话需要 filter、summarize、categorize、evaluate 四次 LLM 调用.
+SIMPLE_WORKFLOW_* 提示词可以在一次结构化输出中完成过滤、总结和分类, 本模块默认使用单次调用模式,
+只有以下情况才回退到分阶段的 agent:
+- 结构化输出校验失败(解析错误, 或判定有价值却缺少总结/分类)
+- 抽样评估的得分低于阈值(抽样策略见 evaluation 模块)
+- 对话超出单次调用的 token 预算(分阶段模式会分块总结)
+"""
+
+from collections.abc import Mapping, Sequence
+from dataclasses import dataclass
+
+from agents.prompts.prompts import (
+    CATEGORIZER_SYSTEM_PROMPT,
+    CATEGORIZER_USER_PROMPT_TEMPLATE,
+    EVALUATOR_SYSTEM_PROMPT,
+    EVALUATOR_USER_PROMPT_TEMPLATE,
+    FILTER_SYSTEM_PROMPT,
+    FILTER_USER_PROMPT_TEMPLATE,
+    SIMPLE_WORKFLOW_SYSTEM_PROMPT,
+    SIMPLE_WORKFLOW_USER_PROMPT_TEMPLATE,
+)
+from agents.workflow.checkpoint import conversation_key
+from agents.workflow.evaluation import EvaluationSampler
+from agents.workflow.knowledge_base import KnowledgeEntry
+from agents.workflow.parser.core.record import Conversation
+from agents.workflow.parser.utils.text_handler import format_conversation
+from agents.workflow.prefilter import Decision, HeuristicPrefilter, PrefilterResult
+from agents.workflow.schemas import CategoryResult, EvaluationResult, FilterResult, SimpleWorkflowResult
+from agents.workflow.summarizer import MapReduceSummarizer
+from utils.llm_client import LLMClient
+from utils.llm_scheduler import RateLimitedScheduler
+from utils.logger import get_agent_logger
+from utils.tokens import count_tokens, truncate_to_tokens
+
+logger = get_agent_logger()
+
+
+class WorkflowValidationError(ValueError):
+    """单次调用的结构化输出不完整"""
+
+
+@dataclass
+class WorkflowStats:
+    """执行器统计"""
+    conversations: int = 0
+    kept: int = 0
+    single_calls: int = 0
+    staged_calls: int = 0
+    evaluations: int = 0
+    # 回退到分阶段模式的次数(按原因)
+    invalid_fallbacks: int = 0
+    low_score_fallbacks: int = 0
+    oversize_fallbacks: int = 0
+    # 预过滤器拒绝了全部记录、因此没有发起调用的对话数
+    prefiltered: int = 0
+
+
+class WorkflowExecutor:
+    """
+    工作流执行器: 默认单次调用, 必要时回退到分阶段 agent
+
+    Example:
+        >>> executor = WorkflowExecutor(get_llm_client(), evaluation=EvaluationSampler(rate=0.05))
+        >>> entry = await executor.run(conversation)
+        >>> executor.report()
+    """
+
+    def __init__(
+        self,
+        client: LLMClient,
+        scheduler: RateLimitedScheduler | None = None,
+        summarizer: MapReduceSummarizer | None = None,
+        prefilter: HeuristicPrefilter | None = None,
+        single_call_budget: int = 12000,
+        evaluation: EvaluationSampler | None = None
+    ):
+        """
+        Args:
+            client: LLM 客户端
+            scheduler: 请求调度器, 默认并发 5
+            summarizer: 分阶段模式使用的总结器
+            prefilter: 本地预过滤器, 被拒绝的记录不发送给 LLM
+            single_call_budget: 单次调用模式下对话内容的 token 上限, 超出时使用分阶段模式
+            evaluation: 评估抽样器, 为空时不评估; 未通过评估的结果回退到分阶段模式
+        """
+        self.client = client
+        self.scheduler = scheduler or RateLimitedScheduler(max_concurrency=5)
+        self.summarizer = summarizer or MapReduceSummarizer(client, scheduler=self.scheduler)
+        self.prefilter = prefilter
+        self.single_call_budget = single_call_budget
+        self.evaluation = evaluation
+        self.stats = WorkflowStats()
+
+    @property
+    def calls(self) -> int:
+        """LLM 调用总数(分阶段总结的调用由总结器统计)"""
+        stats = self.stats
+        return stats.single_calls + stats.staged_calls + stats.evaluations + self.summarizer.calls
+
+    @property
+    def calls_per_kept(self) -> float:
+        return self.calls / self.stats.kept if self.stats.kept else 0.0
+
+    async def _complete(self, schema, system_prompt: str, user_prompt: str):
+        messages = [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_prompt},
+        ]
+        return await self.scheduler.run(
+            lambda: self.client.astructured_completion(schema, messages),
+            tokens=count_tokens(system_prompt) + count_tokens(user_prompt)
+        )
+
+    def _prefilter(
+        self,
+        conversation: Conversation
+    ) -> tuple[Conversation, list[tuple[Mapping[str, str], PrefilterResult]]]:
+        """去掉预过滤器明确拒绝的记录, 同时返回需要由 LLM 判定的不确定记录及其预过滤结果"""
+        if self.prefilter is None:
+            return conversation, []
+        kept, ambiguous = [], []
+        for record in conversation:
+            result = self.prefilter.score(record)
+            if result.decision is not Decision.REJECT:
+                kept.append(record)
+            if result.decision is Decision.AMBIGUOUS:
+                ambiguous.append((record, result))
+        return Conversation(conversation.title, kept), ambiguous
+
+    def _learn(self, ambiguous: Sequence[tuple[Mapping[str, str], PrefilterResult]], is_valuable: bool) -> None:
+        """把 LLM 对整个对话的判定作为不确定记录的训练样本"""
+        for record, result in ambiguous:
+            self.prefilter.learn(record, is_valuable, result)
+
+    async def run_single(
+        self,
+        conversation: Conversation,
+        ambiguous: Sequence[tuple[Mapping[str, str], PrefilterResult]] = ()
+    ) -> KnowledgeEntry | None:
+        """
+        单次调用完成过滤、总结和分类
+
+        Args:
+            conversation: 对话窗口的问答记录
+            ambiguous: 预过滤不确定的记录及其预过滤结果, 用本次 is_valuable 判定训练预过滤分类器
+
+        Raises:
+            WorkflowValidationError: 判定有价值但缺少必要字段
+        """
+        self.stats.single_calls += 1
+        result: SimpleWorkflowResult = await self._complete(
+            SimpleWorkflowResult, SIMPLE_WORKFLOW_SYSTEM_PROMPT,
+            SIMPLE_WORKFLOW_USER_PROMPT_TEMPLATE.format(conversation=format_conversation(conversation))
+        )
+        self._learn(ambiguous, result.is_valuable)
+        if not result.is_valuable:
+            return None
+        missing = [name for name in ("summary", "categories") if not getattr(result, name)]
+        if missing:
+            raise WorkflowValidationError(f"Single-call result is missing {', '.join(missing)}")
+        return KnowledgeEntry(
+            title=result.title or conversation.title or conversation[0]["question"][:50],
+            content=result.summary,
+            categories=result.categories,
+            filename=result.suggested_filename,
+            source=conversation,
+        )
+
+    async def filter(self, conversation: Sequence[Mapping[str, str]]) -> FilterResult:
+        """分阶段: 过滤整个对话"""
+        self.stats.staged_calls += 1
+        return await self._complete(
+            FilterResult, FILTER_SYSTEM_PROMPT,
+            FILTER_USER_PROMPT_TEMPLATE.format(
+                conversation=truncate_to_tokens(format_conversation(conversation), self.single_call_budget))
+        )
+
+    async def categorize(self, entry: KnowledgeEntry) -> KnowledgeEntry:
+        """分阶段: 为条目分类并拟定标题和文件名"""
+        self.stats.staged_calls += 1
+        result: CategoryResult = await self._complete(
+            CategoryResult, CATEGORIZER_SYSTEM_PROMPT,
+            CATEGORIZER_USER_PROMPT_TEMPLATE.format(title=entry.title, content=truncate_to_tokens(entry.content, 4000))
+        )
+        entry.title = result.title or entry.title
+        entry.categories = result.categories
+        entry.filename = result.suggested_filename
+        return entry
+
+    async def evaluate(self, conversation: Conversation, entry: KnowledgeEntry) -> EvaluationResult:
+        """评估处理结果"""
+        self.stats.evaluations += 1
+        return await self._complete(
+            EvaluationResult, EVALUATOR_SYSTEM_PROMPT,
+            EVALUATOR_USER_PROMPT_TEMPLATE.format(
+                original=truncate_to_tokens(format_conversation(conversation), self.single_call_budget),
+                title=entry.title, categories=", ".join(entry.categories), filename=entry.filename,
+                content=entry.content)
+        )
+
+    async def run_staged(
+        self,
+        conversation: Conversation,
+        ambiguous: Sequence[tuple[Mapping[str, str], PrefilterResult]] = ()
+    ) -> KnowledgeEntry | None:
+        """分阶段: filter → summarize → categorize"""
+        verdict = await self.filter(conversation)
+        self._learn(ambiguous, verdict.is_valuable)
+        if not verdict.is_valuable:
+            return None
+        summary = await self.summarizer.summarize(conversation)
+        entry = KnowledgeEntry(
+            title=conversation.title or conversation[0]["question"][:50],
+            content=summary.summary,
+            source=conversation,
+        )
+        return await self.categorize(entry)
+
+    async def run(self, conversation: Conversation) -> KnowledgeEntry | None:
+        """
+        处理一个对话窗口
+
+        Args:
+            conversation: 对话窗口的问答记录
+
+        Returns:
+            知识库条目, 对话没有价值时返回 None
+        """
+        self.stats.conversations += 1
+        conversation, ambiguous = self._prefilter(conversation)
+        if not conversation:
+            self.stats.prefiltered += 1
+            return None
+
+        tokens = count_tokens(format_conversation(conversation))
+        if tokens > self.single_call_budget:
+            self.stats.oversize_fallbacks += 1
+            entry = await self.run_staged(conversation, ambiguous)
+        else:
+            try:
+                entry = await self.run_single(conversation, ambiguous)
+            except ValueError as e:
+                # 结构化输出解析/校验失败(OutputParserException 和 pydantic ValidationError 都是 ValueError)
+                logger.warning("Single-call workflow failed for '%s', falling back to staged agents: %r",
+                               conversation.title, e)
+                self.stats.invalid_fallbacks += 1
+                entry = await self.run_staged(conversation)
+            else:
+                if entry is not None and self.evaluation is not None \
+                        and self.evaluation.should_evaluate(conversation_key(conversation), entry, tokens):
+                    evaluation = await self.evaluate(conversation, entry)
+                    if not self.evaluation.record(entry, tokens, evaluation.score):
+                        logger.info("Single-call result for '%s' scored %d, falling back to staged agents",
+                                    conversation.title, evaluation.score)
+                        self.stats.low_score_fallbacks += 1
+                        entry = await self.run_staged(conversation)
+
+        if entry is not None:
+            self.stats.kept += 1
+        return entry
+
+    def report(self) -> dict:
+        """输出并返回执行统计"""
+        stats = self.stats
+        report = {
+            "conversations": stats.conversations,
+            "kept": stats.kept,
+            "calls": self.calls,
+            "calls_per_kept": self.calls_per_kept,
+            "invalid_fallbacks": stats.invalid_fallbacks,
+            "low_score_fallbacks": stats.low_score_fallbacks,
+            "oversize_fallbacks": stats.oversize_fallbacks,
+            "prefiltered": stats.prefiltered,
+        }
+        logger.info("Workflow processed %d conversations, kept %d with %d calls (%.2f per kept entry); "
+                    "fallbacks: %d invalid, %d low score, %d oversize",
+                    stats.conversations, stats.kept, self.calls, self.calls_per_kept,
+                    stats.invalid_fallbacks, stats.low_score_fallbacks, stats.oversize_fallbacks)
+        if self.evaluation is not None:
+            report["evaluation"] = self.evaluation.report()
+        return report
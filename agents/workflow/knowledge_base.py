@@ -0,0 +1,115 @@
+"""
+知识库条目与写入
+
+每个保留下来的对话窗口最终成为一个 Markdown 文件, 按第一个分类存放在知识库目录下.
+不同条目拟定了相同的文件名时自动追加序号, 不会互相覆盖.
+"""
+
+import os
+import re
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from agents.workflow.parser.core.record import Conversation
+from utils.logger import get_agent_logger
+
+if TYPE_CHECKING:
+    from agents.workflow.knowledge_index import KnowledgeIndex
+
+logger = get_agent_logger()
+
+_INVALID_PATH_CHARS = re.compile(r'[\\/:*?"<>|\x00-\x1f]+')
+# 写在文件末尾的条目键(HTML 注释, 渲染时不可见), 用于区分"同一条目重写"和"不同条目重名"
+_KEY_MARKER_RE = re.compile(r"<!-- kb-key: (\S+) -->")
+
+
+@dataclass
+class KnowledgeEntry:
+    """知识库条目: 总结后的对话内容及其分类信息"""
+    title: str
+    content: str
+    categories: list[str] = field(default_factory=list)
+    filename: str = ""
+    source: Conversation | None = None
+    # 检查点键和已完成的流水线阶段(断点续跑时使用)
+    key: str = ""
+    stage: str | None = None
+
+
+def sanitize_path_part(name: str, default: str = "untitled") -> str:
+    """清理文件名/目录名中的非法字符"""
+    name = _INVALID_PATH_CHARS.sub("-", name).strip(" .-")
+    return name or default
+
+
+class KnowledgeBaseWriter:
+    """
+    把知识库条目写成 Markdown 文件: <root>/<分类层级>/<文件名>.md
+    """
+
+    def __init__(self, root: str | Path, index: "KnowledgeIndex | None" = None):
+        """
+        Args:
+            root: 知识库根目录
+            index: 检索索引, 提供时每写入一个条目就增量索引
+        """
+        self.root = Path(root)
+        self.index = index
+        self.written = 0
+        # 本次运行中已写入的路径 -> 条目键
+        self._owners: dict[Path, str] = {}
+
+    def path_for(self, entry: KnowledgeEntry) -> Path:
+        """计算条目的保存路径, 分类 'A/B' 对应子目录 A/B"""
+        category = entry.categories[0] if entry.categories else "Uncategorized"
+        folder = self.root.joinpath(*(sanitize_path_part(part) for part in category.split("/") if part.strip()))
+        filename = sanitize_path_part(entry.filename or entry.title)
+        if not filename.endswith(".md"):
+            filename += ".md"
+        return folder / filename
+
+    def _owned_by(self, path: Path, key: str) -> bool:
+        """路径是否可以由该条目写入: 未被占用, 或者就是同一条目之前写入的"""
+        if path in self._owners:
+            return bool(key) and self._owners[path] == key
+        if not path.exists():
+            return True
+        match = _KEY_MARKER_RE.search(path.read_text(encoding="utf-8"))
+        return bool(key) and match is not None and match.group(1) == key
+
+    def unique_path_for(self, entry: KnowledgeEntry) -> Path:
+        """计算不与其他条目冲突的保存路径, 重名时追加 -2、-3 ..."""
+        path = self.path_for(entry)
+        candidate, n = path, 1
+        while not self._owned_by(candidate, entry.key):
+            n += 1
+            candidate = path.with_name(f"{path.stem}-{n}{path.suffix}")
+        if candidate != path:
+            logger.warning("Filename collision for '%s', writing to %s", entry.title, candidate.name)
+        return candidate
+
+    @staticmethod
+    def render(entry: KnowledgeEntry) -> str:
+        """渲染条目为 Markdown"""
+        lines = [f"# {entry.title}", ""]
+        if entry.categories:
+            lines += [f"> Categories: {', '.join(entry.categories)}", ""]
+        lines.append(entry.content.strip())
+        if entry.key:
+            lines += ["", f"<!-- kb-key: {entry.key} -->"]
+        return "\n".join(lines) + "\n"
+
+    def write(self, entry: KnowledgeEntry) -> Path:
+        """原子写入条目, 返回文件路径"""
+        path = self.unique_path_for(entry)
+        self._owners[path] = entry.key
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(path.suffix + ".tmp")
+        tmp_path.write_text(self.render(entry), encoding="utf-8")
+        os.replace(tmp_path, path)
+        if self.index is not None:
+            self.index.add(entry, path)
+        self.written += 1
+        logger.info("Wrote knowledge base entry: %s", path)
+        return path
@@ -0,0 +1,265 @@
+"""
+知识库本地检索索引
+
+知识库条目写入时增量建立索引, 索引目录结构:
+    embeddings.f32   追加写入的 float32 向量矩阵, 查询时以内存映射方式读取
+    entries.jsonl    与向量逐行对应的条目元数据(路径、标题、分类)
+    meta.json        向量化器名称和维度
+    embedder.npz     向量化器状态(TF-IDF 文档频率), 重新打开索引后查询与入库使用同样的 IDF
+
+查询时对内存映射矩阵分块做矩阵-向量乘法(BLAS/SIMD 暴力检索, 结果精确),
+再结合标题/分类倒排索引的关键词得分排序; 十万条、数百维的索引单次查询在几十毫秒以内.
+"""
+
+import os
+import re
+from collections import defaultdict
+from collections.abc import Sequence
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+
+from agents.workflow.clustering import get_embedder
+from agents.workflow.dedup import normalize_text
+from agents.workflow.knowledge_base import KnowledgeEntry
+from utils import json_codec
+from utils.logger import get_agent_logger
+
+logger = get_agent_logger()
+
+_TOKEN_RE = re.compile(r"[a-z0-9_+#]+|[\u4e00-\u9fff]+")
+
+# 分块检索的行数, 控制临时内存占用
+_SEARCH_BLOCK_ROWS = 1 << 16
+
+
+def keyword_tokens(text: str) -> set[str]:
+    """关键词切分: 英文单词 + 中文二元组(单个汉字保留原样)"""
+    tokens = set()
+    for match in _TOKEN_RE.findall(normalize_text(text)):
+        if match.isascii() or len(match) == 1:
+            tokens.add(match)
+        else:
+            tokens.update(match[i:i + 2] for i in range(len(match) - 1))
+    return tokens
+
+
+def category_prefixes(category: str) -> list[str]:
+    """分类 'A/B/C' 的各级前缀: ['a', 'a/b', 'a/b/c']"""
+    parts = [part.strip() for part in normalize_text(category).split("/") if part.strip()]
+    return ["/".join(parts[:i]) for i in range(1, len(parts) + 1)]
+
+
+@dataclass
+class SearchResult:
+    """检索结果"""
+    path: str
+    title: str
+    categories: list[str]
+    score: float
+
+
+class KnowledgeIndex:
+    """
+    向量 + 关键词混合检索索引
+
+    Example:
+        >>> index = KnowledgeIndex("knowledge_base/.index")
+        >>> writer = KnowledgeBaseWriter("knowledge_base", index=index)
+        >>> index.search("asyncio 并发", k=5, category="Programming")
+    """
+
+    def __init__(self, root: str | Path, embedder=None):
+        """
+        Args:
+            root: 索引目录
+            embedder: 向量化器, 默认通过 get_embedder() 获取(TF-IDF 回退使用 1024 维)
+        """
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.embedder = embedder or get_embedder(fallback_dim=1024)
+        self._vectors_path = self.root / "embeddings.f32"
+        self._entries_path = self.root / "entries.jsonl"
+        self._meta_path = self.root / "meta.json"
+        self._embedder_state_path = self.root / "embedder.npz"
+        self.dim: int | None = None
+        self.entries: list[dict] = []
+        self._alive = bytearray()
+        self._row_by_path: dict[str, int] = {}
+        self._postings: dict[str, list[int]] = defaultdict(list)
+        self._categories: dict[str, list[int]] = defaultdict(list)
+        # 倒排表转换为 NumPy 数组的缓存, 倒排表变长后重新转换
+        self._arrays: dict[tuple[str, str], np.ndarray] = {}
+        self._matrix: np.ndarray | None = None
+        self._load()
+
+    def __len__(self) -> int:
+        """有效(未被覆盖)的条目数"""
+        return len(self._row_by_path)
+
+    def _load(self) -> None:
+        if not self._meta_path.exists():
+            return
+        meta = json_codec.load(self._meta_path)
+        if meta["embedder"] != self.embedder.name:
+            raise ValueError(
+                f"Index at {self.root} was built with embedder '{meta['embedder']}', "
+                f"not '{self.embedder.name}'; remove the directory to rebuild it"
+            )
+        self.dim = meta["dim"]
+        if hasattr(self.embedder, "load_state_dict") and self._embedder_state_path.exists():
+            with np.load(self._embedder_state_path, allow_pickle=False) as state:
+                self.embedder.load_state_dict(state)
+        records = []
+        if self._entries_path.exists():
+            with open(self._entries_path, "rb") as f:
+                records = [json_codec.loads(line) for line in f if line.strip()]
+        row_bytes = self.dim * 4
+        rows = self._vectors_path.stat().st_size // row_bytes if self._vectors_path.exists() else 0
+        count = min(rows, len(records))
+        if rows != count or len(records) != count:
+            # 写入中途崩溃: 截断到向量和元数据都完整的行
+            logger.warning("Index at %s was not closed cleanly, keeping %d complete entries", self.root, count)
+            if self._vectors_path.exists():
+                with open(self._vectors_path, "r+b") as f:
+                    f.truncate(count * row_bytes)
+            with open(self._entries_path, "w", encoding="utf-8") as f:
+                f.writelines(json_codec.dumps(record) + "\n" for record in records[:count])
+        for record in records[:count]:
+            self._register(record)
+        logger.info("Loaded knowledge index with %d entries from %s", len(self), self.root)
+
+    def _register(self, record: dict) -> None:
+        """更新内存中的元数据和倒排索引; 同一路径的旧条目标记为失效"""
+        row = len(self.entries)
+        self.entries.append(record)
+        self._alive.append(1)
+        previous = self._row_by_path.get(record["path"])
+        if previous is not None:
+            self._alive[previous] = 0
+        self._row_by_path[record["path"]] = row
+        for token in keyword_tokens(" ".join([record["title"], *record["categories"]])):
+            self._postings[token].append(row)
+        for prefix in {prefix for category in record["categories"] for prefix in category_prefixes(category)}:
+            self._categories[prefix].append(row)
+
+    def add(self, entry: KnowledgeEntry, path: str | Path) -> None:
+        """索引单个已写入的条目"""
+        self.add_many([(entry, path)])
+
+    def add_many(self, items: Sequence[tuple[KnowledgeEntry, str | Path]]) -> None:
+        """
+        批量索引已写入的条目(同一路径再次写入时新条目覆盖旧条目)
+
+        Args:
+            items: [(条目, 文件路径), ...]
+        """
+        if not items:
+            return
+        texts = [f"{entry.title}\n{' '.join(entry.categories)}\n{entry.content}" for entry, _ in items]
+        vectors = np.ascontiguousarray(self.embedder.embed(texts), dtype=np.float32)
+        if self.dim is None:
+            self.dim = vectors.shape[1]
+            json_codec.dump({"embedder": self.embedder.name, "dim": self.dim}, self._meta_path)
+        records = [
+            {"path": str(path), "title": entry.title, "categories": list(entry.categories)}
+            for entry, path in items
+        ]
+        # 先写向量再写元数据, 加载时以两者都完整的行为准
+        with open(self._vectors_path, "ab") as f:
+            f.write(vectors.tobytes())
+        with open(self._entries_path, "a", encoding="utf-8") as f:
+            f.writelines(json_codec.dumps(record) + "\n" for record in records)
+        for record in records:
+            self._register(record)
+        self._matrix = None
+        self._save_embedder_state()
+
+    def _save_embedder_state(self) -> None:
+        """原子写入向量化器状态(没有状态的向量化器跳过)"""
+        if not hasattr(self.embedder, "state_dict"):
+            return
+        tmp_path = self._embedder_state_path.with_suffix(".tmp")
+        with open(tmp_path, "wb") as f:
+            np.savez(f, **self.embedder.state_dict())
+        os.replace(tmp_path, self._embedder_state_path)
+
+    def _vectors(self) -> np.ndarray:
+        """以内存映射方式打开向量矩阵(新增条目后重新映射)"""
+        if self._matrix is None or len(self._matrix) != len(self.entries):
+            self._matrix = np.memmap(self._vectors_path, dtype=np.float32, mode="r",
+                                     shape=(len(self.entries), self.dim))
+        return self._matrix
+
+    def _rows(self, table: str, key: str) -> np.ndarray | None:
+        """读取倒排表(NumPy 数组形式)"""
+        rows = (self._postings if table == "token" else self._categories).get(key)
+        if not rows:
+            return None
+        cached = self._arrays.get((table, key))
+        if cached is None or len(cached) != len(rows):
+            cached = self._arrays[(table, key)] = np.asarray(rows, dtype=np.int64)
+        return cached
+
+    def _candidates(self, category: str | None) -> np.ndarray:
+        mask = np.frombuffer(self._alive, dtype=np.bool_).copy()
+        if category is not None:
+            allowed = np.zeros(len(mask), dtype=np.bool_)
+            prefixes = category_prefixes(category)
+            rows = self._rows("category", prefixes[-1]) if prefixes else None
+            if rows is not None:
+                allowed[rows] = True
+            mask &= allowed
+        return mask
+
+    def search(
+        self,
+        query: str,
+        k: int = 10,
+        category: str | None = None,
+        keyword_weight: float = 0.3
+    ) -> list[SearchResult]:
+        """
+        混合检索
+
+        Args:
+            query: 查询文本
+            k: 返回结果数
+            category: 只在该分类(含子分类)下检索
+            keyword_weight: 标题/分类关键词得分的权重, 其余为向量相似度
+
+        Returns:
+            按得分降序排列的结果
+        """
+        if not self.entries or k <= 0:
+            return []
+        mask = self._candidates(category)
+        if not mask.any():
+            return []
+
+        vector = np.ascontiguousarray(self.embedder.embed([query], update=False)[0], dtype=np.float32)
+        matrix = self._vectors()
+        scores = np.empty(len(matrix), dtype=np.float32)
+        for start in range(0, len(matrix), _SEARCH_BLOCK_ROWS):
+            block = matrix[start:start + _SEARCH_BLOCK_ROWS]
+            scores[start:start + len(block)] = block @ vector
+
+        tokens = keyword_tokens(query)
+        if tokens and keyword_weight:
+            hits = np.zeros(len(scores), dtype=np.float32)
+            for token in tokens:
+                rows = self._rows("token", token)
+                if rows is not None:
+                    hits[rows] += 1
+            scores = (1 - keyword_weight) * scores + keyword_weight * (hits / len(tokens))
+
+        scores[~mask] = -np.inf
+        k = min(k, int(mask.sum()))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [
+            SearchResult(self.entries[row]["path"], self.entries[row]["title"],
+                         self.entries[row]["categories"], float(scores[row]))
+            for row in top
+        ]
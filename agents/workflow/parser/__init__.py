@@ -1,10 +1,16 @@
-from typing import Any
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from pathlib import Path
+from typing import Any, Iterator
 from .core.factory import ParserFactory
+from .core.record import ChatRecord, Conversation
 from .exceptions import UnsupportedPlatformError
+from utils import json_codec
 from utils.logger import get_tool_logger
 
 logger = get_tool_logger()
-def parse_chat_data(raw_data: Any, platform_name: str) -> list[list[dict[str, str]]]:
+def parse_chat_data(raw_data: Any, platform_name: str) -> list[Conversation]:
     """
     工作流节点入口函数
     
@@ -13,7 +19,7 @@ def parse_chat_data(raw_data: Any, platform_name: str) -> list[list[dict[str, st
         platform_name: 平台名称 (例如 "qwen")
 
     Returns:
-        标准化后的二维对话数组
+        标准化后的二维对话数组 (记录为 ChatRecord, 可通过 to_dict() 转为字典)
         
     Example:
         >>> data = {"success": True, "data": [...]}
@@ -37,4 +43,109 @@ def parse_chat_data(raw_data: Any, platform_name: str) -> list[list[dict[str, st
     except Exception as e:
         # 捕获其他未知异常（如JSON结构错误导致的KeyError）
         logger.error(f"An unexpected error occurred during parsing: {e}")
-        raise e
\ No newline at end of file
+        raise e
+
+
+def iter_chat_file(file_path: str | Path, platform_name: str) -> Iterator[Conversation]:
+    """
+    流式解析入口: 逐个产出对话窗口的记录列表, 适用于几百 MB 的全量导出文件
+
+    Args:
+        file_path: 导出的 JSON 文件路径
+        platform_name: 平台名称 (例如 "qwen")
+
+    Yields:
+        单个对话窗口的标准化记录列表
+
+    Example:
+        >>> for conversation in iter_chat_file("qwen_total.json", "qwen"):
+        ...     handle(conversation)
+    """
+    logger.info("=== Begin stream parse chat file: %s ===", file_path)
+    parser = ParserFactory.get_parser(platform_name)
+    total = 0
+    for records in parser.iter_parse_file(file_path):
+        total += len(records)
+        yield records
+    logger.info("stream parse total %d conversations", total)
+    logger.info("=== End stream parse chat file ===")
+
+
+
+def parse_chat_file(file_path: str | Path, platform_name: str) -> list[Conversation]:
+    """
+    读取并解析单个导出文件
+
+    Args:
+        file_path: 导出的 JSON 文件路径
+        platform_name: 平台名称 (例如 "qwen")
+
+    Returns:
+        该文件中所有对话窗口的记录列表
+    """
+    raw_data = json_codec.load(file_path)
+    return ParserFactory.get_parser(platform_name).parse(raw_data)
+
+
+def _parse_chat_file_safe(file_path: Path, platform_name: str) -> tuple[list[Conversation], str | None]:
+    """进程池工作函数: 单个文件解析失败时返回错误信息而不是中断整个批次"""
+    try:
+        return parse_chat_file(file_path, platform_name), None
+    except Exception as e:
+        return [], f"{type(e).__name__}: {e}"
+
+
+def discover_chat_files(directory: str | Path, pattern: str = "*.json") -> list[Path]:
+    """
+    递归查找目录(包括分组子目录)下的导出文件, 按路径排序以保证结果顺序稳定
+    """
+    return sorted(path for path in Path(directory).rglob(pattern) if path.is_file())
+
+
+def parse_chat_dir(
+    directory: str | Path,
+    platform_name: str,
+    max_workers: int | None = None,
+    chunksize: int | None = None,
+    pattern: str = "*.json",
+) -> list[Conversation]:
+    """
+    目录级解析入口: 使用进程池并行解析下载目录中的所有导出文件
+
+    Args:
+        directory: 下载目录 (例如 crawler 的 download_dir)
+        platform_name: 平台名称 (例如 "qwen")
+        max_workers: 进程数, 默认使用全部 CPU 核心
+        chunksize: 每次分发给子进程的文件数, 默认按进程数自动计算
+        pattern: 导出文件匹配模式
+
+    Returns:
+        所有文件的对话窗口列表, 按文件路径顺序合并, 每次运行结果顺序一致
+    """
+    ParserFactory.get_parser(platform_name)  # 提前校验平台, 避免在子进程中才报错
+    files = discover_chat_files(directory, pattern)
+    logger.info("=== Begin parse chat dir: %s (%d files) ===", directory, len(files))
+    max_workers = max_workers or os.cpu_count() or 1
+    worker = partial(_parse_chat_file_safe, platform_name=platform_name)
+    if max_workers <= 1 or len(files) <= 1:
+        results = map(worker, files)
+        parsed = _merge_results(files, results)
+    else:
+        chunksize = chunksize or max(1, len(files) // (max_workers * 4))
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            # executor.map 按提交顺序返回结果, 保证合并顺序确定
+            parsed = _merge_results(files, executor.map(worker, files, chunksize=chunksize))
+    logger.info("parse total %d conversations from %d files", sum(len(conv) for conv in parsed), len(files))
+    logger.info("=== End parse chat dir ===")
+    return parsed
+
+
+def _merge_results(files: list[Path], results) -> list[Conversation]:
+    """按文件顺序合并解析结果, 记录解析失败的文件"""
+    merged: list[Conversation] = []
+    for file_path, (conversations, error) in zip(files, results):
+        if error is not None:
+            logger.error("Failed to parse %s: %s", file_path, error)
+            continue
+        merged.extend(conversations)
+    return merged
@@ -1,14 +1,21 @@
 from abc import ABC, abstractmethod
-from typing import Any
+from pathlib import Path
+from typing import Any, Iterator
+
+from .record import ChatRecord, Conversation
+from ..utils.json_stream import iter_json_array
 
 class BaseParser(ABC):
     """
     解析器抽象基类
     所有平台的解析器必须继承此类并实现 parse 方法
+    需要流式解析时还需实现 parse_conversation 方法
     """
+    # 导出文件顶层为对象时, 对话窗口列表所在的字段名
+    stream_key: str | None = None
 
     @abstractmethod
-    def parse(self, raw_data: Any) -> list[list[dict[str, str]]]:
+    def parse(self, raw_data: Any) -> list[Conversation]:
         """
         解析原始 JSON 数据，转换为标准格式
 
@@ -16,7 +23,7 @@ class BaseParser(ABC):
             raw_data: 原始 JSON 数据 (dict 或 list)
 
         Returns:
-            list[list[dict[str, str]]]: 标准二维数组结构
+            list[Conversation]: 标准二维数组结构, 记录为 ChatRecord, 可按字典方式访问
             [
                 [
                     {"title": "标题1", "question": "问题1", "answer": "回答1"},
@@ -27,10 +34,37 @@ class BaseParser(ABC):
         """
         pass
 
-    def _format_conversation(self, title: str, question: str, answer: str) -> dict[str, str]:
-        """辅助方法：格式化单条对话记录"""
-        return {
-            "title": title,
-            "question": question,
-            "answer": answer
-        }
\ No newline at end of file
+    def parse_conversation(self, conv: Any) -> Conversation:
+        """
+        解析单个对话窗口
+
+        Args:
+            conv: 单个对话窗口的原始数据
+
+        Returns:
+            Conversation: 该对话窗口的记录列表, 没有有效问答时为空列表
+        """
+        raise NotImplementedError(f"{type(self).__name__} does not support streaming parse")
+
+    def iter_parse_file(self, file_path: str | Path) -> Iterator[Conversation]:
+        """
+        流式解析导出文件, 每次产出一个对话窗口的记录列表
+        内存占用只与单个对话窗口的大小有关, 与导出文件大小无关
+
+        Args:
+            file_path: 导出的 JSON 文件路径
+
+        Yields:
+            Conversation: 单个对话窗口的记录列表(跳过没有有效问答的窗口)
+        """
+        for conv in iter_json_array(file_path, self.stream_key):
+            records = self.parse_conversation(conv)
+            if records:
+                yield records
+
+    def _format_conversation(self, title: str, question: str, answer: str) -> ChatRecord:
+        """
+        辅助方法：格式化单条对话记录
+        title 应传入 Conversation.title, 使同一窗口内的记录共享同一个标题对象
+        """
+        return ChatRecord(title, question, answer)
@@ -0,0 +1,55 @@
+import sys
+from collections.abc import Iterator, Mapping
+
+
+class ChatRecord(Mapping):
+    """
+    单条问答记录
+    使用 __slots__ 存储三个字段, 每条记录的内存占用远小于 dict;
+    同时实现只读 Mapping 接口, 原有 record["question"]、dict(record) 等用法保持可用
+    """
+    __slots__ = ("title", "question", "answer")
+    _fields = ("title", "question", "answer")
+
+    def __init__(self, title: str, question: str, answer: str):
+        self.title = title
+        self.question = question
+        self.answer = answer
+
+    def __getitem__(self, key: str) -> str:
+        if key in self._fields:
+            return getattr(self, key)
+        raise KeyError(key)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._fields)
+
+    def __len__(self) -> int:
+        return len(self._fields)
+
+    def __repr__(self) -> str:
+        return f"ChatRecord(title={self.title!r}, question={self.question!r}, answer={self.answer!r})"
+
+    def to_dict(self) -> dict[str, str]:
+        """转换为原有的字典结构 {"title", "question", "answer"}"""
+        return {"title": self.title, "question": self.question, "answer": self.answer}
+
+
+class Conversation(list):
+    """
+    单个对话窗口的记录列表
+    标题只在对话窗口级别驻留(intern)一次, 窗口内所有记录共享同一个标题字符串对象
+    """
+    __slots__ = ("title",)
+
+    def __init__(self, title: str = "", records=()):
+        super().__init__(records)
+        self.title = sys.intern(title or "")
+
+    def __reduce__(self):
+        # 跨进程传输(pickle)后重新驻留标题
+        return type(self), (self.title, list(self))
+
+    def to_dicts(self) -> list[dict[str, str]]:
+        """转换为原有的字典列表结构"""
+        return [record.to_dict() for record in self]
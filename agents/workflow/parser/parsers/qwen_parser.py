@@ -1,10 +1,14 @@
 # 为了能导入父级目录的模块，通常在包结构中直接import即可
 # 这里为了演示导入路径，假设是在包内运行
 from ..core.base import BaseParser
+from ..core.record import Conversation
 from ..utils.text_handler import clean_title
 
 class QwenParser(BaseParser):
-    def parse(self, raw_data) -> list[list[dict[str, str]]]:
+    # Qwen 全量导出中对话窗口列表所在字段
+    stream_key = "data"
+
+    def parse(self, raw_data) -> list[Conversation]:
         """
         解析 Qwen 导出数据
         期望输入格式:
@@ -13,10 +17,20 @@ class QwenParser(BaseParser):
         >>> [{...}]
         输出格式:
         >>> [[{"title": "对话窗口标题", "question": "用户问题", "answer": "助手回答"}]]
+        (记录为 ChatRecord, 可通过 to_dict() 转为上述字典)
         """
         standard_result = []
 
         # 1. 获取对话窗口列表
+        for conv in self._extract_conversations(raw_data):
+            current_conv_records = self.parse_conversation(conv)
+            if current_conv_records:
+                standard_result.append(current_conv_records)
+
+        return standard_result
+
+    def _extract_conversations(self, raw_data) -> list[dict]:
+        """获取对话窗口列表"""
         # 例如：conversations = raw_data.get("data", [])
         # 情况1: 直接包含所有对话窗口
         if isinstance(raw_data, dict):
@@ -28,47 +42,46 @@ class QwenParser(BaseParser):
             conversations = raw_data
         else:
             raise ValueError("Invalid Qwen data format: expected dict or list")
-        for conv in conversations:
-            # 初始化当前对话窗口的结果列表
-            current_conv_records = []
-            
-            # 2. 获取当前对话的标题
-            # 例如：title = conv.get("title", "")
-            # if "默认标题" in title: title = ""
-            title: str = conv["title"]
-            if title is None or title.find("新聊天")!=-1:
-                title = ""
+        return conversations
 
-            # 3. 获取当前对话的消息列表
-            # 例如：messages = conv.get("content_list", [])
-            messages: list[dict] = conv["chat"]["messages"]
-            question: str | None = None
-            answer: str | None = None
-            for msg in messages:
-                # 4. 提取 Question 和 Answer
-                # 根据 msg 中的 role (user/assistant) 来区分
-                # 这里假设问答是配对的
-                if msg["role"] == "user":
-                    question = msg["content"]
-                    continue
-                # 考虑回复出错的情况
-                if msg["error"] is not None:
-                    # 跳过当前问答对
-                    question = None
-                    continue
-                answer = msg.get("content", "")
-                if answer is None or len(answer) == 0:
-                    # 有可能不在content_list字段, 尝试直接从content字段获取
-                    # 从content_list中提取第一个content
-                    answer = msg.get("content_list", [{}])[0].get("content", None)
-                
-                if question and answer:
-                    # 将单条记录加入当前对话窗口
-                    record = self._format_conversation(title, question, answer)
-                    current_conv_records.append(record)
-                    question, answer = None, None
-            
-            if current_conv_records:
-                standard_result.append(current_conv_records)
+    def parse_conversation(self, conv: dict) -> Conversation:
+        """解析单个 Qwen 对话窗口"""
+        # 2. 获取当前对话的标题
+        # 例如：title = conv.get("title", "")
+        # if "默认标题" in title: title = ""
+        title: str = conv["title"]
+        if title is None or title.find("新聊天")!=-1:
+            title = ""
+        # 初始化当前对话窗口的结果列表(标题在此驻留一次)
+        current_conv_records = Conversation(title)
+
+        # 3. 获取当前对话的消息列表
+        # 例如：messages = conv.get("content_list", [])
+        messages: list[dict] = conv["chat"]["messages"]
+        question: str | None = None
+        answer: str | None = None
+        for msg in messages:
+            # 4. 提取 Question 和 Answer
+            # 根据 msg 中的 role (user/assistant) 来区分
+            # 这里假设问答是配对的
+            if msg["role"] == "user":
+                question = msg["content"]
+                continue
+            # 考虑回复出错的情况
+            if msg["error"] is not None:
+                # 跳过当前问答对
+                question = None
+                continue
+            answer = msg.get("content", "")
+            if answer is None or len(answer) == 0:
+                # 有可能不在content_list字段, 尝试直接从content字段获取
+                # 从content_list中提取第一个content
+                answer = msg.get("content_list", [{}])[0].get("content", None)
+
+            if question and answer:
+                # 将单条记录加入当前对话窗口
+                record = self._format_conversation(current_conv_records.title, question, answer)
+                current_conv_records.append(record)
+                question, answer = None, None
 
-        return standard_result
\ No newline at end of file
+        return current_conv_records
@@ -0,0 +1,133 @@
+import json
+from pathlib import Path
+from typing import Any, Iterator, TextIO
+
+_WHITESPACE = " \t\n\r"
+_TERMINATORS = _WHITESPACE + ",]}"
+_decoder = json.JSONDecoder()
+
+
+class _StreamReader:
+    """
+    基于 JSONDecoder.raw_decode 的增量读取器
+    只在缓冲区中保留尚未消费的文本, 单个值不完整时成倍扩大读取量后重试
+    """
+
+    def __init__(self, fp: TextIO, chunk_size: int):
+        self.fp = fp
+        self.chunk_size = chunk_size
+        self.buffer = ""
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self, size: int | None = None) -> bool:
+        """读取更多文本并丢弃已消费部分, 到达文件末尾时返回 False"""
+        if self.eof:
+            return False
+        chunk = self.fp.read(size or self.chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+        self.buffer = self.buffer[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self) -> str:
+        """跳过空白并返回下一个字符, 文件结束时返回空字符串"""
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self._fill():
+                return ""
+
+    def expect(self, char: str) -> None:
+        """消费一个指定的结构字符"""
+        found = self.peek()
+        if found != char:
+            raise ValueError(f"Invalid JSON stream: expected {char!r}, got {found!r}")
+        self.pos += 1
+
+    def decode_value(self) -> Any:
+        """解码下一个完整的 JSON 值"""
+        self.peek()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                if self._fill(max(self.chunk_size, len(self.buffer))):
+                    continue
+                raise
+            # 值恰好结束在缓冲区末尾, 或数字后紧跟的不是分隔符(如 "-1." 被截断)时,
+            # 值可能不完整, 读取更多后重新解码
+            truncated = end == len(self.buffer) or (
+                isinstance(value, (int, float)) and self.buffer[end] not in _TERMINATORS
+            )
+            if truncated and self._fill():
+                continue
+            self.pos = end
+            return value
+
+    def iter_array(self) -> Iterator[Any]:
+        """逐个产出当前位置数组中的元素"""
+        self.expect("[")
+        if self.peek() == "]":
+            self.pos += 1
+            return
+        while True:
+            yield self.decode_value()
+            char = self.peek()
+            self.pos += 1
+            if char == "]":
+                return
+            if char != ",":
+                raise ValueError(f"Invalid JSON stream: expected ',' or ']', got {char!r}")
+
+
+def iter_json_array(source: str | Path | TextIO, key: str | None = None,
+                    chunk_size: int = 1 << 16) -> Iterator[Any]:
+    """
+    流式读取 JSON 数组元素, 内存占用只与单个元素大小有关
+
+    Args:
+        source: 文件路径或文本文件对象
+        key: 顶层为对象时, 要读取的数组字段名 (例如 Qwen 全量导出的 "data")
+        chunk_size: 每次读取的字符数
+
+    Yields:
+        数组中的元素, 顶层为数组时直接产出其元素
+
+    Raises:
+        ValueError: 顶层结构不是数组, 或顶层对象中不存在 key 指定的数组
+    """
+    if isinstance(source, (str, Path)):
+        with open(source, "r", encoding="utf-8") as f:
+            yield from iter_json_array(f, key, chunk_size)
+        return
+
+    reader = _StreamReader(source, chunk_size)
+    first = reader.peek()
+    if first == "[":
+        yield from reader.iter_array()
+        return
+    if first != "{" or key is None:
+        raise ValueError("Invalid JSON stream: expected an array at top level")
+
+    reader.expect("{")
+    while True:
+        char = reader.peek()
+        if char == "}" or char == "":
+            raise ValueError(f"Invalid JSON stream: missing '{key}' key")
+        if char == ",":
+            reader.pos += 1
+            continue
+        name = reader.decode_value()
+        reader.expect(":")
+        if name == key:
+            if reader.peek() != "[":
+                raise ValueError(f"Invalid JSON stream: '{key}' is not an array")
+            yield from reader.iter_array()
+            return
+        # 跳过无关字段
+        reader.decode_value()
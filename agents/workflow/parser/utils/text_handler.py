@@ -17,4 +17,22 @@ def clean_title(title):
     if not title:
         return ""
     # 这里可以添加更多清洗逻辑
-    return title.strip()
\ No newline at end of file
+    return title.strip()
+
+def format_record(record, with_title: bool = True) -> str:
+    """把单条问答记录渲染为提示词中的文本"""
+    lines = []
+    if with_title and record["title"]:
+        lines.append(f"Title: {record['title']}")
+    lines.append(f"User: {record['question']}")
+    lines.append(f"Assistant: {record['answer']}")
+    return "\n".join(lines)
+
+
+def format_conversation(records) -> str:
+    """把一个对话窗口的记录渲染为提示词中的 {conversation} 文本"""
+    if not records:
+        return ""
+    title = records[0]["title"]
+    body = "\n\n".join(format_record(record, with_title=False) for record in records)
+    return f"Title: {title}\n\n{body}" if title else body
@@ -0,0 +1,631 @@
+"""
+端到端异步流水线: crawl → parse → dedup → filter → summarize → categorize → write
+
+各阶段通过有界 asyncio 队列相连: 第一个文件下载完成后立即开始解析, LLM 阶段与爬取同时进行;
+队列满时上游自动等待(背压), 内存占用有上界. 整体耗时接近最慢阶段的耗时, 而不是各阶段之和.
+运行结束后输出每个阶段的吞吐量和利用率, 便于定位瓶颈.
+"""
+
+import asyncio
+import time
+from collections.abc import AsyncIterable, AsyncIterator, Awaitable, Callable, Iterable, Mapping
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+from agents.workflow.batch_filter import BatchFilter
+from agents.workflow.checkpoint import (
+    CATEGORIZED,
+    DOWNLOADED,
+    DROPPED,
+    FILTERED,
+    PARSED,
+    SUMMARIZED,
+    WRITTEN,
+    CheckpointStore,
+    conversation_key,
+    crawl_key,
+    file_key,
+    file_signature,
+    stage_reached,
+)
+from agents.workflow.dedup import RecordDeduplicator, record_hash
+from agents.workflow.evaluation import EvaluationSampler
+from agents.workflow.executor import WorkflowExecutor
+from agents.workflow.knowledge_base import KnowledgeBaseWriter, KnowledgeEntry
+from agents.workflow.parser import discover_chat_files, parse_chat_file
+from agents.workflow.parser.core.record import Conversation
+from agents.workflow.prefilter import HeuristicPrefilter
+from agents.workflow.summarizer import MapReduceSummarizer
+from utils.llm_client import LLMClient
+from utils.llm_scheduler import RateLimitedScheduler
+from utils.logger import get_agent_logger
+
+if TYPE_CHECKING:
+    from agents.workflow.clustering import TopicClusterer
+    from agents.workflow.knowledge_index import KnowledgeIndex
+
+logger = get_agent_logger()
+
+# 队列结束标记
+_STOP = object()
+
+# 阶段处理函数: 返回 awaitable(结果为 None 时丢弃该项) 或异步生成器(一进多出)
+Handler = Callable[[Any], Awaitable[Any] | AsyncIterator[Any]]
+
+
+async def iter_async[T](source: AsyncIterable[T] | Iterable[T]) -> AsyncIterator[T]:
+    """把同步或异步可迭代对象统一为异步迭代器"""
+    if hasattr(source, "__aiter__"):
+        async for item in source:
+            yield item
+    else:
+        for item in source:
+            yield item
+
+
+@dataclass
+class StageStats:
+    """单个阶段的运行统计"""
+    name: str
+    workers: int
+    items_in: int = 0
+    items_out: int = 0
+    errors: int = 0
+    busy: float = 0.0
+    started: float | None = None
+    finished: float | None = None
+
+    @property
+    def elapsed(self) -> float:
+        if self.started is None:
+            return 0.0
+        return (self.finished or time.perf_counter()) - self.started
+
+    @property
+    def throughput(self) -> float:
+        """每秒处理的输入项数"""
+        return self.items_in / self.elapsed if self.elapsed else 0.0
+
+    @property
+    def utilization(self) -> float:
+        """worker 忙碌时间占比, 接近 1 说明该阶段是瓶颈"""
+        return self.busy / (self.elapsed * self.workers) if self.elapsed else 0.0
+
+
+class Stage:
+    """流水线阶段"""
+
+    def __init__(
+        self,
+        name: str,
+        handler: Handler,
+        workers: int = 1,
+        queue_size: int = 64,
+        batch_size: int = 1,
+        batch_wait: float = 1.0
+    ):
+        """
+        Args:
+            name: 阶段名称
+            handler: 处理函数
+            workers: 并发 worker 数
+            queue_size: 输入队列容量(背压上限)
+            batch_size: 大于 1 时按批处理, handler 接收输入项列表
+            batch_wait: 凑批的最长等待秒数, 超时后处理已收到的部分
+        """
+        self.name = name
+        self.handler = handler
+        self.workers = workers
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self.batch_wait = batch_wait
+
+    async def outputs(self, item: Any) -> AsyncIterator[Any]:
+        """统一普通协程和异步生成器两种处理函数的输出"""
+        result = self.handler(item)
+        if hasattr(result, "__aiter__"):
+            async for output in result:
+                yield output
+            return
+        output = await result
+        if output is not None:
+            yield output
+
+
+class Pipeline:
+    """
+    由有界队列串联的多阶段异步流水线
+
+    Example:
+        >>> pipeline = Pipeline([Stage("parse", parse, workers=2), Stage("write", write)])
+        >>> await pipeline.run(paths)
+        >>> pipeline.report()
+    """
+
+    def __init__(self, stages: list[Stage]):
+        if not stages:
+            raise ValueError("Pipeline needs at least one stage")
+        self.stages = stages
+        self.source_stats = StageStats("source", workers=1)
+        self.stats = [StageStats(stage.name, stage.workers) for stage in stages]
+
+    async def _feed(self, source: AsyncIterable | Iterable, queue: asyncio.Queue) -> None:
+        stats = self.source_stats
+        stats.started = time.perf_counter()
+        async for item in iter_async(source):
+            stats.items_out += 1
+            await queue.put(item)
+        stats.finished = time.perf_counter()
+        for _ in range(self.stages[0].workers):
+            await queue.put(_STOP)
+
+    @staticmethod
+    async def _receive(stage: Stage, inbox: asyncio.Queue) -> tuple[Any, bool]:
+        """读取下一个输入项, 返回 (输入项, 是否已收到结束标记); 批处理阶段的输入项是列表"""
+        item = await inbox.get()
+        if item is _STOP:
+            return None, True
+        if stage.batch_size <= 1:
+            return item, False
+        batch = [item]
+        deadline = time.monotonic() + stage.batch_wait
+        while len(batch) < stage.batch_size:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                item = await asyncio.wait_for(inbox.get(), timeout)
+            except TimeoutError:
+                break
+            if item is _STOP:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    async def _worker(self, index: int, inbox: asyncio.Queue, outbox: asyncio.Queue | None,
+                      results: list | None) -> None:
+        stage, stats = self.stages[index], self.stats[index]
+        stopped = False
+        while not stopped:
+            item, stopped = await self._receive(stage, inbox)
+            if item is None:
+                return
+            stats.items_in += len(item) if stage.batch_size > 1 else 1
+            started = time.perf_counter()
+            try:
+                async for output in stage.outputs(item):
+                    # 等待下游队列的时间不计入忙碌时间
+                    stats.busy += time.perf_counter() - started
+                    stats.items_out += 1
+                    if outbox is not None:
+                        await outbox.put(output)
+                    elif results is not None:
+                        results.append(output)
+                    started = time.perf_counter()
+            except Exception as e:
+                stats.errors += 1
+                described = f"{len(item)} items" if stage.batch_size > 1 else getattr(item, "title", item)
+                logger.error("Stage '%s' failed on %r: %r", stage.name, described, e)
+            stats.busy += time.perf_counter() - started
+
+    async def _run_stage(self, index: int, queues: list[asyncio.Queue], results: list | None) -> None:
+        stats = self.stats[index]
+        stats.started = time.perf_counter()
+        outbox = queues[index + 1] if index + 1 < len(queues) else None
+        await asyncio.gather(*(
+            self._worker(index, queues[index], outbox, results) for _ in range(self.stages[index].workers)
+        ))
+        stats.finished = time.perf_counter()
+        if outbox is not None:
+            for _ in range(self.stages[index + 1].workers):
+                await outbox.put(_STOP)
+
+    async def run(self, source: AsyncIterable | Iterable, collect: bool = False) -> list:
+        """
+        运行流水线直到 source 耗尽且所有阶段处理完毕
+
+        Args:
+            source: 输入项(同步或异步可迭代对象)
+            collect: 是否收集最后一个阶段的输出(输出很多时会占用内存)
+
+        Returns:
+            collect 为 True 时返回最后一个阶段的输出, 否则返回空列表
+        """
+        queues = [asyncio.Queue(maxsize=stage.queue_size) for stage in self.stages]
+        results: list | None = [] if collect else None
+        tasks = [asyncio.create_task(self._feed(source, queues[0]))]
+        tasks += [asyncio.create_task(self._run_stage(i, queues, results)) for i in range(len(self.stages))]
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+        return results or []
+
+    def report(self) -> dict[str, dict[str, float]]:
+        """输出并返回每个阶段的吞吐量统计"""
+        report = {}
+        for stats in [self.source_stats, *self.stats]:
+            report[stats.name] = {
+                "items_in": stats.items_in,
+                "items_out": stats.items_out,
+                "errors": stats.errors,
+                "elapsed": stats.elapsed,
+                "throughput": stats.throughput,
+                "utilization": stats.utilization,
+            }
+            logger.info("stage %-10s in=%d out=%d errors=%d %.2f items/s utilization %.0f%%",
+                        stats.name, stats.items_in, stats.items_out, stats.errors,
+                        stats.throughput, stats.utilization * 100)
+        return report
+
+
+async def crawl_source(crawler, queue_size: int = 64) -> AsyncIterator[Path]:
+    """
+    把爬虫导出的文件变成流水线输入: 每保存一个文件就立即产出其路径
+    队列满时爬虫的保存回调会等待, 下游处理不过来时爬取也随之放慢
+
+    Args:
+        crawler: ExportCrawler 实例
+        queue_size: 已下载但尚未解析的文件数上限
+    """
+    queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+
+    async def run_crawler():
+        try:
+            await crawler.export_all_conversations()
+        finally:
+            await queue.put(_STOP)
+
+    crawler.on_exported = queue.put
+    task = asyncio.create_task(run_crawler())
+    try:
+        while (path := await queue.get()) is not _STOP:
+            yield path
+        # 传播爬虫异常
+        await task
+    finally:
+        crawler.on_exported = None
+        if not task.done():
+            task.cancel()
+
+
+class KnowledgePipeline:
+    """
+    知识库流水线: 把导出文件加工为知识库 Markdown 文件
+
+    解析之后的每个阶段都处理 KnowledgeEntry; 提供检查点存储时, 每个阶段的结果立即持久化,
+    重启后已完成的对话直接跳过, 未完成的对话从停下的阶段继续.
+
+    Example:
+        >>> kb = KnowledgePipeline(get_llm_client(), "knowledge_base",
+        ...                        checkpoints=CheckpointStore("cache/checkpoints.sqlite3"))
+        >>> async with crawler:
+        ...     await kb.run_crawler(crawler)
+    """
+
+    def __init__(
+        self,
+        client: LLMClient,
+        output_dir: str | Path,
+        platform_name: str = "qwen",
+        scheduler: RateLimitedScheduler | None = None,
+        dedup: RecordDeduplicator | None = None,
+        checkpoints: CheckpointStore | None = None,
+        clusterer: "TopicClusterer | None" = None,
+        index: "KnowledgeIndex | None" = None,
+        prefilter: HeuristicPrefilter | None = None,
+        evaluation: EvaluationSampler | None = None,
+        single_call: bool = True,
+        executor: WorkflowExecutor | None = None,
+        parse_workers: int = 2,
+        llm_workers: int = 4,
+        queue_size: int = 32,
+        filter_batch_size: int = 32,
+        filter_wait: float = 1.0,
+        cluster_batch_size: int = 64,
+        cluster_wait: float = 5.0
+    ):
+        """
+        Args:
+            client: LLM 客户端
+            output_dir: 知识库输出目录
+            platform_name: 导出文件所属平台
+            scheduler: 所有 LLM 阶段共享的请求调度器(保证整体不超过服务商限流)
+            dedup: 记录去重器, 为空时不去重
+            checkpoints: 检查点存储, 为空时不支持断点续跑
+            clusterer: 聚类分类器, 提供时按簇分类(每簇一次调用), 否则逐条分类
+            index: 检索索引, 提供时写入条目的同时增量索引
+            prefilter: 本地预过滤器, 提供时只有不确定的记录交给 LLM 过滤
+            evaluation: 单次调用结果的评估抽样器, 为空时不评估
+            single_call: 是否使用单次调用工作流(一次调用完成过滤、总结和分类), 否则逐阶段调用
+            executor: 工作流执行器, 默认使用共享调度器和总结器创建
+            parse_workers: 解析阶段并发数
+            llm_workers: 每个 LLM 阶段的并发数
+            queue_size: 各阶段输入队列容量
+            filter_batch_size: 逐阶段模式下每次合并过滤的条目数上限
+            filter_wait: 过滤凑批的最长等待秒数
+            cluster_batch_size: 每次聚类的条目数上限
+            cluster_wait: 聚类凑批的最长等待秒数
+        """
+        self.client = client
+        self.platform_name = platform_name
+        self.scheduler = scheduler or RateLimitedScheduler(max_concurrency=8)
+        self.dedup = dedup
+        self.checkpoints = checkpoints
+        self.clusterer = clusterer
+        self.prefilter = prefilter
+        self.batch_filter = BatchFilter(client, scheduler=self.scheduler, prefilter=prefilter)
+        self.summarizer = MapReduceSummarizer(client, scheduler=self.scheduler)
+        self.writer = KnowledgeBaseWriter(output_dir, index)
+        self.single_call = single_call
+        self.executor = executor or WorkflowExecutor(
+            client, self.scheduler, self.summarizer, prefilter=prefilter, evaluation=evaluation
+        )
+        self.skipped = 0
+        self.resumed = 0
+        # 当前爬取的编号, 断点续爬时沿用上次未完成的爬取
+        self._crawl_run: float | None = None
+        stages = [Stage("parse", self.parse, parse_workers, queue_size)]
+        if dedup is not None:
+            stages.append(Stage("dedup", self.deduplicate, 1, queue_size))
+        if single_call:
+            stages.append(Stage("process", self.process, llm_workers, queue_size))
+        else:
+            stages += [
+                # 多个对话的记录合并过滤; 两个 worker 一个凑批时另一个等待 LLM, 更多 worker 只会把批次拆小
+                Stage("filter", self.filter, min(llm_workers, 2), queue_size, filter_batch_size, filter_wait),
+                Stage("summarize", self.summarize, llm_workers, queue_size),
+            ]
+        if clusterer is not None:
+            stages.append(Stage("categorize", self.categorize_clusters, 1, queue_size, cluster_batch_size, cluster_wait))
+        elif not single_call:
+            stages.append(Stage("categorize", self.categorize, llm_workers, queue_size))
+        stages.append(Stage("write", self.write, 1, queue_size))
+        self.pipeline = Pipeline(stages)
+
+    def _mark(self, entry: KnowledgeEntry, stage: str, **payload) -> None:
+        """记录条目到达的阶段"""
+        entry.stage = stage
+        if self.checkpoints is not None:
+            self.checkpoints.mark(entry.key, stage, **payload)
+
+    def _resume(self, key: str, conversation: Conversation) -> KnowledgeEntry | None:
+        """根据检查点恢复条目, 已完成的对话返回 None"""
+        title = conversation.title or conversation[0]["question"][:50]
+        entry = KnowledgeEntry(title=title, content="", source=conversation, key=key)
+        checkpoint = self.checkpoints.get(key) if self.checkpoints is not None else None
+        if checkpoint is None:
+            self._mark(entry, PARSED)
+            return entry
+        if checkpoint.done:
+            self.skipped += 1
+            return None
+
+        payload = checkpoint.payload
+        entry.stage = checkpoint.stage
+        if stage_reached(checkpoint.stage, FILTERED):
+            kept = set(payload["kept"])
+            entry.source = Conversation(conversation.title, [
+                record for record in conversation if record_hash(record).hex() in kept
+            ])
+        if stage_reached(checkpoint.stage, SUMMARIZED):
+            entry.content = payload["summary"]
+        if stage_reached(checkpoint.stage, CATEGORIZED):
+            entry.title = payload["title"]
+            entry.categories = payload["categories"]
+            entry.filename = payload["filename"]
+        if stage_reached(checkpoint.stage, FILTERED):
+            self.resumed += 1
+            logger.debug("Resuming '%s' after stage '%s'", entry.title, checkpoint.stage)
+        return entry
+
+    def _mark_rejected(self, records: Iterable[Mapping[str, str]]) -> None:
+        """判定为无价值(或重复)的记录立即持久化为已见, 下次运行不再发送给 LLM"""
+        if self.dedup is not None:
+            self.dedup.mark_seen(records)
+
+    async def _track_downloads(self, source: AsyncIterable[Path] | Iterable[Path]) -> AsyncIterator[Path]:
+        """记录已下载的文件及其所属的爬取"""
+        async for path in iter_async(source):
+            if self.checkpoints is not None:
+                key = file_key(path)
+                checkpoint = self.checkpoints.get(key)
+                payload = {} if self._crawl_run is None else {"crawl_run": self._crawl_run}
+                if checkpoint is None or payload:
+                    self.checkpoints.mark(key, DOWNLOADED if checkpoint is None else checkpoint.stage, **payload)
+            yield path
+
+    def _start_crawl(self, platform: str) -> str:
+        """开始一次爬取; 上次爬取中途崩溃时沿用它的编号, 已下载的文件不再重新导出"""
+        key = crawl_key(platform)
+        checkpoint = self.checkpoints.get(key)
+        if checkpoint is not None and not checkpoint.payload.get("finished", True):
+            self._crawl_run = checkpoint.payload["run"]
+            logger.info("Resuming unfinished crawl of %s", platform)
+        else:
+            self._crawl_run = time.time()
+            self.checkpoints.mark(key, DOWNLOADED, run=self._crawl_run, finished=False)
+        return key
+
+    def _exported_in_crawl(self, path: Path) -> bool:
+        """文件是否已在当前爬取中下载(爬虫据此跳过重复导出)"""
+        checkpoint = self.checkpoints.get(file_key(path))
+        return (checkpoint is not None and checkpoint.payload.get("crawl_run") == self._crawl_run
+                and path.exists())
+
+    async def parse(self, path: Path) -> AsyncIterator[KnowledgeEntry]:
+        """解析导出文件(在线程中执行, 不阻塞事件循环); 文件未变化且其中对话都已完成时跳过"""
+        key, signature = file_key(path), file_signature(path)
+        if self.checkpoints is not None:
+            checkpoint = self.checkpoints.get(key)
+            if (checkpoint is not None and checkpoint.payload.get("signature") == signature
+                    and all(self.checkpoints.is_done(k) for k in checkpoint.payload.get("conversations", []))):
+                logger.debug("Skipping completed file: %s", path)
+                return
+
+        conversations = [
+            conversation for conversation in
+            await asyncio.to_thread(parse_chat_file, path, self.platform_name)
+            if conversation
+        ]
+        keys = [conversation_key(conversation) for conversation in conversations]
+        if self.checkpoints is not None:
+            self.checkpoints.mark(key, PARSED, signature=signature, conversations=keys)
+        for conversation_key_, conversation in zip(keys, conversations):
+            entry = self._resume(conversation_key_, conversation)
+            if entry is not None:
+                yield entry
+
+    async def deduplicate(self, entry: KnowledgeEntry) -> KnowledgeEntry | None:
+        """丢弃已处理过的记录, 写入完成后才持久化为已见"""
+        if stage_reached(entry.stage, FILTERED):
+            return entry
+        entry.source = self.dedup.filter_conversation(entry.source)
+        if not entry.source:
+            self._mark(entry, DROPPED)
+            return None
+        return entry
+
+    async def filter(self, entries: list[KnowledgeEntry]) -> AsyncIterator[KnowledgeEntry]:
+        """跨对话批量过滤: 一批条目的记录合并为一次 BatchFilter 调用, 判定再按条目拆分, 只保留有价值的记录"""
+        pending = []
+        for entry in entries:
+            if stage_reached(entry.stage, FILTERED):
+                yield entry
+            else:
+                pending.append(entry)
+        if not pending:
+            return
+        verdicts = await self.batch_filter.filter([record for entry in pending for record in entry.source])
+        offset = 0
+        for entry in pending:
+            conversation = entry.source
+            entry_verdicts = verdicts[offset:offset + len(conversation)]
+            offset += len(conversation)
+            failed = sum(verdict is None for verdict in entry_verdicts)
+            if failed:
+                # 不记录检查点, 下次运行时重新过滤
+                logger.error("Filter failed for %d of %d records in '%s'", failed, len(entry_verdicts), entry.title)
+                continue
+            entry.source = Conversation(conversation.title, [
+                record for record, verdict in zip(conversation, entry_verdicts) if verdict.is_valuable
+            ])
+            self._mark_rejected(record for record, verdict in zip(conversation, entry_verdicts)
+                                if not verdict.is_valuable)
+            if not entry.source:
+                self._mark(entry, DROPPED)
+                continue
+            self._mark(entry, FILTERED, kept=[record_hash(record).hex() for record in entry.source])
+            yield entry
+
+    async def summarize(self, entry: KnowledgeEntry) -> KnowledgeEntry:
+        """总结对话(超长对话自动分块)"""
+        if stage_reached(entry.stage, SUMMARIZED):
+            return entry
+        result = await self.summarizer.summarize(entry.source)
+        entry.content = result.summary
+        self._mark(entry, SUMMARIZED, summary=entry.content)
+        return entry
+
+    async def categorize(self, entry: KnowledgeEntry) -> KnowledgeEntry:
+        """为条目分类并拟定标题和文件名"""
+        if stage_reached(entry.stage, CATEGORIZED):
+            return entry
+        entry = await self.executor.categorize(entry)
+        self._mark(entry, CATEGORIZED, title=entry.title, categories=entry.categories, filename=entry.filename)
+        return entry
+
+    async def process(self, entry: KnowledgeEntry) -> KnowledgeEntry | None:
+        """单次调用模式: 一次调用完成过滤、总结和分类; 从检查点恢复的条目按阶段继续"""
+        if stage_reached(entry.stage, FILTERED):
+            entry = await self.summarize(entry)
+            return entry if self.clusterer is not None else await self.categorize(entry)
+
+        result = await self.executor.run(entry.source)
+        if result is None:
+            self._mark_rejected(entry.source)
+            self._mark(entry, DROPPED)
+            return None
+        kept = {record_hash(record) for record in result.source}
+        self._mark_rejected(record for record in entry.source if record_hash(record) not in kept)
+        entry.title = result.title
+        entry.content = result.content
+        entry.categories = result.categories
+        entry.filename = result.filename
+        entry.source = result.source
+        payload = {"kept": [record_hash(record).hex() for record in entry.source], "summary": entry.content}
+        if self.clusterer is not None:
+            # 分类交给后面的聚类阶段统一处理
+            self._mark(entry, SUMMARIZED, **payload)
+        else:
+            self._mark(entry, CATEGORIZED, **payload, title=entry.title, categories=entry.categories,
+                       filename=entry.filename)
+        return entry
+
+    async def categorize_clusters(self, entries: list[KnowledgeEntry]) -> AsyncIterator[KnowledgeEntry]:
+        """按主题簇批量分类, 合并近重复条目; 分类失败的簇回退到逐条分类"""
+        pending = []
+        for entry in entries:
+            if stage_reached(entry.stage, CATEGORIZED):
+                yield entry
+            else:
+                pending.append(entry)
+        for cluster in await self.clusterer.categorize(pending):
+            for duplicate, kept in cluster.duplicates.items():
+                self._mark_rejected(pending[duplicate].source)
+                self._mark(pending[duplicate], DROPPED, duplicate_of=pending[kept].key)
+            for index in cluster.members:
+                entry = pending[index]
+                if cluster.categories is None:
+                    try:
+                        entry = await self.categorize(entry)
+                    except Exception as e:
+                        logger.error("Categorization failed for '%s': %r", entry.title, e)
+                        continue
+                else:
+                    self._mark(entry, CATEGORIZED, title=entry.title, categories=entry.categories,
+                               filename=entry.filename)
+                yield entry
+
+    async def write(self, entry: KnowledgeEntry) -> Path:
+        """写入知识库文件"""
+        path = await asyncio.to_thread(self.writer.write, entry)
+        if self.dedup is not None and entry.source is not None:
+            self.dedup.mark_seen(entry.source)
+        self._mark(entry, WRITTEN, path=str(path))
+        return path
+
+    async def run(self, source: AsyncIterable[Path] | Iterable[Path]) -> dict[str, dict[str, float]]:
+        """处理输入文件并返回各阶段统计"""
+        started = time.perf_counter()
+        await self.pipeline.run(self._track_downloads(source))
+        logger.info("Knowledge pipeline finished in %.1fs, %d entries written, %d resumed, %d already done",
+                    time.perf_counter() - started, self.writer.written, self.resumed, self.skipped)
+        if self.single_call:
+            self.executor.report()
+        if self.prefilter is not None:
+            calls_saved = self.executor.stats.prefiltered if self.single_call else self.batch_filter.calls_saved
+            self.prefilter.report(calls_saved)
+            self.prefilter.save()
+        return self.pipeline.report()
+
+    async def run_crawler(self, crawler, queue_size: int = 64) -> dict[str, dict[str, float]]:
+        """边爬取边处理; 提供检查点存储时, 中途崩溃后重新运行只导出尚未下载的对话"""
+        if self.checkpoints is None:
+            return await self.run(crawl_source(crawler, queue_size))
+        key = self._start_crawl(crawler.platform_name)
+        crawler.is_exported = self._exported_in_crawl
+        try:
+            report = await self.run(crawl_source(crawler, queue_size))
+        finally:
+            crawler.is_exported = None
+        # 爬取完整结束, 下次运行重新开始一次爬取(是否跳过未变化的对话由导出清单决定)
+        self.checkpoints.mark(key, DOWNLOADED, finished=True)
+        self._crawl_run = None
+        return report
+
+    async def run_directory(self, directory: str | Path) -> dict[str, dict[str, float]]:
+        """处理已下载目录中的所有导出文件"""
+        return await self.run(discover_chat_files(directory))
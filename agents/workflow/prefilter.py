@@ -0,0 +1,366 @@
+"""
+LLM 过滤之前的本地启发式预过滤
+
+解析出的记录中有大量寒暄、一句话提问和失败的回答, FILTER_SYSTEM_PROMPT 的标准会直接拒绝它们,
+但每条仍要花一次 LLM 调用. 本模块用可配置的规则(长度、语言、代码块、寒暄/失败模式)和一个
+小型朴素贝叶斯分类器在本地给记录打分: 明显的记录直接接受或拒绝, 只有不确定的记录交给 LLM.
+分类器从 LLM 对不确定记录的判定中在线学习, 运行越久本地能决定的记录越多.
+分类器判定的记录中仍有一小部分被抽检(照常交给 LLM), 最近抽检的一致率过低时分类器暂停判定;
+暂停期间分类器的影子判定全部参与抽检, 一致率回升后自动恢复.
+"""
+
+import math
+import re
+from collections import Counter, deque
+from collections.abc import Iterable, Mapping
+from dataclasses import dataclass, field
+from enum import StrEnum
+from pathlib import Path
+
+from agents.workflow.dedup import normalize_text, record_hash
+from utils import json_codec
+from utils.logger import get_agent_logger
+
+logger = get_agent_logger()
+
+# 围栏代码块, 或空行之后连续两行以上的缩进代码(排除缩进的嵌套列表项)
+_CODE_BLOCK_RE = re.compile(
+    r"```|^~~~|(?:\A|\n\n)(?:(?: {4}|\t)(?![-*+] |\d+[.)] )\S[^\n]*(?:\n|\Z)){2,}", re.MULTILINE
+)
+_CJK_RE = re.compile(r"[\u4e00-\u9fff]")
+_LATIN_RE = re.compile(r"[A-Za-z]")
+_TOKEN_RE = re.compile(r"[a-z0-9_+#]+|[\u4e00-\u9fff]+")
+
+
+class Decision(StrEnum):
+    ACCEPT = "accept"
+    REJECT = "reject"
+    AMBIGUOUS = "ambiguous"
+
+
+@dataclass
+class PrefilterResult:
+    """单条记录的预过滤结果"""
+    decision: Decision
+    reason: str
+    # 分类器给出的有价值概率, 分类器未参与时为 None
+    probability: float | None = None
+    # 被抽检的记录: 分类器本来会给出的判定(记录本身按 AMBIGUOUS 交给 LLM)
+    audit: Decision | None = None
+
+
+@dataclass
+class PrefilterRules:
+    """预过滤规则, 全部可配置"""
+    # 问题和回答都短于这些长度时拒绝
+    min_question_chars: int = 6
+    min_answer_chars: int = 30
+    # 包含代码块且回答不短于该长度时接受
+    code_accept_answer_chars: int = 200
+    # 回答不短于该长度时接受(长篇讲解几乎都有保留价值)
+    long_answer_chars: int = 3000
+    # 只对这些语言做自动判定, 其他语言交给 LLM
+    languages: tuple[str, ...] = ("zh", "en")
+    greeting_patterns: tuple[str, ...] = (
+        r"^(你好|您好|在吗|在不在|哈喽|嗨|早上好|晚上好|谢谢|多谢|感谢|好的|ok|okay|hi|hello|hey|thanks?( you)?|thx)[\s!！.。~?？]*$",
+        r"^(你是谁|你叫什么|你是什么模型|who are you|what are you)[\s!！.。~?？]*$",
+    )
+    failure_patterns: tuple[str, ...] = (
+        r"^(抱歉|对不起|很抱歉)[,， ]*(我)?(无法|不能|没法)",
+        r"^(i'?m sorry|sorry|as an ai)[, ]+(but )?i (can(no|')t|am unable)",
+        r"(请求|服务|网络)(出错|异常|超时)",
+    )
+    # 分类器概率阈值: 不低于 accept 接受, 不高于 reject 拒绝
+    accept_probability: float = 0.9
+    reject_probability: float = 0.1
+    # 每个类别至少有这么多训练样本后分类器才参与判定
+    min_training_per_class: int = 30
+    # 分类器判定的记录中按该比例抽检, 仍交给 LLM 判定以统计一致率
+    audit_rate: float = 0.05
+    # 最近 audit_window 次抽检中至少有 min_audits 次且一致率低于该值时, 分类器暂停判定(仍继续学习)
+    min_audit_agreement: float = 0.9
+    min_audits: int = 20
+    audit_window: int = 200
+
+
+def detect_language(text: str) -> str:
+    """按字符比例粗略识别语言: zh / en / other"""
+    cjk = len(_CJK_RE.findall(text))
+    latin = len(_LATIN_RE.findall(text))
+    if cjk and cjk * 3 >= latin:
+        return "zh"
+    if latin:
+        return "en"
+    return "other"
+
+
+def has_code_block(text: str) -> bool:
+    return bool(_CODE_BLOCK_RE.search(text))
+
+
+def record_features(record: Mapping[str, str], max_chars: int = 2000) -> list[str]:
+    """
+    分类器特征: 问题和回答开头的词/中文二元组, 以及长度、代码、语言等结构特征
+
+    Args:
+        record: 问答记录
+        max_chars: 每个字段参与特征提取的最大字符数
+    """
+    question, answer = record["question"] or "", record["answer"] or ""
+    features = []
+    for prefix, text in (("q", question), ("a", answer)):
+        for match in _TOKEN_RE.findall(normalize_text(text[:max_chars])):
+            if match.isascii() or len(match) == 1:
+                features.append(f"{prefix}:{match}")
+            else:
+                features.extend(f"{prefix}:{match[i:i + 2]}" for i in range(len(match) - 1))
+        # 长度按 2 的幂分桶
+        features.append(f"__{prefix}_len_{min(len(text), 1 << 16).bit_length()}")
+    features.append(f"__code_{has_code_block(answer)}")
+    features.append(f"__lang_{detect_language(question + answer)}")
+    return features
+
+
+class NaiveBayesClassifier:
+    """多项式朴素贝叶斯(拉普拉斯平滑), 支持增量训练和 JSON 持久化"""
+
+    def __init__(self):
+        self.class_counts = [0, 0]
+        self.feature_counts: list[Counter] = [Counter(), Counter()]
+        self.total_features = [0, 0]
+        # 两个类别出现过的不同特征数(平滑用), 随训练增量维护
+        self.vocabulary = 0
+
+    def learn(self, features: Iterable[str], label: bool) -> None:
+        """增量训练一个样本"""
+        label = int(label)
+        counts = Counter(features)
+        other = self.feature_counts[1 - label]
+        own = self.feature_counts[label]
+        self.vocabulary += sum(feature not in own and feature not in other for feature in counts)
+        self.class_counts[label] += 1
+        self.feature_counts[label].update(counts)
+        self.total_features[label] += sum(counts.values())
+
+    def predict_proba(self, features: Iterable[str]) -> float:
+        """样本属于正类(有价值)的概率"""
+        total = sum(self.class_counts)
+        vocabulary = self.vocabulary or 1
+        log_probs = []
+        for label in (0, 1):
+            log_prob = math.log((self.class_counts[label] + 1) / (total + 2))
+            denominator = self.total_features[label] + vocabulary
+            counts = self.feature_counts[label]
+            log_prob += sum(math.log((counts[feature] + 1) / denominator) for feature in features)
+            log_probs.append(log_prob)
+        # 数值稳定的 sigmoid
+        diff = log_probs[0] - log_probs[1]
+        return 1 / (1 + math.exp(diff)) if diff < 700 else 0.0
+
+    def to_dict(self) -> dict:
+        return {
+            "class_counts": self.class_counts,
+            "feature_counts": [dict(counts) for counts in self.feature_counts],
+            "total_features": self.total_features,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "NaiveBayesClassifier":
+        classifier = cls()
+        classifier.class_counts = list(data["class_counts"])
+        classifier.feature_counts = [Counter(counts) for counts in data["feature_counts"]]
+        classifier.total_features = list(data["total_features"])
+        classifier.vocabulary = len(classifier.feature_counts[0].keys() | classifier.feature_counts[1].keys())
+        return classifier
+
+
+@dataclass
+class PrefilterStats:
+    """预过滤统计"""
+    accepted: int = 0
+    rejected: int = 0
+    ambiguous: int = 0
+    reasons: Counter = field(default_factory=Counter)
+    # 本次运行的抽检数和其中分类器与 LLM 判定一致的数量
+    audited: int = 0
+    audit_agreed: int = 0
+
+    @property
+    def decided(self) -> int:
+        return self.accepted + self.rejected
+
+    @property
+    def agreement(self) -> float | None:
+        return self.audit_agreed / self.audited if self.audited else None
+
+    @property
+    def total(self) -> int:
+        return self.decided + self.ambiguous
+
+
+class HeuristicPrefilter:
+    """
+    启发式预过滤器
+
+    Example:
+        >>> prefilter = HeuristicPrefilter(model_path="cache/prefilter_model.json")
+        >>> batch_filter = BatchFilter(get_llm_client(), prefilter=prefilter)
+        >>> verdicts = await batch_filter.filter(records)
+        >>> prefilter.report()
+    """
+
+    def __init__(self, rules: PrefilterRules | None = None, model_path: str | Path | None = None):
+        """
+        Args:
+            rules: 预过滤规则, 默认使用 PrefilterRules()
+            model_path: 分类器持久化文件, 为空时分类器只保存在内存中
+        """
+        self.rules = rules or PrefilterRules()
+        self.model_path = Path(model_path) if model_path is not None else None
+        self._greetings = [re.compile(pattern, re.IGNORECASE) for pattern in self.rules.greeting_patterns]
+        self._failures = [re.compile(pattern, re.IGNORECASE) for pattern in self.rules.failure_patterns]
+        self.classifier = NaiveBayesClassifier()
+        self.stats = PrefilterStats()
+        # 最近的抽检结果(是否与 LLM 一致), 随分类器一起持久化
+        self.audits: deque[bool] = deque(maxlen=self.rules.audit_window)
+        if self.model_path is not None and self.model_path.exists():
+            data = json_codec.load(self.model_path)
+            self.classifier = NaiveBayesClassifier.from_dict(data)
+            self.audits.extend(bool(agreed) for agreed in data.get("audit_window", []))
+
+    @property
+    def recent_agreement(self) -> float | None:
+        """最近抽检的一致率"""
+        return sum(self.audits) / len(self.audits) if self.audits else None
+
+    @property
+    def classifier_trusted(self) -> bool:
+        """最近抽检的一致率是否足够(抽检数不足时视为可信)"""
+        return len(self.audits) < self.rules.min_audits or self.recent_agreement >= self.rules.min_audit_agreement
+
+    @property
+    def classifier_trained(self) -> bool:
+        return min(self.classifier.class_counts) >= self.rules.min_training_per_class
+
+    @property
+    def classifier_ready(self) -> bool:
+        return self.classifier_trained and self.classifier_trusted
+
+    def _audit_sampled(self, record: Mapping[str, str]) -> bool:
+        """按记录内容哈希抽样, 同一记录每次运行的结果一致"""
+        return int.from_bytes(record_hash(record)[:8]) / 2 ** 64 < self.rules.audit_rate
+
+    def _apply_rules(self, record: Mapping[str, str]) -> PrefilterResult | None:
+        rules = self.rules
+        question = (record["question"] or "").strip()
+        answer = (record["answer"] or "").strip()
+        if not answer:
+            return PrefilterResult(Decision.REJECT, "empty answer")
+        if any(pattern.search(answer[:200]) for pattern in self._failures):
+            return PrefilterResult(Decision.REJECT, "failed answer")
+        if any(pattern.match(question) for pattern in self._greetings) and len(answer) < rules.code_accept_answer_chars:
+            return PrefilterResult(Decision.REJECT, "greeting")
+        if len(question) < rules.min_question_chars and len(answer) < rules.min_answer_chars:
+            return PrefilterResult(Decision.REJECT, "too short")
+        if detect_language(question + answer[:500]) not in rules.languages:
+            return PrefilterResult(Decision.AMBIGUOUS, "unsupported language")
+        if has_code_block(answer) and len(answer) >= rules.code_accept_answer_chars:
+            return PrefilterResult(Decision.ACCEPT, "code answer")
+        if len(answer) >= rules.long_answer_chars:
+            return PrefilterResult(Decision.ACCEPT, "long answer")
+        return None
+
+    def score(self, record: Mapping[str, str]) -> PrefilterResult:
+        """
+        给单条记录打分
+
+        Args:
+            record: 问答记录 (ChatRecord 或 dict)
+
+        Returns:
+            PrefilterResult; AMBIGUOUS 表示需要交给 LLM 判定
+        """
+        result = self._apply_rules(record)
+        if result is None:
+            result = PrefilterResult(Decision.AMBIGUOUS, "no rule matched")
+            if self.classifier_trained:
+                probability = self.classifier.predict_proba(record_features(record))
+                result.probability = probability
+                decision = Decision.AMBIGUOUS
+                if probability >= self.rules.accept_probability:
+                    decision = Decision.ACCEPT
+                elif probability <= self.rules.reject_probability:
+                    decision = Decision.REJECT
+                if decision is not Decision.AMBIGUOUS:
+                    if not self.classifier_trusted:
+                        # 暂停期间记录照常交给 LLM, 影子判定全部抽检, 一致率回升后恢复判定
+                        result = PrefilterResult(Decision.AMBIGUOUS, "classifier suspended", probability, decision)
+                    elif self._audit_sampled(record):
+                        result = PrefilterResult(Decision.AMBIGUOUS, "classifier audit", probability, decision)
+                    else:
+                        result = PrefilterResult(decision, "classifier", probability)
+
+        if result.decision is Decision.ACCEPT:
+            self.stats.accepted += 1
+        elif result.decision is Decision.REJECT:
+            self.stats.rejected += 1
+        else:
+            self.stats.ambiguous += 1
+        self.stats.reasons[result.reason] += 1
+        return result
+
+    def learn(self, record: Mapping[str, str], is_valuable: bool, result: PrefilterResult | None = None) -> None:
+        """
+        用 LLM 的判定训练分类器
+
+        Args:
+            record: 问答记录
+            is_valuable: LLM 的判定
+            result: 该记录的预过滤结果, 为抽检记录时统计分类器与 LLM 是否一致
+        """
+        if result is not None and result.audit is not None:
+            trusted = self.classifier_trusted
+            agreed = (result.audit is Decision.ACCEPT) == is_valuable
+            self.audits.append(agreed)
+            self.stats.audited += 1
+            self.stats.audit_agreed += agreed
+            if trusted and not self.classifier_trusted:
+                logger.warning("Prefilter classifier agreed with the LLM on only %.0f%% of the last %d audits, "
+                               "suspending classifier decisions", self.recent_agreement * 100, len(self.audits))
+            elif not trusted and self.classifier_trusted:
+                logger.info("Prefilter classifier agreement back to %.0f%% of the last %d audits, "
+                            "resuming classifier decisions", self.recent_agreement * 100, len(self.audits))
+        self.classifier.learn(record_features(record), is_valuable)
+
+    def save(self) -> None:
+        """保存分类器"""
+        if self.model_path is None:
+            return
+        self.model_path.parent.mkdir(parents=True, exist_ok=True)
+        json_codec.dump({**self.classifier.to_dict(), "audit_window": [int(agreed) for agreed in self.audits]},
+                        self.model_path)
+
+    def report(self, calls_saved: int | None = None) -> dict:
+        """
+        输出并返回预过滤统计
+
+        Args:
+            calls_saved: 实际节省的 LLM 调用数(批量过滤时由 BatchFilter 提供, 单次调用模式为整个被拒绝的对话数),
+                为空时按逐条过滤估算
+        """
+        stats = self.stats
+        saved = stats.decided if calls_saved is None else calls_saved
+        report = {
+            "records": stats.total,
+            "accepted": stats.accepted,
+            "rejected": stats.rejected,
+            "ambiguous": stats.ambiguous,
+            "calls_saved": saved,
+            "reasons": dict(stats.reasons),
+            "audited": stats.audited,
+            "audit_agreement": stats.agreement,
+            "recent_audit_agreement": self.recent_agreement,
+        }
+        logger.info("Prefilter decided %d of %d records locally (%d accepted, %d rejected), %d LLM calls saved",
+                    stats.decided, stats.total, stats.accepted, stats.rejected, saved)
+        return report
@@ -0,0 +1,55 @@
+"""
+Structured output schemas for the workflow agents.
+
+Used with LLMClient.astructured_completion / with_structured_output; field
+descriptions are sent to the model as part of the schema.
+"""
+
+from pydantic import BaseModel, Field
+
+
+class FilterResult(BaseModel):
+    """Verdict of the filter agent for one conversation."""
+    is_valuable: bool = Field(description="Whether the conversation is worth keeping in the knowledge base")
+    reason: str = Field(default="", description="One short sentence explaining the verdict")
+
+
+class RecordVerdict(BaseModel):
+    """Verdict for one record inside a batched filter request."""
+    index: int = Field(description="The [index] of the record being judged")
+    is_valuable: bool = Field(description="Whether the record is worth keeping in the knowledge base")
+    reason: str = Field(default="", description="One short sentence explaining the verdict")
+
+
+class BatchFilterResult(BaseModel):
+    """Verdicts for all records of a batched filter request."""
+    verdicts: list[RecordVerdict] = Field(description="Exactly one verdict per record, in any order")
+
+
+class SummaryResult(BaseModel):
+    """Output of the summarizer agent."""
+    needs_summary: bool = Field(description="Whether the conversation needed summarization")
+    summary: str = Field(default="", description="Markdown summary (empty when no summary is needed)")
+
+
+class CategoryResult(BaseModel):
+    """Output of the categorizer agent."""
+    title: str = Field(default="", description="Descriptive title for the knowledge base entry")
+    categories: list[str] = Field(description="Hierarchical categories, e.g. 'Programming/Python'")
+    suggested_filename: str = Field(description="Kebab-case markdown filename, e.g. 'python-async-patterns.md'")
+
+
+class SimpleWorkflowResult(BaseModel):
+    """Output of the single-call workflow (filter + summarize + categorize)."""
+    is_valuable: bool = Field(description="Whether the conversation is worth keeping in the knowledge base")
+    reason: str = Field(default="", description="One short sentence explaining the verdict")
+    title: str = Field(default="", description="Descriptive title (empty when not valuable)")
+    summary: str = Field(default="", description="Markdown summary (empty when not valuable)")
+    categories: list[str] = Field(default_factory=list, description="Hierarchical categories, e.g. 'Programming/Python'")
+    suggested_filename: str = Field(default="", description="Kebab-case markdown filename, e.g. 'python-async-patterns.md'")
+
+
+class EvaluationResult(BaseModel):
+    """Output of the evaluator agent."""
+    score: int = Field(ge=1, le=10, description="Overall quality from 1 (unusable) to 10 (excellent)")
+    issues: list[str] = Field(default_factory=list, description="Concrete problems found, empty if none")
@@ -0,0 +1,193 @@
+"""
+按 token 分块的 map-reduce 总结
+
+SUMMARIZER_USER_PROMPT_TEMPLATE 会把整个 {conversation} 拼进提示词, 超长对话会超出上下文窗口或浪费 token.
+本模块在本地统计 token, 按问答边界把对话切成多个块, 通过 LLMClient 并发总结各块(map),
+再把部分总结合并(reduce); 部分总结过多时分组递归合并, 保证每次调用都不超过 token 预算.
+所有 map/reduce 调用都经过共享的 RateLimitedScheduler, 与其他阶段一起受服务商限流约束.
+"""
+
+import asyncio
+from collections.abc import Callable, Mapping, Sequence
+
+from agents.prompts.prompts import (
+    SUMMARIZER_REDUCE_SYSTEM_PROMPT,
+    SUMMARIZER_REDUCE_USER_PROMPT_TEMPLATE,
+    SUMMARIZER_SYSTEM_PROMPT,
+    SUMMARIZER_USER_PROMPT_TEMPLATE,
+)
+from agents.workflow.parser.utils.text_handler import format_conversation, format_record
+from agents.workflow.schemas import SummaryResult
+from utils.llm_client import LLMClient
+from utils.llm_scheduler import RateLimitedScheduler
+from utils.logger import get_agent_logger
+from utils.tokens import count_tokens, truncate_to_tokens
+
+logger = get_agent_logger()
+
+
+def chunk_records[R: Mapping[str, str]](
+    records: Sequence[R],
+    token_budget: int,
+    counter: Callable[[str], int] = count_tokens
+) -> list[list[R]]:
+    """
+    按问答边界把记录切分为不超过 token 预算的块
+
+    Args:
+        records: 同一对话窗口的问答记录
+        token_budget: 每块的 token 上限
+        counter: token 计数函数
+
+    Returns:
+        记录块列表; 单条记录超过预算时独占一块(渲染时截断)
+    """
+    if not records:
+        return []
+    # format_conversation 在每块开头加的标题行也占预算
+    title = records[0]["title"]
+    budget = token_budget - (counter(f"Title: {title}\n\n") if title else 0)
+    chunks: list[list[R]] = []
+    chunk: list[R] = []
+    used = 0
+    for record in records:
+        # 记录正文 + 块内分隔
+        cost = counter(format_record(record, with_title=False)) + 2
+        if chunk and used + cost > budget:
+            chunks.append(chunk)
+            chunk, used = [], 0
+        chunk.append(record)
+        used += cost
+    if chunk:
+        chunks.append(chunk)
+    return chunks
+
+
+class MapReduceSummarizer:
+    """
+    超长对话的 map-reduce 总结器
+
+    Example:
+        >>> summarizer = MapReduceSummarizer(get_llm_client(), token_budget=8000)
+        >>> result = await summarizer.summarize(conversation)
+    """
+
+    def __init__(
+        self,
+        client: LLMClient,
+        token_budget: int = 8000,
+        output_reserve: int = 1500,
+        scheduler: RateLimitedScheduler | None = None
+    ):
+        """
+        Args:
+            client: LLM 客户端
+            token_budget: 单次调用的 token 上限(提示词 + 内容 + 预留输出)
+            output_reserve: 为模型输出预留的 token 数
+            scheduler: 请求调度器, 默认并发 5
+        """
+        self.client = client
+        self.token_budget = token_budget
+        self.output_reserve = output_reserve
+        self.scheduler = scheduler or RateLimitedScheduler(max_concurrency=5)
+        map_overhead = count_tokens(SUMMARIZER_SYSTEM_PROMPT) + count_tokens(SUMMARIZER_USER_PROMPT_TEMPLATE)
+        reduce_overhead = count_tokens(SUMMARIZER_REDUCE_SYSTEM_PROMPT) + count_tokens(SUMMARIZER_REDUCE_USER_PROMPT_TEMPLATE)
+        self.map_budget = token_budget - map_overhead - output_reserve
+        self.reduce_budget = token_budget - reduce_overhead - output_reserve
+        if self.map_budget <= 0 or self.reduce_budget <= 0:
+            raise ValueError("token_budget is too small for the summarizer prompts and output reserve")
+        self.calls = 0
+
+    async def _complete(self, messages: list[dict[str, str]]) -> SummaryResult:
+        """通过调度器发起一次总结调用"""
+        self.calls += 1
+        return await self.scheduler.run(
+            lambda: self.client.astructured_completion(SummaryResult, messages),
+            tokens=sum(count_tokens(message["content"]) for message in messages) + self.output_reserve
+        )
+
+    async def _summarize_chunk(self, chunk: Sequence[Mapping[str, str]]) -> SummaryResult:
+        """map: 总结一个记录块"""
+        original = format_conversation(chunk)
+        messages = [
+            {"role": "system", "content": SUMMARIZER_SYSTEM_PROMPT},
+            {"role": "user", "content": SUMMARIZER_USER_PROMPT_TEMPLATE.format(
+                conversation=truncate_to_tokens(original, self.map_budget))},
+        ]
+        result = await self._complete(messages)
+        if not result.needs_summary or not result.summary:
+            # 模型认为无需总结时保留完整原文(而不是发给模型的截断文本)
+            result = SummaryResult(needs_summary=False, summary=original)
+        return result
+
+    async def _reduce_group(self, title: str, summaries: Sequence[str]) -> str:
+        """reduce: 合并一组部分总结"""
+        joined = "\n\n".join(f"## Part {i}\n{summary}" for i, summary in enumerate(summaries, start=1))
+        messages = [
+            {"role": "system", "content": SUMMARIZER_REDUCE_SYSTEM_PROMPT},
+            {"role": "user", "content": SUMMARIZER_REDUCE_USER_PROMPT_TEMPLATE.format(
+                count=len(summaries), title=title, summaries=truncate_to_tokens(joined, self.reduce_budget))},
+        ]
+        result = await self._complete(messages)
+        return result.summary or joined
+
+    async def _reduce(self, title: str, summaries: list[str]) -> str:
+        """按预算分组递归合并, 直到只剩一个总结"""
+        while len(summaries) > 1:
+            groups: list[list[str]] = []
+            group: list[str] = []
+            used = 0
+            for summary in summaries:
+                cost = count_tokens(summary) + 8
+                if group and used + cost > self.reduce_budget:
+                    groups.append(group)
+                    group, used = [], 0
+                group.append(summary)
+                used += cost
+            groups.append(group)
+            if len(groups) == len(summaries):
+                # 每个部分总结都独占一组时两两合并, 保证递归收敛
+                groups = [summaries[i:i + 2] for i in range(0, len(summaries), 2)]
+            results = await asyncio.gather(
+                *(self._reduce_group(title, group) for group in groups), return_exceptions=True
+            )
+            summaries = [
+                "\n\n".join(group) if isinstance(result, Exception) else result
+                for group, result in zip(groups, results)
+            ]
+        return summaries[0]
+
+    async def summarize(self, records: Sequence[Mapping[str, str]]) -> SummaryResult:
+        """
+        总结一个对话窗口
+
+        Args:
+            records: 同一对话窗口的问答记录
+
+        Returns:
+            SummaryResult; 对话能放进一次调用时与普通总结相同, 否则为合并后的总结
+
+        Raises:
+            Exception: 所有分块总结都失败时抛出第一个错误
+        """
+        if not records:
+            return SummaryResult(needs_summary=False, summary="")
+        chunks = chunk_records(records, self.map_budget)
+        if len(chunks) == 1:
+            return await self._summarize_chunk(chunks[0])
+
+        title = records[0]["title"]
+        logger.info("Summarizing '%s' in %d chunks", title, len(chunks))
+        # 每个调用各自经过调度器, 这里只负责并发和收集结果
+        results = await asyncio.gather(
+            *(self._summarize_chunk(chunk) for chunk in chunks), return_exceptions=True
+        )
+        failed = [result for result in results if isinstance(result, Exception)]
+        if len(failed) == len(results):
+            raise failed[0]
+        partial_summaries = [
+            format_conversation(chunk) if isinstance(result, Exception) else result.summary
+            for chunk, result in zip(chunks, results)
+        ]
+        summary = await self._reduce(title, partial_summaries)
+        return SummaryResult(needs_summary=True, summary=summary)
@@ -0,0 +1,60 @@
+"""
+对比各 JSON 后端解码 Qwen 导出文件的吞吐量 (MB/s)
+
+运行: python test/bench_json_codec.py [导出文件路径]
+未指定文件时生成一个约 50 MB 的模拟 Qwen 全量导出
+"""
+import json
+import sys
+import time
+from pathlib import Path
+
+# Add project root to path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from utils.json_codec import available_backends, get_codec
+
+REPEAT = 3
+
+
+def build_qwen_export(target_mb: int = 50) -> bytes:
+    """生成模拟的 Qwen 全量导出数据"""
+    conversations = []
+    size = 0
+    i = 0
+    while size < target_mb * 1024 * 1024:
+        conv = {
+            "id": f"chat-{i}",
+            "title": f"对话标题 {i}",
+            "chat": {"messages": [
+                {"role": "user", "content": f"问题 {i}: 如何在 Python 中使用 asyncio?", "error": None},
+                {"role": "assistant", "content": "回答内容 ```python\nprint('hello')\n``` " * 40,
+                 "error": None, "content_list": [{"content": "...", "phase": "answer"}]},
+            ]},
+        }
+        size += len(json.dumps(conv, ensure_ascii=False).encode("utf-8"))
+        conversations.append(conv)
+        i += 1
+    return json.dumps({"success": True, "data": conversations}, ensure_ascii=False).encode("utf-8")
+
+
+def main():
+    if len(sys.argv) > 1:
+        data = Path(sys.argv[1]).read_bytes()
+    else:
+        data = build_qwen_export()
+    size_mb = len(data) / 1024 / 1024
+    print(f"input: {size_mb:.1f} MB")
+    for name in available_backends():
+        codec = get_codec(name)
+        best = float("inf")
+        for _ in range(REPEAT):
+            started = time.perf_counter()
+            codec.loads(data)
+            best = min(best, time.perf_counter() - started)
+        print(f"{name:8s}: {size_mb / best:8.1f} MB/s ({best * 1000:.0f} ms)")
+
+
+if __name__ == "__main__":
+    main()
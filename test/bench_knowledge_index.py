@@ -0,0 +1,64 @@
+"""
+知识库检索索引的查询延迟
+
+运行: python test/bench_knowledge_index.py [条目数] [维度]
+"""
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+# Add project root to path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from agents.workflow.knowledge_base import KnowledgeEntry
+from agents.workflow.knowledge_index import KnowledgeIndex
+
+CATEGORIES = ["Programming/Python", "Programming/Rust", "DevOps/Docker", "Data Science/ML", "Web Development/Frontend"]
+
+
+class RandomEmbedder:
+    """随机单位向量, 只用于测量检索开销(与真实模型的向量维度一致)"""
+
+    def __init__(self, dim: int):
+        self.name = f"random-{dim}"
+        self.rng = np.random.default_rng(0)
+        self.dim = dim
+
+    def embed(self, texts, update: bool = True) -> np.ndarray:
+        vectors = self.rng.standard_normal((len(texts), self.dim), dtype=np.float32)
+        return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    dim = int(sys.argv[2]) if len(sys.argv) > 2 else 384
+    with tempfile.TemporaryDirectory() as tmp:
+        index = KnowledgeIndex(tmp, embedder=RandomEmbedder(dim))
+        started = time.perf_counter()
+        for start in range(0, count, 10_000):
+            index.add_many([
+                (KnowledgeEntry(title=f"条目 {i} asyncio 并发", content="",
+                                categories=[CATEGORIES[i % len(CATEGORIES)]]), f"kb/{i}.md")
+                for i in range(start, min(start + 10_000, count))
+            ])
+        print(f"entries: {count}, dim: {dim}, build: {time.perf_counter() - started:.1f}s")
+
+        # 重新打开, 测量加载和冷启动后的查询
+        started = time.perf_counter()
+        index = KnowledgeIndex(tmp, embedder=RandomEmbedder(dim))
+        print(f"load      : {(time.perf_counter() - started) * 1000:8.1f} ms")
+        for label, kwargs in [("vector", {"keyword_weight": 0}), ("hybrid", {}), ("category", {"category": "Programming"})]:
+            index.search("asyncio 并发", **kwargs)
+            runs = 20
+            started = time.perf_counter()
+            for _ in range(runs):
+                index.search("asyncio 并发", k=10, **kwargs)
+            print(f"{label:10s}: {(time.perf_counter() - started) / runs * 1000:8.2f} ms/query")
+
+
+if __name__ == "__main__":
+    main()
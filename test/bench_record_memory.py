@@ -0,0 +1,65 @@
+"""
+对比解析结果中 dict 记录与 ChatRecord 的内存占用
+
+运行: python test/bench_record_memory.py [记录数]
+"""
+import sys
+import tracemalloc
+from pathlib import Path
+
+# Add project root to path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from agents.workflow.parser.core.record import ChatRecord, Conversation
+
+RECORDS_PER_CONVERSATION = 20
+
+
+def build_dicts(count: int) -> list:
+    result = []
+    for i in range(0, count, RECORDS_PER_CONVERSATION):
+        # 同一窗口的记录共享一个标题字符串, 与解析器的实际行为一致
+        title = f"对话标题{i}"
+        result.append([
+            {"title": title, "question": f"问题{j}", "answer": f"回答{j}"}
+            for j in range(i, min(i + RECORDS_PER_CONVERSATION, count))
+        ])
+    return result
+
+
+def build_records(count: int) -> list:
+    result = []
+    for i in range(0, count, RECORDS_PER_CONVERSATION):
+        conv = Conversation(f"对话标题{i}")
+        conv.extend(
+            ChatRecord(conv.title, f"问题{j}", f"回答{j}")
+            for j in range(i, min(i + RECORDS_PER_CONVERSATION, count))
+        )
+        result.append(conv)
+    return result
+
+
+def measure(builder, count: int) -> int:
+    """返回构造结果占用的字节数"""
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    data = builder(count)
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del data
+    return after - before
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    dict_bytes = measure(build_dicts, count)
+    record_bytes = measure(build_records, count)
+    print(f"records: {count}")
+    print(f"dict       : {dict_bytes / count:8.1f} bytes/record ({dict_bytes / 1024 / 1024:.1f} MB)")
+    print(f"ChatRecord : {record_bytes / count:8.1f} bytes/record ({record_bytes / 1024 / 1024:.1f} MB)")
+    print(f"saving     : {(1 - record_bytes / dict_bytes) * 100:.1f}%")
+
+
+if __name__ == "__main__":
+    main()
@@ -21,6 +21,8 @@ async def main():
     crawler_class = CRAWLER_MAP[platform]
     crawler_config_path = Path(__file__).parent.parent / "CrawlBrowser" / "platforms" / f"{platform}.yml"
     crawler = crawler_class(crawler_config_path)
-    await crawler.export_all_conversations()
+    # 复用同一个浏览器执行多次导出
+    async with crawler:
+        await crawler.export_all_conversations()
 if __name__ == "__main__":
     asyncio.run(main())
@@ -0,0 +1,82 @@
+import asyncio
+import re
+from pathlib import Path
+import sys
+# Add project root to path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from agents.workflow.batch_filter import BatchFilter
+from agents.workflow.schemas import BatchFilterResult, FilterResult, RecordVerdict
+from utils import tokens
+
+
+class FakeLLMClient:
+    """Answers batched requests by judging records containing 'useful' as valuable."""
+    def __init__(self, drop_index: int | None = None):
+        self.drop_index = drop_index
+        self.calls = []
+
+    async def astructured_completion(self, schema, messages, **kwargs):
+        self.calls.append(schema)
+        content = messages[-1]["content"]
+        if schema is FilterResult:
+            return FilterResult(is_valuable="useful" in content, reason="single")
+        verdicts = []
+        for block in re.split(r"\n\n(?=\[\d+\] )", content.split("\n\n", 1)[1]):
+            match = re.match(r"\[(\d+)\] ", block)
+            if match and int(match.group(1)) != self.drop_index:
+                verdicts.append(RecordVerdict(index=int(match.group(1)), is_valuable="useful" in block))
+        return BatchFilterResult(verdicts=verdicts)
+
+
+def make_records(count: int) -> list[dict[str, str]]:
+    return [
+        {"title": "t", "question": f"question {i}", "answer": "useful answer" if i % 2 else "hi"}
+        for i in range(count)
+    ]
+
+
+class TestBatchFilter:
+    """Test batched filter packing and verdict mapping."""
+    def test_batches_map_back_to_records(self,):
+        """Verdicts are mapped back to the right records with far fewer calls."""
+        client = FakeLLMClient()
+        batch_filter = BatchFilter(client, max_batch_size=10)
+        records = make_records(25)
+        verdicts = asyncio.run(batch_filter.filter(records))
+        assert [v.is_valuable for v in verdicts] == [bool(i % 2) for i in range(25)]
+        assert (batch_filter.batch_calls, batch_filter.single_calls) == (3, 0)
+
+    def test_missing_verdicts_fall_back_to_single(self,):
+        """Records missing from the batched answer are filtered one by one."""
+        client = FakeLLMClient(drop_index=2)
+        batch_filter = BatchFilter(client, max_batch_size=10)
+        verdicts = asyncio.run(batch_filter.filter(make_records(4)))
+        assert verdicts[1].reason == "single"
+        assert all(v is not None for v in verdicts)
+        assert batch_filter.single_calls == 1
+
+    def test_pack_respects_budget(self,):
+        """Batches never exceed the context budget."""
+        batch_filter = BatchFilter(FakeLLMClient(), context_budget=2000, max_batch_size=100)
+        texts = ["x" * 1200] * 10
+        batches = batch_filter.pack(texts)
+        assert sum(len(indices) for indices, _ in batches) == 10
+        assert all(tokens + batch_filter._prompt_tokens <= 2000 for _, tokens in batches)
+
+    def test_tokenizer_load_failure_falls_back(self, monkeypatch):
+        """An encoding that cannot be downloaded is tried once, then estimates are used."""
+        class OfflineTiktoken:
+            attempts = 0
+
+            @classmethod
+            def get_encoding(cls, name):
+                cls.attempts += 1
+                raise ConnectionError("no network")
+
+        monkeypatch.setattr(tokens, "tiktoken", OfflineTiktoken)
+        monkeypatch.setattr(tokens, "_encoding", None)
+        assert tokens.count_tokens("你好 world") == 2 + 2
+        assert tokens.count_tokens("abcdefgh") == 2
+        assert OfflineTiktoken.attempts == 1
@@ -0,0 +1,159 @@
+import asyncio
+import json
+from pathlib import Path
+import sys
+# Add project root to path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from agents.workflow.checkpoint import FILTERED, PARSED, SUMMARIZED, WRITTEN, CheckpointStore
+from agents.workflow.pipeline import KnowledgePipeline
+from agents.workflow.schemas import BatchFilterResult, CategoryResult, RecordVerdict, SummaryResult
+
+
+class FakeLLMClient:
+    """Keeps every record, summarizes with a marker; categorization can be made to fail."""
+    def __init__(self, fail_categorize: bool = False):
+        self.fail_categorize = fail_categorize
+        self.calls = {"filter": 0, "summarize": 0, "categorize": 0}
+
+    async def astructured_completion(self, schema, messages, **kwargs):
+        if schema is BatchFilterResult:
+            self.calls["filter"] += 1
+            count = messages[1]["content"].count("\n[") + 1
+            return BatchFilterResult(verdicts=[
+                RecordVerdict(index=i, is_valuable=True, reason="ok") for i in range(1, count + 1)
+            ])
+        if schema is SummaryResult:
+            self.calls["summarize"] += 1
+            return SummaryResult(needs_summary=True, summary="总结内容")
+        self.calls["categorize"] += 1
+        if self.fail_categorize:
+            raise RuntimeError("provider down")
+        return CategoryResult(title="标题", categories=["编程/Python"], suggested_filename=f"entry{self.calls['categorize']}")
+
+
+def write_export(directory: Path, i: int) -> Path:
+    conv = [{"title": f"对话{i}", "chat": {"messages": [
+        {"role": "user", "content": f"问题{i}"},
+        {"role": "assistant", "content": f"回答{i}", "error": None},
+    ]}}]
+    path = directory / f"chat_{i}.json"
+    path.write_text(json.dumps(conv, ensure_ascii=False), encoding="utf-8")
+    return path
+
+
+def write_exports(directory: Path, count: int) -> None:
+    for i in range(count):
+        write_export(directory, i)
+
+
+class FakeCrawler:
+    """Exports chats like ExportCrawler (including its is_exported/on_exported hooks) and can crash midway."""
+    platform_name = "fake"
+
+    def __init__(self, directory: Path, count: int, crash_after: int | None = None):
+        self.directory, self.count, self.crash_after = directory, count, crash_after
+        self.downloads = 0
+        self.on_exported = None
+        self.is_exported = None
+
+    async def export_all_conversations(self):
+        for i in range(self.count):
+            path = self.directory / f"chat_{i}.json"
+            if self.is_exported is not None and self.is_exported(path):
+                await self.on_exported(path)
+                continue
+            if self.downloads == self.crash_after:
+                raise RuntimeError("browser crashed")
+            write_export(self.directory, i)
+            self.downloads += 1
+            await self.on_exported(path)
+
+
+class TestCheckpoint:
+    """Test checkpoint persistence and pipeline resume."""
+    def test_store_merges_payload_across_stages(self, tmp_path):
+        """Payloads accumulate and survive reopening the database."""
+        db_path = tmp_path / "checkpoints.sqlite3"
+        with CheckpointStore(db_path) as store:
+            store.mark("conv", PARSED)
+            store.mark("conv", FILTERED, kept=["a"])
+            store.mark("conv", SUMMARIZED, summary="s")
+        with CheckpointStore(db_path) as store:
+            checkpoint = store.get("conv")
+            assert checkpoint.stage == SUMMARIZED
+            assert checkpoint.payload == {"kept": ["a"], "summary": "s"}
+            assert not checkpoint.done
+            store.mark("conv", WRITTEN)
+            assert store.is_done("conv")
+            assert store.get("missing") is None
+
+    def test_pipeline_resumes_without_redoing_work(self, tmp_path):
+        """A crashed run resumes at the failed stage; a finished run does nothing."""
+        exports, output = tmp_path / "exports", tmp_path / "kb"
+        exports.mkdir()
+        write_exports(exports, 3)
+        db_path = tmp_path / "checkpoints.sqlite3"
+
+        first = FakeLLMClient(fail_categorize=True)
+        with CheckpointStore(db_path) as store:
+            report = asyncio.run(KnowledgePipeline(first, output, checkpoints=store, single_call=False)
+                .run_directory(exports))
+        assert report["categorize"]["errors"] == 3
+        assert 1 <= first.calls["filter"] < 3 and first.calls["summarize"] == 3
+
+        second = FakeLLMClient()
+        with CheckpointStore(db_path) as store:
+            asyncio.run(KnowledgePipeline(second, output, checkpoints=store, single_call=False)
+                .run_directory(exports))
+        assert second.calls == {"filter": 0, "summarize": 0, "categorize": 3}
+        assert len(list(output.rglob("*.md"))) == 3
+
+        third = FakeLLMClient()
+        with CheckpointStore(db_path) as store:
+            report = asyncio.run(KnowledgePipeline(third, output, checkpoints=store, single_call=False)
+                .run_directory(exports))
+        assert third.calls == {"filter": 0, "summarize": 0, "categorize": 0}
+        assert report["parse"]["items_out"] == 0
+
+    def test_filter_batches_across_conversations(self, tmp_path):
+        """Records of many small conversations share batch filter calls."""
+        exports, output = tmp_path / "exports", tmp_path / "kb"
+        exports.mkdir()
+        write_exports(exports, 10)
+        client = FakeLLMClient()
+        report = asyncio.run(KnowledgePipeline(client, output, single_call=False).run_directory(exports))
+        assert client.calls["filter"] < 10
+        assert report["filter"]["items_in"] == report["filter"]["items_out"] == 10
+        assert len(list(output.rglob("*.md"))) == 10
+
+    def test_crawl_resumes_without_downloading_again(self, tmp_path):
+        """After a crash mid-crawl, a restart only downloads the remaining chats; a finished crawl starts over."""
+        exports, output = tmp_path / "exports", tmp_path / "kb"
+        exports.mkdir()
+        db_path = tmp_path / "checkpoints.sqlite3"
+
+        crashed = FakeCrawler(exports, 4, crash_after=2)
+        with CheckpointStore(db_path) as store:
+            try:
+                asyncio.run(KnowledgePipeline(FakeLLMClient(), output, checkpoints=store, single_call=False)
+                    .run_crawler(crashed))
+            except RuntimeError as e:
+                assert "crashed" in str(e)
+            else:
+                raise AssertionError("expected the crawl to crash")
+        assert crashed.downloads == 2
+
+        resumed = FakeCrawler(exports, 4)
+        with CheckpointStore(db_path) as store:
+            asyncio.run(KnowledgePipeline(FakeLLMClient(), output, checkpoints=store, single_call=False)
+                .run_crawler(resumed))
+        assert resumed.downloads == 2 and resumed.is_exported is None
+        assert len(list(output.rglob("*.md"))) == 4
+
+        fresh = FakeCrawler(exports, 4)
+        with CheckpointStore(db_path) as store:
+            asyncio.run(KnowledgePipeline(FakeLLMClient(), output, checkpoints=store, single_call=False)
+                .run_crawler(fresh))
+        assert fresh.downloads == 4
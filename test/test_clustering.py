@@ -0,0 +1,79 @@
+import asyncio
+from pathlib import Path
+import sys
+# Add project root to path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from agents.workflow.clustering import CategoryHints, HashingTfidfEmbedder, TopicClusterer, build_clusters
+from agents.workflow.knowledge_base import KnowledgeEntry
+from agents.workflow.schemas import CategoryResult
+
+PYTHON = [
+    "Python asyncio 事件循环与协程: async def 定义协程, await 等待结果, asyncio.gather 并发执行多个任务",
+    "Python asyncio 中使用 asyncio.gather 并发运行协程, 用 await 等待, 事件循环负责调度 async 任务",
+    "Python asyncio 事件循环与协程: async def 定义协程, await 等待结果, asyncio.gather 并发执行多个任务。",
+]
+DOCKER = [
+    "Docker 镜像构建: 编写 Dockerfile, 使用多阶段构建减小镜像体积, docker build 生成镜像",
+    "使用 Dockerfile 多阶段构建 docker 镜像, docker build 与 docker run 的常用参数",
+]
+
+
+class FakeLLMClient:
+    """Names each cluster after its first example."""
+    def __init__(self):
+        self.calls = 0
+
+    async def astructured_completion(self, schema, messages, **kwargs):
+        self.calls += 1
+        category = "Programming/Python" if "asyncio" in messages[1]["content"] else "DevOps/Docker"
+        filename = category.lower().replace("/", "-") + ".md"
+        return CategoryResult(title=category, categories=[category], suggested_filename=filename)
+
+
+def make_entries(texts: list[str]) -> list[KnowledgeEntry]:
+    return [KnowledgeEntry(title=f"条目{i}", content=text) for i, text in enumerate(texts)]
+
+
+class TestClustering:
+    """Test local embedding, clustering and per-cluster categorization."""
+    def test_clusters_and_near_duplicates(self,):
+        """Topics separate, and the exact-but-punctuation duplicate collapses."""
+        texts = PYTHON + DOCKER
+        embeddings = HashingTfidfEmbedder().embed(texts)
+        clusters = build_clusters(embeddings, [len(text) for text in texts], 0.3, 0.9)
+        groups = sorted(sorted(cluster.members + list(cluster.duplicates)) for cluster in clusters)
+        assert groups == [[0, 1, 2], [3, 4]]
+        duplicates = {k: v for cluster in clusters for k, v in cluster.duplicates.items()}
+        assert duplicates == {0: 2}
+
+    def test_one_call_per_cluster_and_hint_reuse(self, tmp_path):
+        """Each cluster costs one call; persisted hints categorize similar entries without calls."""
+        client = FakeLLMClient()
+        hints_path = tmp_path / "hints.npz"
+        clusterer = TopicClusterer(client, embedder=HashingTfidfEmbedder(), hints=CategoryHints(hints_path),
+                                   cluster_threshold=0.3)
+        entries = make_entries(PYTHON + DOCKER)
+        asyncio.run(clusterer.categorize(entries))
+        assert client.calls == 2
+        assert [entry.categories for entry in entries[1:]] == [["Programming/Python"]] * 2 + [["DevOps/Docker"]] * 2
+        assert [entry.filename for entry in entries[1:]] == ["条目1", "条目2", "条目3", "条目4"]
+
+        reloaded = CategoryHints(hints_path, threshold=0.3)
+        assert reloaded.known_categories() == ["DevOps/Docker", "Programming/Python"]
+        clusterer.hints = reloaded
+        clusterer.embedder = HashingTfidfEmbedder()
+        again = make_entries(DOCKER[:1])
+        asyncio.run(clusterer.categorize(again))
+        assert client.calls == 2
+        assert again[0].categories == ["DevOps/Docker"]
+        # 文档频率从上次运行恢复, 簇中心在同样的 IDF 下比较
+        assert clusterer.embedder.docs == len(entries) + 1
+
+    def test_single_entry_cluster_uses_suggested_filename(self,):
+        """A cluster of one entry takes the LLM's suggested filename."""
+        clusterer = TopicClusterer(FakeLLMClient(), embedder=HashingTfidfEmbedder(), cluster_threshold=0.3)
+        entries = make_entries(DOCKER[:1])
+        asyncio.run(clusterer.categorize(entries))
+        assert entries[0].filename == "devops-docker.md"
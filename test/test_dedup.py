@@ -0,0 +1,43 @@
+from pathlib import Path
+import sys
+# Add project root to path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from agents.workflow.dedup import RecordDeduplicator
+from agents.workflow.parser.core.record import ChatRecord, Conversation
+
+
+def make_conversation(title: str, pairs: list[tuple[str, str]]) -> Conversation:
+    conv = Conversation(title)
+    conv.extend(ChatRecord(conv.title, question, answer) for question, answer in pairs)
+    return conv
+
+
+class TestDedup:
+    """Test record deduplication."""
+    def test_dedup_within_run(self,):
+        """Duplicates differing only in whitespace/case are dropped."""
+        dedup = RecordDeduplicator()
+        conversations = [
+            make_conversation("标题", [("问题", "回答"), ("问题2", "回答2")]),
+            make_conversation("标题", [("  问题 ", "回答"), ("新问题", "新回答")]),
+            make_conversation("标题", [("问题2", "回答2")]),
+        ]
+        result = list(dedup.filter(conversations))
+        assert [len(conv) for conv in result] == [2, 1]
+        assert result[1][0]["question"] == "新问题"
+        assert (dedup.kept, dedup.dropped) == (3, 2)
+
+    def test_dedup_persistent(self, tmp_path):
+        """Records are persisted only once marked seen, and then survive across runs."""
+        db_path = tmp_path / "seen.sqlite3"
+        conv = make_conversation("标题", [("问题", "回答")])
+        with RecordDeduplicator(db_path) as dedup:
+            assert len(dedup.filter_conversation(conv)) == 1
+        with RecordDeduplicator(db_path) as dedup:
+            assert len(dedup.filter_conversation(conv)) == 1
+            dedup.mark_seen(conv)
+        with RecordDeduplicator(db_path) as dedup:
+            assert dedup.is_seen(conv[0])
+            assert list(dedup.filter([conv])) == []
@@ -0,0 +1,51 @@
+from pathlib import Path
+import sys
+# Add project root to path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from agents.workflow.evaluation import EvaluationSampler
+from agents.workflow.knowledge_base import KnowledgeEntry
+
+
+def entry(category: str) -> KnowledgeEntry:
+    return KnowledgeEntry(title="t", content="c", categories=[f"{category}/Sub"])
+
+
+def key(i: int) -> str:
+    return f"{i * 2654435761 % 0xFFFFFFFF:08x}"
+
+
+class TestEvaluationSampler:
+    """Test stratified evaluation sampling and escalation."""
+    def test_strata_and_sampling_rate(self,):
+        """Each stratum gets its first items evaluated, then roughly the sampling rate."""
+        sampler = EvaluationSampler(rate=0.1, min_per_stratum=3, length_buckets=(1000, 4000))
+        assert sampler.stratum(entry("编程"), 500) == ("编程", "<1000")
+        assert sampler.stratum(entry("编程"), 2000) == ("编程", "1000-4000")
+        assert sampler.stratum(KnowledgeEntry(title="t", content="c"), 9000) == ("未分类", ">=4000")
+
+        picked = {category: sum(sampler.should_evaluate(key(i), entry(category), 500) for i in range(1000))
+                  for category in ("编程", "生活")}
+        for count in picked.values():
+            assert 3 + 50 < count < 3 + 150
+        report = sampler.report()
+        assert report["seen"] == 2000 and set(report["strata"]) == {"编程/<1000", "生活/<1000"}
+
+    def test_escalation_and_recovery(self,):
+        """A failing stratum is evaluated in full until its recent failure rate recovers."""
+        sampler = EvaluationSampler(rate=0.0, min_per_stratum=0, failure_threshold=0.2, min_samples=5, window=10)
+        good, bad = entry("编程"), entry("生活")
+        assert not sampler.should_evaluate(key(1), bad, 100)
+        for _ in range(5):
+            sampler.record(bad, 100, score=3)
+            sampler.record(good, 100, score=9)
+        assert sampler.escalated == [("生活", "<1000")]
+        assert sampler.should_evaluate(key(1), bad, 100)
+        assert not sampler.should_evaluate(key(1), good, 100)
+
+        for _ in range(9):
+            sampler.record(bad, 100, score=8)
+        assert sampler.escalated == []
+        assert not sampler.should_evaluate(key(1), bad, 100)
+        assert sampler.report()["strata"]["生活/<1000"]["failures"] == 5
@@ -0,0 +1,150 @@
+import asyncio
+import json
+from pathlib import Path
+import sys
+# Add project root to path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from agents.workflow.dedup import RecordDeduplicator
+from agents.workflow.evaluation import EvaluationSampler
+from agents.workflow.executor import WorkflowExecutor
+from agents.workflow.parser.core.record import Conversation
+from agents.workflow.pipeline import KnowledgePipeline
+from agents.workflow.prefilter import HeuristicPrefilter
+from agents.workflow.schemas import (
+    CategoryResult,
+    EvaluationResult,
+    FilterResult,
+    SimpleWorkflowResult,
+    SummaryResult,
+)
+
+
+class FakeLLMClient:
+    """Answers every schema; the single-call result can be made incomplete and the evaluation score set."""
+    def __init__(self, complete: bool = True, score: int = 9):
+        self.complete = complete
+        self.score = score
+        self.calls = {}
+
+    async def astructured_completion(self, schema, messages, **kwargs):
+        self.calls[schema.__name__] = self.calls.get(schema.__name__, 0) + 1
+        if schema is SimpleWorkflowResult:
+            if "天气" in messages[-1]["content"]:
+                return SimpleWorkflowResult(is_valuable=False, reason="chit-chat")
+            return SimpleWorkflowResult(
+                is_valuable=True, title="单次标题", summary="单次总结" if self.complete else "",
+                categories=["编程/Python"], suggested_filename=f"single-entry{self.calls['SimpleWorkflowResult']}",
+            )
+        if schema is EvaluationResult:
+            return EvaluationResult(score=self.score, issues=[])
+        if schema is FilterResult:
+            return FilterResult(is_valuable=True, reason="ok")
+        if schema is SummaryResult:
+            return SummaryResult(needs_summary=True, summary="分阶段总结")
+        return CategoryResult(title="分阶段标题", categories=["编程/Python"], suggested_filename="staged-entry")
+
+
+def write_exports(directory: Path, questions: list[str]) -> None:
+    directory.mkdir(exist_ok=True)
+    for i, question in enumerate(questions):
+        conv = [{"title": f"对话{i}", "chat": {"messages": [
+            {"role": "user", "content": question},
+            {"role": "assistant", "content": f"回答{i}", "error": None},
+        ]}}]
+        (directory / f"chat_{i}.json").write_text(json.dumps(conv, ensure_ascii=False), encoding="utf-8")
+
+
+def conversation(question: str = "如何使用 asyncio.gather") -> Conversation:
+    return Conversation("对话", [{"title": "对话", "question": question, "answer": "使用 await asyncio.gather(...)"}])
+
+
+class TestWorkflowExecutor:
+    """Test the single-call workflow and its fallbacks to the staged agents."""
+    def test_single_call_per_conversation(self,):
+        """A well-formed result costs one call per conversation; worthless ones are dropped."""
+        client = FakeLLMClient()
+        executor = WorkflowExecutor(client)
+        entry = asyncio.run(executor.run(conversation()))
+        assert entry.content == "单次总结" and entry.filename == "single-entry1"
+        assert asyncio.run(executor.run(conversation("今天天气怎么样"))) is None
+        assert client.calls == {"SimpleWorkflowResult": 2}
+        report = executor.report()
+        assert report["calls"] == 2 and report["calls_per_kept"] == 2.0
+
+    def test_prefilter_learns_and_counts_saved_calls(self,):
+        """Single-call verdicts train the prefilter; fully rejected conversations count as saved calls."""
+        prefilter = HeuristicPrefilter()
+        executor = WorkflowExecutor(FakeLLMClient(), prefilter=prefilter)
+        asyncio.run(executor.run(conversation()))
+        asyncio.run(executor.run(conversation("今天天气怎么样")))
+        assert prefilter.classifier.class_counts == [1, 1]
+        greeting = Conversation("对话", [{"title": "对话", "question": "你好", "answer": "你好!"}])
+        assert asyncio.run(executor.run(greeting)) is None
+        assert executor.stats.prefiltered == 1 and executor.calls == 2
+        assert prefilter.report(executor.stats.prefiltered)["calls_saved"] == 1
+
+    def test_invalid_result_falls_back(self,):
+        """A valuable verdict without a summary falls back to filter → summarize → categorize."""
+        client = FakeLLMClient(complete=False)
+        executor = WorkflowExecutor(client)
+        entry = asyncio.run(executor.run(conversation()))
+        assert entry.title == "分阶段标题" and entry.filename == "staged-entry"
+        assert executor.stats.invalid_fallbacks == 1
+        assert client.calls["FilterResult"] == 1 and client.calls["CategoryResult"] == 1
+        assert executor.calls == sum(client.calls.values())
+
+    def test_low_evaluation_score_falls_back(self,):
+        """Sampled results scoring under the threshold are redone by the staged agents."""
+        client = FakeLLMClient(score=3)
+        executor = WorkflowExecutor(client, evaluation=EvaluationSampler(min_score=6))
+        entry = asyncio.run(executor.run(conversation()))
+        assert entry.filename == "staged-entry"
+        assert executor.stats.evaluations == 1 and executor.stats.low_score_fallbacks == 1
+
+        client = FakeLLMClient(score=8)
+        executor = WorkflowExecutor(client, evaluation=EvaluationSampler(min_score=6))
+        assert asyncio.run(executor.run(conversation())).filename == "single-entry1"
+        assert executor.stats.low_score_fallbacks == 0
+
+    def test_oversize_conversation_uses_staged_agents(self,):
+        """Conversations over the single-call budget skip the single call."""
+        client = FakeLLMClient()
+        executor = WorkflowExecutor(client, single_call_budget=5)
+        entry = asyncio.run(executor.run(conversation()))
+        assert entry.filename == "staged-entry"
+        assert "SimpleWorkflowResult" not in client.calls and executor.stats.oversize_fallbacks == 1
+
+    def test_pipeline_single_call_mode(self, tmp_path):
+        """The knowledge pipeline writes entries with one call per conversation by default."""
+        exports, output = tmp_path / "exports", tmp_path / "kb"
+        write_exports(exports, [f"问题{i}" for i in range(3)])
+        client = FakeLLMClient()
+        pipeline = KnowledgePipeline(client, output)
+        report = asyncio.run(pipeline.run_directory(exports))
+        assert client.calls == {"SimpleWorkflowResult": 3}
+        assert report["process"]["items_out"] == 3
+        assert len(list(output.rglob("*.md"))) == 3
+
+    def test_pipeline_marks_rejected_seen_and_avoids_collisions(self, tmp_path):
+        """Rejected records are not re-sent on the next run; equal filenames do not overwrite each other."""
+        exports, output = tmp_path / "exports", tmp_path / "kb"
+        write_exports(exports, ["问题0", "问题1", "今天天气怎么样"])
+
+        class SameFilenameClient(FakeLLMClient):
+            async def astructured_completion(self, schema, messages, **kwargs):
+                result = await super().astructured_completion(schema, messages, **kwargs)
+                if result.is_valuable:
+                    result.suggested_filename = "same"
+                return result
+
+        with RecordDeduplicator(tmp_path / "seen.sqlite3") as dedup:
+            client = SameFilenameClient()
+            asyncio.run(KnowledgePipeline(client, output, dedup=dedup).run_directory(exports))
+            assert client.calls == {"SimpleWorkflowResult": 3}
+            assert sorted(path.name for path in output.rglob("*.md")) == ["same-2.md", "same.md"]
+
+            client = SameFilenameClient()
+            asyncio.run(KnowledgePipeline(client, output, dedup=dedup).run_directory(exports))
+            assert client.calls == {}
@@ -0,0 +1,92 @@
+from pathlib import Path
+import sys
+# Add project root to path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from CrawlBrowser.crawlers import export_manifest
+from CrawlBrowser.crawlers.export_manifest import ExportManifest
+
+
+def write_chat(path: Path, text: str = "[]") -> Path:
+    path.write_text(text, encoding="utf-8")
+    return path
+
+
+class TestExportManifest:
+    """Test the persistent export manifest used for incremental exports."""
+    def test_record_save_and_reload(self, tmp_path):
+        """Recorded exports survive a save/load round-trip and are keyed per platform."""
+        manifest_path = tmp_path / "manifests" / "qwen_manifest.json"
+        chat = write_chat(tmp_path / "chat_a.json", '[{"title": "a"}]')
+        manifest = ExportManifest(manifest_path, "qwen")
+        key = ExportManifest.make_key("标题 ", "分组", "abc123")
+        assert key == "分组/标题#abc123"
+        manifest.record(key, chat, "sig-1")
+        manifest.save()
+
+        reloaded = ExportManifest(manifest_path, "qwen")
+        entry = reloaded.entries[key]
+        assert entry["signature"] == "sig-1" and entry["path"] == str(chat)
+        assert entry["content_hash"] == ExportManifest.hash_file(chat)
+        assert ExportManifest(manifest_path, "other").entries == {}
+
+    def test_save_is_atomic(self, tmp_path, monkeypatch):
+        """A crash while writing leaves the previous manifest intact."""
+        manifest_path = tmp_path / "manifest.json"
+        chat = write_chat(tmp_path / "chat_a.json")
+        manifest = ExportManifest(manifest_path, "qwen")
+        manifest.record("a", chat, "sig-1")
+        manifest.save()
+
+        def crash(data, path, indent=False):
+            Path(path).write_text('{"qwen": {"b"', encoding="utf-8")
+            raise OSError("disk full")
+        monkeypatch.setattr(export_manifest.json_codec, "dump", crash)
+        manifest.record("b", chat, "sig-2")
+        try:
+            manifest.save()
+        except OSError:
+            pass
+        else:
+            raise AssertionError("expected OSError")
+        monkeypatch.undo()
+        assert set(ExportManifest(manifest_path, "qwen").entries) == {"a"}
+
+    def test_is_unchanged(self, tmp_path):
+        """Only a matching signature for an existing export counts as unchanged."""
+        chat = write_chat(tmp_path / "chat_a.json")
+        manifest = ExportManifest(tmp_path / "manifest.json", "qwen")
+        assert not manifest.is_unchanged("a", "sig-1")
+        manifest.record("a", chat, "sig-1")
+        assert manifest.is_unchanged("a", "sig-1")
+        assert not manifest.is_unchanged("a", "sig-2")
+        # 没有签名时无法判断, 视为有变化
+        assert not manifest.is_unchanged("a", None)
+        manifest.record("b", chat, None)
+        assert not manifest.is_unchanged("b", None)
+        chat.unlink()
+        assert not manifest.is_unchanged("a", "sig-1")
+
+    def test_touch_and_flush(self, tmp_path):
+        """touch updates last_seen only; record flushes to disk every flush_every exports."""
+        manifest_path = tmp_path / "manifest.json"
+        chat = write_chat(tmp_path / "chat_a.json")
+        manifest = ExportManifest(manifest_path, "qwen", flush_every=2)
+        manifest.touch("missing")
+        assert manifest.entries == {}
+
+        manifest.record("a", chat, "sig-1")
+        assert not manifest_path.exists()
+        exported_at = manifest.entries["a"]["exported_at"]
+        manifest.entries["a"]["last_seen"] = 0.0
+        manifest.touch("a")
+        assert manifest.entries["a"]["last_seen"] > 0.0 and manifest.entries["a"]["exported_at"] == exported_at
+
+        manifest.record("b", chat, "sig-2")
+        assert set(ExportManifest(manifest_path, "qwen").entries) == {"a", "b"}
+
+    def test_corrupt_manifest_starts_empty(self, tmp_path):
+        """An unreadable manifest file is replaced by an empty manifest."""
+        manifest_path = write_chat(tmp_path / "manifest.json", "{not json")
+        assert ExportManifest(manifest_path, "qwen").entries == {}
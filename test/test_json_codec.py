@@ -0,0 +1,35 @@
+import importlib
+from pathlib import Path
+import sys
+# Add project root to path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+import pytest
+
+from utils import json_codec
+
+
+class TestJsonCodec:
+    """Test JSON backend selection."""
+    def test_unavailable_env_backend_falls_back(self, monkeypatch):
+        """An unavailable JSON_BACKEND warns and falls back to stdlib instead of failing the import."""
+        monkeypatch.setenv("JSON_BACKEND", "missing")
+        try:
+            with pytest.warns(RuntimeWarning, match="falling back to stdlib"):
+                importlib.reload(json_codec)
+            assert json_codec.backend == "stdlib"
+            assert json_codec.loads(json_codec.dumps({"键": [1, 2]})) == {"键": [1, 2]}
+            with pytest.raises(ValueError):
+                json_codec.get_codec("missing")
+        finally:
+            monkeypatch.delenv("JSON_BACKEND")
+            importlib.reload(json_codec)
+
+    def test_sorted_keys_and_default_on_every_backend(self,):
+        """sort_keys orders object keys and default encodes unsupported values, whatever the backend."""
+        payload = {"b": 1, "a": {"d": object, "c": "中文"}}
+        for name in json_codec.available_backends():
+            encoded = json_codec.get_codec(name).dumps(payload, sort_keys=True, default=repr)
+            assert encoded.index('"a"') < encoded.index('"b"') and encoded.index('"c"') < encoded.index('"d"')
+            assert json_codec.loads(encoded) == {"a": {"c": "中文", "d": repr(object)}, "b": 1}
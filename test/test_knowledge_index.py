@@ -0,0 +1,74 @@
+from pathlib import Path
+import sys
+# Add project root to path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from agents.workflow.clustering import HashingTfidfEmbedder
+from agents.workflow.knowledge_base import KnowledgeBaseWriter, KnowledgeEntry
+from agents.workflow.knowledge_index import KnowledgeIndex
+
+ENTRIES = [
+    KnowledgeEntry(title="Python 异步编程", content="asyncio 事件循环, async/await 协程与 gather 并发",
+                   categories=["Programming/Python"], filename="python-async", key="python"),
+    KnowledgeEntry(title="Docker 多阶段构建", content="Dockerfile 多阶段构建减小镜像体积, docker build",
+                   categories=["DevOps/Docker"], filename="docker-multi-stage"),
+    KnowledgeEntry(title="Rust 所有权", content="所有权、借用与生命周期, borrow checker 的规则",
+                   categories=["Programming/Rust"], filename="rust-ownership"),
+]
+
+
+class TestKnowledgeIndex:
+    """Test the incremental vector + keyword knowledge base index."""
+    def test_incremental_search_and_category_filter(self, tmp_path):
+        """Entries are indexed as they are written and searchable by meaning, keyword and category."""
+        index = KnowledgeIndex(tmp_path / ".index", embedder=HashingTfidfEmbedder(dim=512))
+        writer = KnowledgeBaseWriter(tmp_path, index=index)
+        for entry in ENTRIES:
+            writer.write(entry)
+        assert len(index) == 3
+        assert index.search("asyncio 协程并发", k=1)[0].title == "Python 异步编程"
+        assert index.search("docker 镜像", k=1)[0].title == "Docker 多阶段构建"
+        programming = index.search("docker 镜像", k=5, category="programming")
+        assert {result.title for result in programming} == {"Python 异步编程", "Rust 所有权"}
+        assert index.search("anything", category="Cooking") == []
+
+    def test_reopen_overwrite_and_truncated_write(self, tmp_path):
+        """The index persists, rewrites supersede old rows and a torn append is dropped on load."""
+        root = tmp_path / ".index"
+        writer = KnowledgeBaseWriter(tmp_path, index=KnowledgeIndex(root, embedder=HashingTfidfEmbedder(dim=512)))
+        for entry in ENTRIES:
+            writer.write(entry)
+        rewritten = KnowledgeEntry(title="Python 异步编程(修订)", content=ENTRIES[0].content,
+                                   categories=["Programming/Python"], filename="python-async", key="python")
+        writer.write(rewritten)
+
+        index = KnowledgeIndex(root, embedder=HashingTfidfEmbedder(dim=512))
+        assert len(index) == 3
+        titles = [result.title for result in index.search("asyncio", k=5)]
+        assert "Python 异步编程(修订)" in titles and "Python 异步编程" not in titles
+
+        # 模拟写入向量后、写入元数据前崩溃
+        with open(root / "embeddings.f32", "ab") as f:
+            f.write(b"\0" * 512 * 4)
+        index = KnowledgeIndex(root, embedder=HashingTfidfEmbedder(dim=512))
+        assert len(index.entries) == 4
+        assert (root / "embeddings.f32").stat().st_size == 4 * 512 * 4
+
+    def test_reopen_restores_idf_and_missing_vectors(self, tmp_path):
+        """Reopening restores the TF-IDF state; records without a vector file are dropped instead of crashing."""
+        root = tmp_path / ".index"
+        embedder = HashingTfidfEmbedder(dim=512)
+        writer = KnowledgeBaseWriter(tmp_path, index=KnowledgeIndex(root, embedder=embedder))
+        for entry in ENTRIES:
+            writer.write(entry)
+
+        reopened = HashingTfidfEmbedder(dim=512)
+        KnowledgeIndex(root, embedder=reopened)
+        assert reopened.docs == 3 and (reopened.doc_freq == embedder.doc_freq).all()
+        query = ["asyncio 协程"]
+        assert (reopened.embed(query, update=False) == embedder.embed(query, update=False)).all()
+
+        (root / "embeddings.f32").unlink()
+        index = KnowledgeIndex(root, embedder=HashingTfidfEmbedder(dim=512))
+        assert len(index) == 0 and index.search("asyncio") == []
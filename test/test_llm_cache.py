@@ -0,0 +1,62 @@
+from pathlib import Path
+import sys
+# Add project root to path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from pydantic import BaseModel
+
+from utils.llm_cache import LLMResponseCache, make_cache_key
+
+
+class Verdict(BaseModel):
+    is_valuable: bool
+
+
+class TestLLMCache:
+    """Test LLM response cache."""
+    def test_cache_key(self,):
+        """Keys change with model, temperature, messages and schema."""
+        messages = [{"role": "user", "content": "你好"}]
+        key = make_cache_key("qwen-plus", 0.0, messages)
+        assert key == make_cache_key("qwen-plus", 0.0, [dict(m) for m in messages])
+        assert key != make_cache_key("qwen-max", 0.0, messages)
+        assert key != make_cache_key("qwen-plus", 0.7, messages)
+        assert key != make_cache_key("qwen-plus", 0.0, messages, Verdict)
+
+    def test_cache_hit_miss_and_eviction(self, tmp_path):
+        """Hits/misses are counted and LRU entries are evicted over the limit."""
+        cache = LLMResponseCache(tmp_path / "llm_cache.sqlite3", max_entries=2, evict_every=1)
+        assert cache.get("a") is None
+        cache.set("a", "answer")
+        cache.set("b", {"is_valuable": True})
+        assert cache.get("a") == "answer"
+        cache.set("c", "newest")
+        assert cache.get("b") is None
+        assert cache.get("a") == "answer"
+        stats = cache.stats()
+        assert (stats["hits"], stats["misses"], stats["entries"]) == (2, 2, 2)
+
+    def test_cache_max_age(self,):
+        """Entries older than max_age are treated as misses."""
+        import time
+        cache = LLMResponseCache(max_age=0.01)
+        cache.set("a", "answer")
+        time.sleep(0.02)
+        assert cache.get("a") is None
+
+    def test_batched_access_times_and_size_eviction(self, tmp_path):
+        """Hits are buffered and flushed in batches; eviction removes LRU entries until the size limit holds."""
+        path = tmp_path / "llm_cache.sqlite3"
+        cache = LLMResponseCache(path, max_bytes=25, evict_every=1000, flush_every=2)
+        for key in "abc":
+            cache.set(key, "x" * 8)  # 10 bytes each
+        cache.get("a")
+        assert cache._accessed == {"a": cache._accessed["a"]}
+        cache.get("b")
+        assert cache._accessed == {}
+        cache.evict()
+        assert cache.get("c") is None
+        assert cache.stats()["bytes"] == 20
+        cache.close()
+        assert LLMResponseCache(path).get("a") == "x" * 8
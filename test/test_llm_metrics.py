@@ -0,0 +1,46 @@
+import asyncio
+from pathlib import Path
+import sys
+# Add project root to path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, LLMResult
+
+from utils.llm_client import LLMClient
+
+
+class FakeStreamingChat:
+    """Streams partial structured outputs, then reports usage to the run's callbacks like a chat model."""
+    def with_structured_output(self, schema, **kwargs):
+        return self
+
+    async def astream(self, messages, config=None):
+        for partial in ({"is_valuable": True}, {"is_valuable": True, "reason": "use"},
+                        {"is_valuable": True, "reason": "useful"}):
+            await asyncio.sleep(0.02)
+            yield partial
+        message = AIMessage(content="", usage_metadata={
+            "input_tokens": 120, "output_tokens": 8, "total_tokens": 128,
+        })
+        for callback in (config or {}).get("callbacks", []):
+            callback.on_llm_end(LLMResult(generations=[[ChatGeneration(message=message)]]))
+
+
+class TestLLMMetrics:
+    """Test per-call latency and token usage metrics."""
+    def test_structured_stream_records_ttft_and_usage(self,):
+        """A structured stream records time-to-first-token before completion and the final token usage."""
+        client = LLMClient()
+        client._chat = FakeStreamingChat()
+
+        async def consume():
+            return [partial async for partial in client.astream_structured_completion(
+                dict, [{"role": "user", "content": "record"}])]
+
+        partials = asyncio.run(consume())
+        assert partials[-1] == {"is_valuable": True, "reason": "useful"}
+        call = client.metrics.history[-1]
+        assert call.ttft < call.latency
+        assert (call.input_tokens, call.output_tokens) == (120, 8)
@@ -0,0 +1,80 @@
+import asyncio
+from pathlib import Path
+import sys
+# Add project root to path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from utils import llm_client
+from utils.http_pool import PoolConfig
+from utils.llm_client import LLMClientRegistry, get_client_registry, get_llm_client, reset_llm_client
+
+
+class RecordingLogger:
+    """Collects warning messages."""
+    def __init__(self):
+        self.warnings = []
+
+    def warning(self, message, *args):
+        self.warnings.append(message % args)
+
+    def info(self, *args):
+        pass
+
+    debug = info
+
+
+class TestLLMClientRegistry:
+    """Test the process-wide client registry and shared HTTP pools."""
+    def test_clients_keyed_by_base_and_model(self,):
+        """The same base URL and model return one client; every client of a base URL shares its pool."""
+        registry = LLMClientRegistry(PoolConfig(max_connections=10, keepalive_expiry=5.0))
+        client = registry.get("https://api.example.com/v1", "model-a")
+        assert registry.get("https://api.example.com/v1", "model-a") is client
+        other_model = registry.get("https://api.example.com/v1", "model-b")
+        other_base = registry.get("https://other.example.com/v1", "model-a")
+        assert other_model is not client and len(registry) == 3
+
+        assert client.chat.http_async_client is other_model.chat.http_async_client
+        assert client.chat.http_async_client is not other_base.chat.http_async_client
+        assert len(registry.pool) == 2
+
+        custom = registry.create("https://api.example.com/v1", "model-a", temperature=0.5)
+        assert custom is not client and custom.temperature == 0.5
+        assert custom.chat.http_client is client.chat.http_client
+        asyncio.run(registry.aclose())
+        assert len(registry) == 0 and len(registry.pool) == 0
+
+    def test_global_registry(self,):
+        """get_llm_client reuses one client per key until reset."""
+        reset_llm_client()
+        client = get_llm_client(model="model-a")
+        assert get_llm_client(model="model-a") is client
+        assert get_llm_client(model="model-b") is not client
+        reset_llm_client()
+        assert get_llm_client(model="model-a") is not client
+        reset_llm_client()
+
+    def test_reset_closes_pools(self, monkeypatch):
+        """reset_llm_client closes the shared pools, and a mismatched pool config or second event loop is reported."""
+        recorder = RecordingLogger()
+        monkeypatch.setattr(llm_client, "logger", recorder)
+        reset_llm_client()
+        registry = get_client_registry(PoolConfig(max_connections=10))
+        client = get_llm_client(model="model-a")
+        http_client, http_async_client = client.chat.http_client, client.chat.http_async_client
+        assert get_client_registry(PoolConfig(max_connections=10)) is registry and not recorder.warnings
+        assert get_client_registry(PoolConfig(max_connections=20)) is registry
+        assert len(recorder.warnings) == 1 and "max_connections=10" in recorder.warnings[0]
+
+        async def lookup():
+            return get_llm_client(model="model-a")
+        asyncio.run(lookup())
+        asyncio.run(lookup())
+        assert len(recorder.warnings) == 2 and "event loop" in recorder.warnings[1]
+
+        reset_llm_client()
+        assert http_client.is_closed and http_async_client.is_closed
+        assert len(registry) == 0 and len(registry.pool) == 0
+        assert get_client_registry() is not registry
+        reset_llm_client()
@@ -0,0 +1,165 @@
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+import sys
+# Add project root to path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from agents.workflow.schemas import FilterResult
+from utils.llm_client import reset_llm_client
+from utils.llm_router import LLMRouter
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """OpenAI-compatible /chat/completions answering with the server's name."""
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        server = self.server
+        server.requests += 1
+        time.sleep(server.delay)
+        if server.status != 200:
+            self.send_response(server.status)
+            self.send_header("Content-Type", "application/json")
+            self.end_headers()
+            self.wfile.write(json.dumps({"error": {"message": "stub failure", "type": "server_error"}}).encode())
+            return
+
+        message = {"role": "assistant", "content": server.name}
+        if body.get("tools"):
+            message = {"role": "assistant", "content": "", "tool_calls": [{
+                "id": "call_1", "type": "function",
+                "function": {
+                    "name": body["tools"][0]["function"]["name"],
+                    "arguments": json.dumps({"is_valuable": True, "reason": server.name}),
+                },
+            }]}
+        response = {
+            "id": "stub", "object": "chat.completion", "created": 0, "model": body["model"],
+            "choices": [{"index": 0, "message": message, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": 10, "completion_tokens": 5, "total_tokens": 15},
+        }
+        payload = json.dumps(response).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+class StubServer:
+    """Runs a stub provider in a background thread."""
+    def __init__(self, name: str, delay: float = 0.0, status: int = 200):
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.name, self.httpd.delay, self.httpd.status, self.httpd.requests = name, delay, status, 0
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    @property
+    def requests(self) -> int:
+        return self.httpd.requests
+
+    def config(self, **extra) -> dict:
+        return {"api_base": f"http://127.0.0.1:{self.httpd.server_address[1]}/v1", "model": self.httpd.name,
+                "api_key": "stub", **extra}
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+MESSAGES = [{"role": "system", "content": "Judge the record."}, {"role": "user", "content": "record"}]
+
+
+def run_router(servers: list[StubServer], calls, **kwargs):
+    """Build a router on a fresh registry and run `calls(router)` against it."""
+    reset_llm_client()
+    router = LLMRouter.from_configs({server.httpd.name: server.config(**kwargs.pop(server.httpd.name, {}))
+                                     for server in servers}, **kwargs)
+    try:
+        return router, asyncio.run(calls(router))
+    finally:
+        for server in servers:
+            server.close()
+        reset_llm_client()
+
+
+class TestLLMRouter:
+    """Test multi-backend routing, failover and hedging against local stub providers."""
+    def test_routes_by_schema(self,):
+        """Structured calls follow their route; other calls may use any backend."""
+        fast, strong = StubServer("fast"), StubServer("strong")
+
+        async def calls(router):
+            verdicts = [await router.astructured_completion(FilterResult, MESSAGES) for _ in range(3)]
+            chat = await router.achat_completion(MESSAGES, route="summary")
+            return verdicts, chat
+
+        routes = {"FilterResult": ["fast"], "summary": ["strong"]}
+        router, (verdicts, chat) = run_router([fast, strong], calls, routes=routes)
+        assert [verdict.reason for verdict in verdicts] == ["fast"] * 3
+        assert chat == "strong"
+        assert router.report()["fast"]["requests"] == 3
+
+    def test_failover_and_cooldown(self,):
+        """A failing backend is skipped over within the call and avoided while rate limited."""
+        down, limited, up = StubServer("down", status=500), StubServer("limited", status=429), StubServer("up")
+
+        async def calls(router):
+            return [(await router.astructured_completion(FilterResult, MESSAGES)).reason for _ in range(4)]
+
+        router, reasons = run_router([down, limited, up], calls, hedge=False, cooldown=60,
+                                     down={"weight": 100}, limited={"weight": 10})
+        assert reasons == ["up"] * 4
+        assert limited.requests == 1
+        assert router.backends["down"].stats.errors == down.requests >= 1
+        assert router.candidates("FilterResult")[0].name == "up"
+
+    def test_hedged_request_wins_on_slow_backend(self,):
+        """A request outliving the hedge delay is raced on the next backend."""
+        slow, fast = StubServer("slow", delay=2.0), StubServer("fast")
+
+        async def calls(router):
+            started = time.perf_counter()
+            result = await router.astructured_completion(FilterResult, MESSAGES)
+            return result.reason, time.perf_counter() - started
+
+        router, (reason, elapsed) = run_router([slow, fast], calls, hedge_after=0.2, slow={"weight": 100})
+        assert reason == "fast" and elapsed < 1.5
+        stats = router.backends["fast"].stats
+        assert stats.hedges == 1 and stats.hedge_wins == 1
+        slow_stats = router.backends["slow"].stats
+        assert slow_stats.latency_ewma >= 0.2 and not slow_stats.latencies
+
+    def test_backend_defaults_and_empty_route(self,):
+        """Backends do not retry in place, and a router without backends fails with a clear error."""
+        up = StubServer("up")
+
+        async def calls(router):
+            return await router.astructured_completion(FilterResult, MESSAGES)
+
+        router, verdict = run_router([up], calls)
+        assert verdict.reason == "up" and router.backends["up"].client.max_retries == 0
+        try:
+            asyncio.run(LLMRouter([]).astructured_completion(FilterResult, MESSAGES))
+        except RuntimeError as e:
+            assert "FilterResult" in str(e)
+        else:
+            raise AssertionError("expected RuntimeError")
+
+    def test_no_hedge_onto_cooling_backend(self,):
+        """A slow request is not hedged onto a backend cooling down after a 429."""
+        limited, slow = StubServer("limited", status=429), StubServer("slow", delay=0.5)
+
+        async def calls(router):
+            return [(await router.astructured_completion(FilterResult, MESSAGES)).reason for _ in range(2)]
+
+        router, reasons = run_router([limited, slow], calls, hedge_after=0.2, cooldown=60, limited={"weight": 100})
+        assert reasons == ["slow", "slow"]
+        assert limited.requests == 1 and router.backends["limited"].stats.hedges == 0
@@ -0,0 +1,93 @@
+import asyncio
+from pathlib import Path
+import sys
+# Add project root to path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from utils.llm_scheduler import RateLimitedScheduler, TokenBucket
+
+
+class RateLimitError(Exception):
+    status_code = 429
+
+
+class TestLLMScheduler:
+    """Test adaptive rate-limited scheduler."""
+    def test_stream_completion_order_and_error_isolation(self,):
+        """Results stream in completion order and one failure does not cancel siblings."""
+        async def job(delay: float, fail: bool = False):
+            await asyncio.sleep(delay)
+            if fail:
+                raise ValueError("boom")
+            return delay
+
+        async def run():
+            scheduler = RateLimitedScheduler(max_concurrency=3)
+            jobs = [lambda: job(0.03), lambda: job(0.01, fail=True), lambda: job(0.02)]
+            return [result async for result in scheduler.stream(jobs)]
+
+        results = asyncio.run(run())
+        assert [result.index for result in results] == [1, 2, 0]
+        assert isinstance(results[0].error, ValueError)
+        assert results[2].value == 0.03
+
+    def test_rate_limit_backoff(self,):
+        """429 errors shrink the concurrency limit and are retried."""
+        calls = {"count": 0}
+
+        async def flaky():
+            calls["count"] += 1
+            if calls["count"] <= 2:
+                raise RateLimitError()
+            return "ok"
+
+        async def run():
+            scheduler = RateLimitedScheduler(max_concurrency=8, backoff_base=0.001)
+            value = await scheduler.run(flaky)
+            return scheduler, value
+
+        scheduler, value = asyncio.run(run())
+        assert value == "ok"
+        assert scheduler.throttled == 2
+        assert scheduler.concurrency.limit == 2
+
+    def test_token_bucket_rate(self,):
+        """Acquiring beyond the burst capacity waits for refill."""
+        async def run():
+            bucket = TokenBucket(rate_per_minute=6000, capacity=10)  # 100 tokens/s
+            started = asyncio.get_running_loop().time()
+            await bucket.acquire(10)
+            await bucket.acquire(5)
+            return asyncio.get_running_loop().time() - started
+
+        assert asyncio.run(run()) >= 0.04
+
+    def test_bare_coroutine_throttles(self,):
+        """A 429 from a non-retriable coroutine still shrinks the concurrency limit."""
+        async def limited():
+            raise RateLimitError()
+
+        async def run():
+            scheduler = RateLimitedScheduler(max_concurrency=8)
+            results = await scheduler.map([limited()])
+            return scheduler, results[0]
+
+        scheduler, result = asyncio.run(run())
+        assert isinstance(result.error, RateLimitError) and result.attempts == 1
+        assert scheduler.throttled == 1 and scheduler.concurrency.limit == 4
+
+    def test_concurrent_throttles_halve_once(self,):
+        """429s from requests that were in flight together cut the limit once."""
+        async def limited():
+            await asyncio.sleep(0.01)
+            raise RateLimitError()
+
+        async def run():
+            scheduler = RateLimitedScheduler(max_concurrency=16)
+            results = await scheduler.map([limited() for _ in range(16)])
+            return scheduler, results
+
+        scheduler, results = asyncio.run(run())
+        assert all(isinstance(result.error, RateLimitError) for result in results)
+        assert scheduler.throttled == 16 and scheduler.concurrency.limit == 8
@@ -5,6 +5,7 @@ import sys
 project_root = Path(__file__).parent.parent
 sys.path.insert(0, str(project_root))
 from agents.workflow.parser.core.factory import ParserFactory
+from utils import json_codec
 
 
 class TestParser:
@@ -15,9 +16,7 @@ class TestParser:
         parser = factory.get_parser("qwen")
         assert parser is not None
         file_path = project_root / "conversations" / "qwen_test.json"
-        with open(file_path, "r", encoding="utf-8") as f:
-            import json
-            raw_data = json.load(f)
+        raw_data = json_codec.load(file_path)
         result = parser.parse(raw_data)
         print(f"共解析{len(result)}条记录")
     
@@ -27,9 +26,71 @@ class TestParser:
         parser = factory.get_parser("qwen")
         assert parser is not None
         file_path = project_root / "conversations" / "qwen_total_test.json"
-        with open(file_path, "r", encoding="utf-8") as f:
-            import json
-            raw_data = json.load(f)
+        raw_data = json_codec.load(file_path)
         result = parser.parse(raw_data)
         print(f"共解析{len(result)}条记录")
 
+
+    def test_qwen_parser_stream(self, tmp_path):
+        """Test streaming parse yields the same records as the in-memory parse."""
+        import json
+        from agents.workflow.parser import iter_chat_file
+        from agents.workflow.parser.utils.json_stream import iter_json_array
+        raw_data = {
+            "success": True,
+            "meta": {"total": 3, "tags": ["a", "b"]},
+            "data": [
+                {
+                    "title": f"对话{i}",
+                    "chat": {"messages": [
+                        {"role": "user", "content": f"问题{i} \"quoted\" 12345"},
+                        {"role": "assistant", "content": f"回答{i}\n" * 50, "error": None},
+                    ]},
+                }
+                for i in range(3)
+            ],
+        }
+        file_path = tmp_path / "qwen_total.json"
+        file_path.write_text(json.dumps(raw_data, ensure_ascii=False, indent=2), encoding="utf-8")
+
+        expected = ParserFactory.get_parser("qwen").parse(raw_data)
+        assert list(iter_chat_file(file_path, "qwen")) == expected
+        # 极小的读取块也要能正确拼接被截断的值
+        assert list(iter_json_array(file_path, "data", chunk_size=7)) == raw_data["data"]
+        with pytest.raises(ValueError):
+            list(iter_json_array(file_path, "missing", chunk_size=7))
+
+    def test_chat_record_compat(self,):
+        """Test ChatRecord keeps the dict shape and shares the conversation title."""
+        import pickle
+        import sys as _sys
+        from agents.workflow.parser.core.record import ChatRecord, Conversation
+        conv = Conversation("标题")
+        conv.append(ChatRecord(conv.title, "问题", "回答"))
+        conv.append(ChatRecord(conv.title, "问题2", "回答2"))
+        record = conv[0]
+        assert record["question"] == "问题"
+        assert record == {"title": "标题", "question": "问题", "answer": "回答"}
+        assert dict(record) == record.to_dict()
+        assert conv[0].title is conv[1].title
+        assert conv.to_dicts()[1]["answer"] == "回答2"
+        assert pickle.loads(pickle.dumps(conv)) == conv
+        assert _sys.getsizeof(record) < _sys.getsizeof(record.to_dict())
+
+    def test_parse_chat_dir(self, tmp_path):
+        """Test directory parse merges files in a deterministic order."""
+        import json
+        from agents.workflow.parser import parse_chat_dir
+        (tmp_path / "group").mkdir()
+        for i, folder in enumerate([tmp_path, tmp_path / "group", tmp_path]):
+            conv = [{"title": f"对话{i}", "chat": {"messages": [
+                {"role": "user", "content": f"问题{i}"},
+                {"role": "assistant", "content": f"回答{i}", "error": None},
+            ]}}]
+            (folder / f"chat_{i}.json").write_text(json.dumps(conv, ensure_ascii=False), encoding="utf-8")
+        (tmp_path / "chat_broken.json").write_text("{", encoding="utf-8")
+
+        serial = parse_chat_dir(tmp_path, "qwen", max_workers=1)
+        parallel = parse_chat_dir(tmp_path, "qwen", max_workers=2, chunksize=1)
+        assert [conv.title for conv in serial] == ["对话0", "对话2", "对话1"]
+        assert parallel == serial
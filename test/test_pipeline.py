@@ -0,0 +1,78 @@
+import asyncio
+from pathlib import Path
+import sys
+# Add project root to path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from agents.workflow.pipeline import Pipeline, Stage
+
+
+async def numbers(count: int):
+    for i in range(count):
+        await asyncio.sleep(0)
+        yield i
+
+
+class TestPipeline:
+    """Test the bounded-queue async pipeline engine."""
+    def test_fan_out_filter_and_order_free_results(self,):
+        """Generators fan out, None drops items, every item reaches the sink once."""
+        async def split(n):
+            yield n
+            yield n + 100
+
+        async def drop_odd(n):
+            return None if n % 2 else n
+
+        pipeline = Pipeline([Stage("split", split, workers=2), Stage("even", drop_odd, workers=3, queue_size=2)])
+        results = asyncio.run(pipeline.run(numbers(10), collect=True))
+        assert sorted(results) == [0, 2, 4, 6, 8, 100, 102, 104, 106, 108]
+        report = pipeline.report()
+        assert report["source"]["items_out"] == 10
+        assert report["split"]["items_out"] == 20
+        assert report["even"]["items_in"] == 20
+
+    def test_errors_are_counted_not_fatal(self,):
+        """A failing item is logged and counted while the rest continue."""
+        async def fragile(n):
+            if n == 3:
+                raise ValueError("boom")
+            return n
+
+        pipeline = Pipeline([Stage("fragile", fragile, workers=2)])
+        results = asyncio.run(pipeline.run(range(6), collect=True))
+        assert sorted(results) == [0, 1, 2, 4, 5]
+        assert pipeline.stats[0].errors == 1
+
+    def test_stages_overlap(self,):
+        """Downstream starts before the source is exhausted (streaming, not batch)."""
+        events = []
+
+        async def source():
+            for i in range(3):
+                events.append(f"produce {i}")
+                await asyncio.sleep(0.01)
+                yield i
+
+        async def consume(n):
+            events.append(f"consume {n}")
+            return n
+
+        asyncio.run(Pipeline([Stage("consume", consume)]).run(source()))
+        assert events.index("consume 0") < events.index("produce 2")
+
+    def test_batch_stage(self,):
+        """Batch stages receive lists capped at batch_size, flushed at end of input."""
+        batches = []
+
+        async def collect(items):
+            batches.append(len(items))
+            for item in items:
+                yield item
+
+        pipeline = Pipeline([Stage("batch", collect, batch_size=4, batch_wait=1.0)])
+        results = asyncio.run(pipeline.run(range(10), collect=True))
+        assert sorted(results) == list(range(10))
+        assert batches == [4, 4, 2]
+        assert pipeline.stats[0].items_in == 10
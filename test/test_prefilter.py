@@ -0,0 +1,123 @@
+import asyncio
+from pathlib import Path
+import sys
+# Add project root to path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from agents.workflow.batch_filter import BatchFilter
+from agents.workflow.prefilter import Decision, HeuristicPrefilter, PrefilterRules, has_code_block
+from agents.workflow.schemas import BatchFilterResult, RecordVerdict
+
+
+def record(question: str, answer: str) -> dict[str, str]:
+    return {"title": "t", "question": question, "answer": answer}
+
+
+class CountingLLMClient:
+    """Judges every batched record valuable iff it mentions 'kubernetes'."""
+    def __init__(self):
+        self.records_seen = 0
+
+    async def astructured_completion(self, schema, messages, **kwargs):
+        blocks = messages[-1]["content"].split("\n\n[")
+        verdicts = []
+        for local, block in enumerate(blocks[1:] if len(blocks) > 1 else blocks, start=1):
+            verdicts.append(RecordVerdict(index=local, is_valuable="kubernetes" in block))
+        self.records_seen += len(verdicts)
+        return BatchFilterResult(verdicts=verdicts)
+
+
+class TestPrefilter:
+    """Test heuristic prefiltering ahead of the LLM filter."""
+    def test_rules(self,):
+        """Obvious records are decided locally, the rest stay ambiguous."""
+        prefilter = HeuristicPrefilter()
+        assert prefilter.score(record("你好", "你好！有什么可以帮你的吗？")).decision is Decision.REJECT
+        assert prefilter.score(record("hello!", "Hi there, how can I help?")).reason == "greeting"
+        assert prefilter.score(record("写一首诗", "抱歉，我无法完成这个请求。")).reason == "failed answer"
+        assert prefilter.score(record("问题", "")).reason == "empty answer"
+        code = "下面是示例:\n```python\n" + "print('x')\n" * 30 + "```"
+        assert prefilter.score(record("如何打印", code)).decision is Decision.ACCEPT
+        assert prefilter.score(record("如何配置 nginx 反向代理", "修改 nginx.conf 中的 location 配置")).decision \
+            is Decision.AMBIGUOUS
+        assert prefilter.score(record("Как дела у тебя сегодня", "Хорошо, спасибо большое")).reason \
+            == "unsupported language"
+        assert prefilter.stats.decided == 5 and prefilter.stats.ambiguous == 2
+
+    def test_classifier_learns_from_llm_and_saves_calls(self, tmp_path):
+        """Once trained on LLM verdicts the classifier decides similar records without calls."""
+        rules = PrefilterRules(min_training_per_class=5, audit_rate=0.0)
+        model_path = tmp_path / "prefilter.json"
+        prefilter = HeuristicPrefilter(rules, model_path=model_path)
+        client = CountingLLMClient()
+        batch_filter = BatchFilter(client, max_batch_size=1, prefilter=prefilter)
+        training = (
+            [record(f"kubernetes 部署问题 {i}", f"kubernetes deployment 配置 replicas 副本 {i} 滚动更新") for i in range(10)]
+            + [record(f"今天天气怎么样 {i}", f"今天天气晴朗, 适合出门散步 {i}, 心情很好") for i in range(10)]
+        )
+        asyncio.run(batch_filter.filter(training))
+        assert client.records_seen == 20
+        counts = prefilter.classifier.feature_counts
+        vocabulary = prefilter.classifier.vocabulary
+        assert vocabulary == len(counts[0].keys() | counts[1].keys())
+        prefilter.save()
+
+        prefilter = HeuristicPrefilter(rules, model_path=model_path)
+        assert prefilter.classifier_ready and prefilter.classifier.vocabulary == vocabulary
+        batch_filter = BatchFilter(client, max_batch_size=1, prefilter=prefilter)
+        verdicts = asyncio.run(batch_filter.filter([
+            record("kubernetes 部署失败", "kubernetes deployment 的 replicas 与滚动更新配置"),
+            record("明天天气怎么样", "明天天气晴朗, 适合出门散步"),
+        ]))
+        assert [verdict.is_valuable for verdict in verdicts] == [True, False]
+        assert client.records_seen == 20
+        assert batch_filter.calls_saved == 2
+        assert prefilter.report(batch_filter.calls_saved)["calls_saved"] == 2
+
+    def test_classifier_audits_and_suspends_on_disagreement(self, tmp_path):
+        """Audited records still go to the LLM; low agreement suspends classifier decisions across runs."""
+        rules = PrefilterRules(min_training_per_class=5, audit_rate=1.0, min_audits=3)
+        model_path = tmp_path / "prefilter.json"
+        prefilter = HeuristicPrefilter(rules, model_path=model_path)
+        for i in range(10):
+            prefilter.learn(record(f"kubernetes 部署问题 {i}", f"kubernetes deployment 滚动更新 {i}"), True)
+            prefilter.learn(record(f"今天天气怎么样 {i}", f"今天天气晴朗, 适合出门散步 {i}"), False)
+        assert prefilter.classifier_ready
+
+        sample = record("kubernetes 部署失败", "kubernetes deployment 的滚动更新")
+        for _ in range(3):
+            result = prefilter.score(sample)
+            assert result.decision is Decision.AMBIGUOUS and result.audit is Decision.ACCEPT
+            # LLM 给出相反的判定
+            prefilter.learn(sample, False, result)
+        assert prefilter.stats.agreement == 0.0 and not prefilter.classifier_ready
+        prefilter.save()
+        reloaded = HeuristicPrefilter(rules, model_path=model_path)
+        assert len(reloaded.audits) == 3 and not reloaded.classifier_ready
+        assert reloaded.report()["recent_audit_agreement"] == 0.0
+
+    def test_suspended_classifier_recovers(self,):
+        """While suspended every shadow prediction is audited; recent agreement restores classifier decisions."""
+        rules = PrefilterRules(min_training_per_class=5, audit_rate=0.0, min_audits=3, audit_window=5)
+        prefilter = HeuristicPrefilter(rules)
+        for i in range(10):
+            prefilter.learn(record(f"kubernetes 部署问题 {i}", f"kubernetes deployment 滚动更新 {i}"), True)
+            prefilter.learn(record(f"今天天气怎么样 {i}", f"今天天气晴朗, 适合出门散步 {i}"), False)
+        prefilter.audits.extend([False] * 3)
+        assert not prefilter.classifier_ready
+
+        sample = record("kubernetes 部署失败", "kubernetes deployment 的滚动更新")
+        for _ in range(5):
+            result = prefilter.score(sample)
+            assert result.decision is Decision.AMBIGUOUS and result.reason == "classifier suspended"
+            assert result.audit is Decision.ACCEPT
+            prefilter.learn(sample, True, result)
+        assert prefilter.recent_agreement == 1.0 and prefilter.classifier_ready
+        assert prefilter.score(sample).decision is Decision.ACCEPT
+
+    def test_code_block_detection(self,):
+        """Fenced and indented code count as code; indented nested list items do not."""
+        assert has_code_block("示例:\n```python\nprint(1)\n```")
+        assert has_code_block("示例:\n\n    import os\n    print(os.getcwd())\n")
+        assert not has_code_block("1. 安装\n    - pip install x\n    - 配置 y\n2. 运行")
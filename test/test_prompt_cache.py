@@ -0,0 +1,76 @@
+import asyncio
+from pathlib import Path
+import sys
+# Add project root to path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from langchain_core.messages import AIMessage
+
+from agents.prompts.prompts import FILTER_SYSTEM_PROMPT, FILTER_USER_PROMPT_TEMPLATE
+from agents.workflow.schemas import FilterResult
+from utils.llm_client import LLMClient
+
+
+class FakeStructuredChat:
+    """Records sent messages; reports a prompt-cache read on every call after the first."""
+    def __init__(self):
+        self.sent = []
+
+    def with_structured_output(self, schema, include_raw=False, **kwargs):
+        return self
+
+    async def ainvoke(self, messages):
+        self.sent.append(messages)
+        cached = 900 if len(self.sent) > 1 else 0
+        raw = AIMessage(content="", usage_metadata={
+            "input_tokens": 1000, "output_tokens": 10, "total_tokens": 1010, "input_token_details": {"cache_read": cached},
+        })
+        return {"raw": raw, "parsed": FilterResult(is_valuable=True), "parsing_error": None}
+
+
+def filter_messages(conversation: str) -> list[dict[str, str]]:
+    return [
+        {"role": "system", "content": FILTER_SYSTEM_PROMPT},
+        {"role": "user", "content": FILTER_USER_PROMPT_TEMPLATE.format(conversation=conversation)},
+    ]
+
+
+class TestPromptCache:
+    """Test prompt-prefix caching layout and cached-token metrics."""
+    def test_system_messages_are_reused(self,):
+        """The same system prompt maps to one pre-built message; the cache is bounded."""
+        client = LLMClient(max_cached_prompts=2)
+        first = client._build_messages(filter_messages("a"))
+        second = client._build_messages(filter_messages("b"))
+        assert first[0] is second[0]
+        assert first[0].content == FILTER_SYSTEM_PROMPT
+        assert first[1].content != second[1].content
+        for prompt in ["x", "y"]:
+            client._build_messages([{"role": "system", "content": prompt}])
+        assert list(client._system_messages) == ["x", "y"]
+
+    def test_explicit_cache_marker(self,):
+        """Explicit mode marks the system prompt with cache_control."""
+        client = LLMClient(explicit_prompt_cache=True)
+        system = client._build_messages(filter_messages("a"))[0]
+        assert system.content == [
+            {"type": "text", "text": FILTER_SYSTEM_PROMPT, "cache_control": {"type": "ephemeral"}}
+        ]
+
+    def test_cached_tokens_in_metrics(self,):
+        """Cached input tokens from usage metadata reach the client metrics."""
+        client = LLMClient()
+        client._chat = FakeStructuredChat()
+
+        async def run():
+            for conversation in ["a", "b", "c"]:
+                await client.astructured_completion(FilterResult, filter_messages(conversation))
+
+        asyncio.run(run())
+        summary = client.metrics.summary()
+        assert summary["cached_input_tokens"] == 1800
+        assert summary["prompt_cache_ratio"] == 1800 / 3000
+        assert [call.cached_input_tokens for call in client.metrics.history] == [0, 900, 900]
+        sent = client._chat.sent
+        assert sent[0][0] is sent[1][0] is sent[2][0]
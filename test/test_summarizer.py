@@ -0,0 +1,85 @@
+import asyncio
+from pathlib import Path
+import sys
+# Add project root to path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from agents.workflow.parser.utils.text_handler import format_conversation
+from agents.workflow.schemas import SummaryResult
+from agents.workflow.summarizer import MapReduceSummarizer, chunk_records
+from utils.llm_scheduler import RateLimitedScheduler
+from utils.tokens import count_tokens
+
+
+class FakeLLMClient:
+    """Summarizes by returning a short marker and records prompt sizes."""
+    def __init__(self):
+        self.prompt_tokens = []
+
+    async def astructured_completion(self, schema, messages, **kwargs):
+        self.prompt_tokens.append(sum(count_tokens(m["content"]) for m in messages))
+        return SummaryResult(needs_summary=True, summary=f"summary-{len(self.prompt_tokens)}")
+
+
+class CountingScheduler(RateLimitedScheduler):
+    """Counts the calls routed through the scheduler."""
+    runs = 0
+
+    async def run(self, job, tokens: int = 0):
+        self.runs += 1
+        return await super().run(job, tokens)
+
+
+def make_records(count: int, size: int) -> list[dict[str, str]]:
+    return [{"title": "长对话", "question": f"问题{i}", "answer": "回答" * size} for i in range(count)]
+
+
+class TestSummarizer:
+    """Test token-aware chunking and map-reduce summarization."""
+    def test_chunk_records_at_qa_boundaries(self,):
+        """Chunks keep whole records and stay within budget, title header included."""
+        records = make_records(10, 100)
+        # 按字符计数, 结果与分词器无关: 每条记录 221 + 2, 标题行 12
+        chunks = chunk_records(records, token_budget=458, counter=len)
+        assert [record for chunk in chunks for record in chunk] == records
+        assert len(chunks) == 5
+        assert all(len(format_conversation(chunk)) <= 458 for chunk in chunks)
+        assert len(chunk_records(records, token_budget=457, counter=len)) == 10
+
+    def test_no_summary_keeps_full_original(self,):
+        """A 'no summary needed' verdict keeps the untruncated conversation, not the truncated prompt text."""
+        client = FakeLLMClient()
+
+        async def no_summary(schema, messages, **kwargs):
+            return SummaryResult(needs_summary=False, summary="")
+        client.astructured_completion = no_summary
+        records = make_records(1, 3000)
+        summarizer = MapReduceSummarizer(client, token_budget=2000, output_reserve=300)
+        result = asyncio.run(summarizer.summarize(records))
+        assert not result.needs_summary and result.summary == format_conversation(records)
+
+    def test_map_reduce_within_budget(self,):
+        """Every call stays within the token budget and produces one summary."""
+        client = FakeLLMClient()
+        summarizer = MapReduceSummarizer(client, token_budget=2000, output_reserve=300)
+        result = asyncio.run(summarizer.summarize(make_records(30, 200)))
+        assert result.needs_summary and result.summary.startswith("summary-")
+        assert len(client.prompt_tokens) > 2
+        assert max(client.prompt_tokens) <= 2000 - 300
+
+    def test_short_conversation_single_call(self,):
+        """Conversations that fit use a single summarizer call, routed through the shared scheduler."""
+        client = FakeLLMClient()
+        scheduler = CountingScheduler(max_concurrency=1)
+        summarizer = MapReduceSummarizer(client, token_budget=4000, scheduler=scheduler)
+        asyncio.run(summarizer.summarize(make_records(2, 10)))
+        assert summarizer.calls == 1 and scheduler.runs == 1
+
+    def test_map_reduce_uses_scheduler(self,):
+        """Every map and reduce call goes through the scheduler without deadlocking at concurrency 1."""
+        client = FakeLLMClient()
+        scheduler = CountingScheduler(max_concurrency=1)
+        summarizer = MapReduceSummarizer(client, token_budget=2000, output_reserve=300, scheduler=scheduler)
+        asyncio.run(summarizer.summarize(make_records(30, 200)))
+        assert scheduler.runs == summarizer.calls == len(client.prompt_tokens)
@@ -0,0 +1,152 @@
+"""
+Shared keep-alive HTTP connection pools for LLM clients.
+
+Every ChatQwen builds its own httpx clients by default, so code that creates
+an LLMClient per worker or per task opens fresh connections (and pays a TLS
+handshake) on every burst. A SharedHTTPPool owns one sync and one async
+httpx client per API base URL; LLM clients built on top of it reuse the
+same keep-alive connections, multiplexed over HTTP/2 when `h2` is installed.
+
+An httpx.AsyncClient is bound to the event loop that first opens its
+connections, so a pool must not outlive its loop: close it (`aclose()` inside
+the loop, `close()` after `asyncio.run()` returns) before starting another.
+"""
+
+import asyncio
+import importlib.util
+import threading
+from dataclasses import dataclass
+
+try:
+    import httpx
+except ImportError:
+    httpx = None  # optional dependency; ChatQwen falls back to its own clients
+
+from utils.logger import get_agent_logger
+
+logger = get_agent_logger()
+
+
+def http2_available() -> bool:
+    """Whether httpx can speak HTTP/2 (requires the `h2` package)."""
+    return importlib.util.find_spec("h2") is not None
+
+
+@dataclass(frozen=True)
+class PoolConfig:
+    """Connection pool limits shared by all clients of one API base URL."""
+    max_connections: int = 100
+    max_keepalive_connections: int = 20
+    # Seconds an idle keep-alive connection is kept before being closed
+    keepalive_expiry: float = 60.0
+    # Use HTTP/2 when available; many concurrent requests then share a few connections
+    http2: bool = True
+
+
+class SharedHTTPPool:
+    """
+    Process-wide httpx clients keyed by API base URL.
+
+    Example:
+        >>> pool = SharedHTTPPool(PoolConfig(max_connections=50))
+        >>> http_client, http_async_client = pool.clients("https://dashscope.aliyuncs.com/compatible-mode/v1")
+    """
+
+    def __init__(self, config: PoolConfig | None = None):
+        """
+        Args:
+            config: Pool limits (defaults to PoolConfig())
+        """
+        self.config = config or PoolConfig()
+        self._clients: dict[str, tuple["httpx.Client", "httpx.AsyncClient"]] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return httpx is not None
+
+    @property
+    def http2(self) -> bool:
+        return self.config.http2 and http2_available()
+
+    def _build(self) -> tuple["httpx.Client", "httpx.AsyncClient"]:
+        config = self.config
+        limits = httpx.Limits(
+            max_connections=config.max_connections,
+            max_keepalive_connections=config.max_keepalive_connections,
+            keepalive_expiry=config.keepalive_expiry,
+        )
+        return (
+            httpx.Client(limits=limits, http2=self.http2),
+            httpx.AsyncClient(limits=limits, http2=self.http2),
+        )
+
+    def clients(self, api_base: str) -> tuple["httpx.Client | None", "httpx.AsyncClient | None"]:
+        """
+        Get the shared (sync, async) httpx clients for an API base URL.
+
+        Returns:
+            (None, None) when httpx is not installed
+        """
+        if not self.enabled:
+            return None, None
+        with self._lock:
+            clients = self._clients.get(api_base)
+            if clients is None:
+                clients = self._clients[api_base] = self._build()
+                logger.debug("Created shared HTTP pool for %s (http2=%s)", api_base, self.http2)
+            return clients
+
+    def __len__(self) -> int:
+        return len(self._clients)
+
+    def _take_clients(self) -> list[tuple["httpx.Client", "httpx.AsyncClient"]]:
+        with self._lock:
+            clients, self._clients = list(self._clients.values()), {}
+        return clients
+
+    async def aclose(self) -> None:
+        """Close all pooled connections."""
+        for client, async_client in self._take_clients():
+            client.close()
+            await _aclose_async_client(async_client)
+
+    def close(self) -> None:
+        """
+        Close all pooled connections from synchronous code.
+
+        Outside an event loop the async clients are closed on a temporary loop;
+        inside a running loop their closing is scheduled on that loop.
+        """
+        clients = self._take_clients()
+        for client, _ in clients:
+            client.close()
+        async_clients = [async_client for _, async_client in clients]
+        if not async_clients:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            asyncio.run(_aclose_async_clients(async_clients))
+        else:
+            task = loop.create_task(_aclose_async_clients(async_clients))
+            _closing_tasks.add(task)
+            task.add_done_callback(_closing_tasks.discard)
+
+
+# Keeps scheduled close tasks alive until they finish
+_closing_tasks: set[asyncio.Task] = set()
+
+
+async def _aclose_async_client(async_client: "httpx.AsyncClient") -> None:
+    try:
+        await async_client.aclose()
+    except RuntimeError as e:
+        # Connections opened on an event loop that has since been closed cannot be shut down
+        # gracefully; their sockets are released when garbage collected
+        logger.debug("Could not close async HTTP client cleanly: %r", e)
+
+
+async def _aclose_async_clients(async_clients: list["httpx.AsyncClient"]) -> None:
+    for async_client in async_clients:
+        await _aclose_async_client(async_client)
@@ -0,0 +1,144 @@
+"""
+Pluggable JSON codec shared by the crawler and the parser.
+
+Prefers orjson (native decoder/encoder) when it is installed and falls back
+to the stdlib json module otherwise. The backend can be forced with the
+JSON_BACKEND environment variable ("orjson" or "stdlib"); an unavailable
+backend requested that way falls back to stdlib with a warning.
+"""
+
+import json
+import os
+import warnings
+from collections.abc import Callable
+from pathlib import Path
+from typing import Any
+
+try:
+    import orjson
+except ImportError:  # optional dependency
+    orjson = None
+
+
+class StdlibCodec:
+    """JSON codec backed by the stdlib json module."""
+
+    name = "stdlib"
+
+    def loads(self, data: str | bytes) -> Any:
+        return json.loads(data)
+
+    def dumps(self, obj: Any, indent: bool = False, sort_keys: bool = False,
+              default: Callable[[Any], Any] | None = None) -> str:
+        return json.dumps(obj, ensure_ascii=False, indent=2 if indent else None, sort_keys=sort_keys, default=default)
+
+    def load(self, path: str | Path) -> Any:
+        with open(path, "rb") as f:
+            return json.loads(f.read())
+
+    def dump(self, obj: Any, path: str | Path, indent: bool = False) -> None:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(obj, f, ensure_ascii=False, indent=2 if indent else None)
+
+
+class OrjsonCodec(StdlibCodec):
+    """JSON codec backed by orjson; output is always UTF-8 (no ASCII escaping)."""
+
+    name = "orjson"
+
+    def loads(self, data: str | bytes) -> Any:
+        return orjson.loads(data)
+
+    def dumps(self, obj: Any, indent: bool = False, sort_keys: bool = False,
+              default: Callable[[Any], Any] | None = None) -> str:
+        return self._encode(obj, indent, sort_keys, default).decode("utf-8")
+
+    def load(self, path: str | Path) -> Any:
+        with open(path, "rb") as f:
+            return orjson.loads(f.read())
+
+    def dump(self, obj: Any, path: str | Path, indent: bool = False) -> None:
+        with open(path, "wb") as f:
+            f.write(self._encode(obj, indent))
+
+    @staticmethod
+    def _encode(obj: Any, indent: bool, sort_keys: bool = False, default: Callable[[Any], Any] | None = None) -> bytes:
+        option = orjson.OPT_NON_STR_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        if sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        return orjson.dumps(obj, default=default, option=option)
+
+
+_CODECS: dict[str, type[StdlibCodec]] = {
+    "stdlib": StdlibCodec,
+}
+if orjson is not None:
+    _CODECS["orjson"] = OrjsonCodec
+
+
+def available_backends() -> list[str]:
+    """Names of the JSON backends usable in this environment, fastest first."""
+    return sorted(_CODECS, key=lambda name: name == "stdlib")
+
+
+def get_codec(name: str | None = None) -> StdlibCodec:
+    """
+    Get a JSON codec.
+
+    Args:
+        name: Backend name; defaults to JSON_BACKEND or the fastest available
+
+    Returns:
+        Codec instance
+
+    Raises:
+        ValueError: If the requested backend is not available
+    """
+    name = name or os.environ.get("JSON_BACKEND") or available_backends()[0]
+    codec_class = _CODECS.get(name)
+    if codec_class is None:
+        raise ValueError(f"JSON backend '{name}' is not available (available: {available_backends()})")
+    return codec_class()
+
+
+def _default_codec() -> StdlibCodec:
+    """Codec for the module-level helpers; never fails at import time."""
+    try:
+        return get_codec()
+    except ValueError as e:
+        warnings.warn(f"{e}; falling back to stdlib json", RuntimeWarning, stacklevel=2)
+        return StdlibCodec()
+
+
+_codec = _default_codec()
+backend = _codec.name
+
+
+def loads(data: str | bytes) -> Any:
+    """Decode a JSON document from str or bytes."""
+    return _codec.loads(data)
+
+
+def dumps(obj: Any, indent: bool = False, sort_keys: bool = False, default: Callable[[Any], Any] | None = None) -> str:
+    """
+    Encode an object as a JSON string (non-ASCII characters are kept).
+
+    Args:
+        obj: Object to encode
+        indent: Indent nested structures by two spaces
+        sort_keys: Sort object keys (stable output for hashing)
+        default: Called for objects the backend cannot encode; returns an encodable value
+    """
+    return _codec.dumps(obj, indent, sort_keys, default)
+
+
+def load(path: str | Path) -> Any:
+    """Read and decode a JSON file."""
+    return _codec.load(path)
+
+
+def dump(obj: Any, path: str | Path, indent: bool = False) -> None:
+    """Encode an object and write it to a JSON file."""
+    _codec.dump(obj, path, indent)
@@ -0,0 +1,217 @@
+"""
+Persistent LLM response cache.
+
+Responses are stored in a local SQLite file keyed by a hash of the model,
+temperature, messages and output schema, so re-running the pipeline over
+unchanged conversations does not pay for the same call twice. Entries are
+evicted by age and by total count/size (least recently used first). Access
+times of hits are buffered in memory and written in batches, so a cache hit
+does not commit to disk on the caller's event loop.
+"""
+
+import hashlib
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any
+
+from pydantic import BaseModel, TypeAdapter
+
+from utils import json_codec
+from utils.logger import get_agent_logger
+
+logger = get_agent_logger()
+
+
+def schema_fingerprint(schema: Any) -> Any:
+    """Return a JSON-serializable description of an output schema."""
+    if schema is None:
+        return None
+    if isinstance(schema, dict):
+        return schema
+    if isinstance(schema, type) and issubclass(schema, BaseModel):
+        return schema.model_json_schema()
+    try:
+        return TypeAdapter(schema).json_schema()
+    except Exception:
+        return f"{getattr(schema, '__module__', '')}.{getattr(schema, '__qualname__', repr(schema))}"
+
+
+def make_cache_key(
+    model: str,
+    temperature: float | None,
+    messages: list[dict[str, str]],
+    schema: Any = None,
+    **kwargs
+) -> str:
+    """
+    Build a cache key for an LLM call.
+
+    Args:
+        model: Model name
+        temperature: Effective generation temperature
+        messages: List of message dicts with 'role' and 'content'
+        schema: Structured output schema (None for plain text)
+        **kwargs: Extra call parameters that affect the output
+
+    Returns:
+        Hex sha256 digest
+    """
+    payload = {
+        "model": model,
+        "temperature": temperature,
+        "messages": messages,
+        "schema": schema_fingerprint(schema),
+        "kwargs": kwargs,
+    }
+    encoded = json_codec.dumps(payload, sort_keys=True, default=repr)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+class LLMResponseCache:
+    """
+    SQLite-backed response cache with size- and age-based eviction.
+
+    Values are JSON-serializable objects (plain strings for text completions,
+    dicts for structured outputs).
+    """
+
+    def __init__(
+        self,
+        path: str | Path = ":memory:",
+        max_entries: int = 100_000,
+        max_bytes: int = 512 * 1024 * 1024,
+        max_age: float | None = 30 * 24 * 3600,
+        evict_every: int = 100,
+        flush_every: int = 100
+    ):
+        """
+        Initialize the cache.
+
+        Args:
+            path: SQLite file path (":memory:" for a process-local cache)
+            max_entries: Maximum number of cached responses
+            max_bytes: Maximum total size of cached values in bytes
+            max_age: Maximum entry age in seconds (None disables age eviction)
+            evict_every: Run size eviction after this many writes
+            flush_every: Write buffered access times after this many hits
+        """
+        if str(path) != ":memory:":
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.evict_every = evict_every
+        self.flush_every = flush_every
+        self.hits = 0
+        self.misses = 0
+        self._writes = 0
+        # Access times of hits not yet written to the database
+        self._accessed: dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(path), check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS llm_cache ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL, "
+            "created REAL NOT NULL, accessed REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_cache_accessed ON llm_cache (accessed)")
+        self._conn.commit()
+
+    def get(self, key: str) -> Any | None:
+        """Return the cached value for key, or None on a miss."""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT value, created FROM llm_cache WHERE key = ?", (key,)).fetchone()
+            if row is not None and self.max_age is not None and now - row[1] > self.max_age:
+                self._conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                self._conn.commit()
+                row = None
+            if row is None:
+                self.misses += 1
+                return None
+            self._accessed[key] = now
+            if len(self._accessed) >= self.flush_every:
+                self._flush_accessed()
+            self.hits += 1
+        return json_codec.loads(row[0])
+
+    def _flush_accessed(self) -> None:
+        """Write buffered access times in one transaction."""
+        if not self._accessed:
+            return
+        self._conn.executemany("UPDATE llm_cache SET accessed = ? WHERE key = ?",
+                               [(accessed, key) for key, accessed in self._accessed.items()])
+        self._conn.commit()
+        self._accessed.clear()
+
+    def set(self, key: str, value: Any) -> None:
+        """Store a JSON-serializable value under key."""
+        encoded = json_codec.dumps(value)
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, value, size, created, accessed) VALUES (?, ?, ?, ?, ?)",
+                (key, encoded, len(encoded.encode("utf-8")), now, now)
+            )
+            self._conn.commit()
+            self._writes += 1
+            if self._writes % self.evict_every == 0:
+                self._evict(now)
+
+    def evict(self) -> None:
+        """Remove expired entries, then least recently used ones over the limits."""
+        with self._lock:
+            self._evict(time.time())
+
+    def _evict(self, now: float) -> None:
+        self._flush_accessed()
+        if self.max_age is not None:
+            self._conn.execute("DELETE FROM llm_cache WHERE created < ?", (now - self.max_age,))
+        count, total = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM llm_cache").fetchone()
+        if count > self.max_entries or total > self.max_bytes:
+            # Delete the shortest least-recently-used prefix that brings both count and size under the limits
+            removed = self._conn.execute(
+                "DELETE FROM llm_cache WHERE key IN ("
+                "SELECT key FROM (SELECT key, size, "
+                "ROW_NUMBER() OVER (ORDER BY accessed, key) AS n, "
+                "SUM(size) OVER (ORDER BY accessed, key) AS freed FROM llm_cache) "
+                "WHERE n <= ? OR freed - size < ?)",
+                (count - self.max_entries, total - self.max_bytes)
+            ).rowcount
+            remaining = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM llm_cache").fetchone()[0]
+            logger.info("LLM cache evicted %d entries (%d bytes)", removed, total - remaining)
+        self._conn.commit()
+
+    def clear(self) -> None:
+        """Remove all entries and reset counters."""
+        with self._lock:
+            self._conn.execute("DELETE FROM llm_cache")
+            self._conn.commit()
+            self._accessed.clear()
+            self.hits = self.misses = 0
+
+    def close(self) -> None:
+        """Write buffered access times and close the underlying database connection."""
+        with self._lock:
+            self._flush_accessed()
+            self._conn.close()
+
+    @property
+    def hit_rate(self) -> float:
+        """Fraction of lookups served from the cache."""
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def stats(self) -> dict[str, Any]:
+        """Hit/miss counters and current cache size."""
+        with self._lock:
+            count, total = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM llm_cache").fetchone()
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hit_rate,
+            "entries": count,
+            "bytes": total,
+        }
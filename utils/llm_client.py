@@ -5,19 +5,40 @@ Provides async support and tools calling capability, integrated with LangGraph e
 """
 
 import asyncio
+import threading
+from collections import OrderedDict
+from collections.abc import AsyncIterator
+from functools import partial
 from typing import Any
 from pydantic import BaseModel, SecretStr
 
 from langchain_qwq import ChatQwen
+from langchain_core.callbacks import BaseCallbackHandler
 from langchain_core.messages import HumanMessage, SystemMessage, AIMessage, BaseMessage
 from langchain_core.tools import BaseTool
 
 from config.settings import get_settings
+from utils.http_pool import PoolConfig, SharedHTTPPool
+from utils.llm_cache import LLMResponseCache, make_cache_key
+from utils.llm_metrics import CallTracker, LLMMetrics
+from utils.llm_scheduler import RateLimitedScheduler
 from utils.logger import get_agent_logger
 
 logger = get_agent_logger()
 
 
+class _UsageRecorder(BaseCallbackHandler):
+    """Records the token usage of chat model runs inside a runnable (e.g. a structured-output stream)."""
+
+    def __init__(self, call: CallTracker):
+        self.call = call
+
+    def on_llm_end(self, response: Any, **kwargs: Any) -> None:
+        for generations in response.generations:
+            for generation in generations:
+                self.call.set_usage(getattr(getattr(generation, "message", None), "usage_metadata", None))
+
+
 class LLMClient:
     """
     LLM client using LangChain ChatOpenAI.
@@ -27,6 +48,11 @@ class LLMClient:
     - Structured output with Pydantic models
     - Tools/function calling
     - Retry with exponential backoff
+    - Optional persistent response cache
+    - Streaming output with latency/TTFT/token usage metrics
+    - Prompt-prefix caching: system prompts can be marked with cache_control
+      for explicit-cache providers, and cached-token counts are recorded in metrics
+    - Shared keep-alive HTTP connection pools (see LLMClientRegistry)
     """
     
     def __init__(
@@ -36,7 +62,12 @@ class LLMClient:
         model: str | None = None,
         temperature: float | None = None,
         max_retries: int | None = None,
-        timeout: int | None = None
+        timeout: int | None = None,
+        cache: LLMResponseCache | None = None,
+        explicit_prompt_cache: bool = False,
+        max_cached_prompts: int = 64,
+        http_client: Any = None,
+        http_async_client: Any = None
     ):
         """
         Initialize LLM client.
@@ -48,6 +79,12 @@ class LLMClient:
             temperature: Generation temperature (defaults to settings)
             max_retries: Maximum retry attempts (defaults to settings)
             timeout: Request timeout in seconds (defaults to settings)
+            cache: Response cache; identical calls are served from it (disabled if None)
+            explicit_prompt_cache: Mark system prompts with cache_control for providers
+                that only cache explicitly marked prefixes (implicit caching needs no marker)
+            max_cached_prompts: Number of distinct pre-built system messages to keep
+            http_client: Shared httpx.Client for sync calls (ChatQwen builds its own if None)
+            http_async_client: Shared httpx.AsyncClient for async calls (ChatQwen builds its own if None)
         """
         settings = get_settings()
         
@@ -57,8 +94,19 @@ class LLMClient:
         self.temperature = temperature if temperature is not None else settings.temperature
         self.max_retries = max_retries if max_retries is not None else settings.max_retries
         self.timeout = timeout if timeout is not None else settings.timeout
+        self.cache = cache
+        self.metrics = LLMMetrics()
+        self.explicit_prompt_cache = explicit_prompt_cache
+        self.max_cached_prompts = max_cached_prompts
+        # Pre-built SystemMessage objects keyed by prompt text
+        self._system_messages: OrderedDict[str, SystemMessage] = OrderedDict()
         
         # Initialize ChatOpenAI client
+        http_kwargs = {}
+        if http_client is not None:
+            http_kwargs["http_client"] = http_client
+        if http_async_client is not None:
+            http_kwargs["http_async_client"] = http_async_client
         self._chat = ChatQwen(
             api_key=self.api_key,
             base_url=self.api_base,
@@ -66,6 +114,7 @@ class LLMClient:
             temperature=self.temperature,
             max_retries=self.max_retries,
             timeout=self.timeout,
+            **http_kwargs,
         )
         
         logger.info("Initialized LLM client with model: %s", self.model)
@@ -75,15 +124,43 @@ class LLMClient:
         """Get the underlying ChatQwen instance."""
         return self._chat
     
+    def _system_message(self, content: str) -> SystemMessage:
+        """
+        Get the pre-built SystemMessage for a system prompt.
+        
+        The same prompt always maps to the same object, so the message (and its
+        optional cache_control marker) is built once per distinct prompt.
+        """
+        message = self._system_messages.get(content)
+        if message is not None:
+            self._system_messages.move_to_end(content)
+            return message
+        if self.explicit_prompt_cache:
+            message = SystemMessage(content=[
+                {"type": "text", "text": content, "cache_control": {"type": "ephemeral"}}
+            ])
+        else:
+            message = SystemMessage(content=content)
+        self._system_messages[content] = message
+        if len(self._system_messages) > self.max_cached_prompts:
+            self._system_messages.popitem(last=False)
+        return message
+    
     def _build_messages(self, messages: list[dict[str, str]]) -> list[BaseMessage]:
-        """Convert dict messages to LangChain message objects."""
+        """
+        Convert dict messages to LangChain message objects.
+        
+        System prompts reuse pre-built messages and are sent unmodified;
+        keep them first and put all per-call content in later messages so
+        the static prefix is shared across calls.
+        """
         result = []
         for msg in messages:
             role = msg.get("role", "user")
             content = msg.get("content", "")
             
             if role == "system":
-                result.append(SystemMessage(content=content))
+                result.append(self._system_message(content))
             elif role == "assistant" or role == "ai":
                 result.append(AIMessage(content=content))
             else:
@@ -91,6 +168,33 @@ class LLMClient:
         
         return result
     
+    def _cache_key(
+        self,
+        messages: list[dict[str, str]],
+        temperature: float | None = None,
+        schema: Any = None,
+        **kwargs
+    ) -> str | None:
+        """Build the response cache key for a call, or None when caching is disabled."""
+        if self.cache is None:
+            return None
+        effective_temperature = temperature if temperature is not None else self.temperature
+        return make_cache_key(self.model, effective_temperature, messages, schema, **kwargs)
+
+    @staticmethod
+    def _dump_structured(result: Any) -> Any:
+        """Convert a structured output to a JSON-serializable value for caching."""
+        if isinstance(result, BaseModel):
+            return result.model_dump(mode="json")
+        return result
+
+    @staticmethod
+    def _load_structured(schema: Any, value: Any) -> Any:
+        """Rebuild a structured output from its cached value."""
+        if isinstance(schema, type) and issubclass(schema, BaseModel):
+            return schema.model_validate(value)
+        return value
+
     def chat_completion(
         self,
         messages: list[dict[str, str]],
@@ -108,14 +212,23 @@ class LLMClient:
         Returns:
             Generated text response
         """
-        lc_messages = self._build_messages(messages)
-        
-        chat = self._chat
-        if temperature is not None:
-            chat = self._chat.with_config(configurable={"temperature": temperature})
-        
-        response = chat.invoke(lc_messages, **kwargs)
-        return response.content  # type: ignore
+        with self.metrics.track("chat_completion", self.model) as call:
+            cache_key = self._cache_key(messages, temperature, **kwargs)
+            if cache_key is not None and (cached := self.cache.get(cache_key)) is not None:
+                call.cache_hit()
+                return cached
+
+            lc_messages = self._build_messages(messages)
+            
+            chat = self._chat
+            if temperature is not None:
+                chat = self._chat.with_config(configurable={"temperature": temperature})
+            
+            response = chat.invoke(lc_messages, **kwargs)
+            call.set_usage(response.usage_metadata)
+            if cache_key is not None:
+                self.cache.set(cache_key, response.content)
+            return response.content  # type: ignore
     
     async def achat_completion(
         self,
@@ -134,14 +247,67 @@ class LLMClient:
         Returns:
             Generated text response
         """
-        lc_messages = self._build_messages(messages)
+        with self.metrics.track("achat_completion", self.model) as call:
+            cache_key = self._cache_key(messages, temperature, **kwargs)
+            if cache_key is not None and (cached := self.cache.get(cache_key)) is not None:
+                call.cache_hit()
+                return cached
+
+            lc_messages = self._build_messages(messages)
+            
+            chat = self._chat
+            if temperature is not None:
+                chat = self._chat.with_config(configurable={"temperature": temperature})
+            
+            response = await chat.ainvoke(lc_messages, **kwargs)
+            call.set_usage(response.usage_metadata)
+            if cache_key is not None:
+                self.cache.set(cache_key, response.content)
+            return response.content  # type: ignore
+    
+    async def astream_completion(
+        self,
+        messages: list[dict[str, str]],
+        temperature: float | None = None,
+        **kwargs
+    ) -> AsyncIterator[str]:
+        """
+        Asynchronous streaming chat completion.
         
-        chat = self._chat
-        if temperature is not None:
-            chat = self._chat.with_config(configurable={"temperature": temperature})
+        Records time-to-first-token when the first non-empty chunk arrives;
+        token usage is requested from the provider with stream_usage.
         
-        response = await chat.ainvoke(lc_messages, **kwargs)
-        return response.content  # type: ignore
+        Args:
+            messages: List of message dicts with 'role' and 'content'
+            temperature: Override default temperature
+            **kwargs: Additional parameters
+            
+        Yields:
+            Text chunks as they are generated
+        """
+        with self.metrics.track("astream_completion", self.model) as call:
+            cache_key = self._cache_key(messages, temperature, **kwargs)
+            if cache_key is not None and (cached := self.cache.get(cache_key)) is not None:
+                call.cache_hit()
+                yield cached
+                return
+
+            lc_messages = self._build_messages(messages)
+            
+            chat = self._chat
+            if temperature is not None:
+                chat = self._chat.with_config(configurable={"temperature": temperature})
+            
+            kwargs.setdefault("stream_usage", True)
+            parts: list[str] = []
+            async for chunk in chat.astream(lc_messages, **kwargs):
+                call.set_usage(chunk.usage_metadata)
+                if chunk.content:
+                    call.first_token()
+                    parts.append(chunk.content)  # type: ignore
+                    yield chunk.content  # type: ignore
+            if cache_key is not None:
+                self.cache.set(cache_key, "".join(parts))
     
     def bind_tools(self, tools: list[BaseTool | type[BaseModel] | dict]) -> ChatQwen:
         """
@@ -155,6 +321,27 @@ class LLMClient:
         """
         return self._chat.bind_tools(tools)  # type: ignore
     
+    def _structured_llm(self, schema: Any, **kwargs):
+        """
+        Build a structured-output runnable that also returns the raw message.
+        
+        Returns:
+            Tuple of (runnable, whether the caller asked for include_raw)
+        """
+        caller_wants_raw = kwargs.pop("include_raw", False)
+        return self.chat.with_structured_output(schema, include_raw=True, **kwargs), caller_wants_raw
+    
+    @staticmethod
+    def _unwrap_structured(output: dict[str, Any], call: CallTracker, caller_wants_raw: bool) -> Any:
+        """Record usage from the raw message and return the parsed output."""
+        raw = output.get("raw")
+        call.set_usage(getattr(raw, "usage_metadata", None))
+        if caller_wants_raw:
+            return output
+        if output.get("parsing_error") is not None:
+            raise output["parsing_error"]
+        return output.get("parsed")
+    
     async def astructured_completion[T: BaseModel](
         self,
         schema: type[T],
@@ -172,9 +359,58 @@ class LLMClient:
         Returns:
             Pydantic model instance with parsed response
         """
-        lc_messages = self._build_messages(messages)
-        structured_llm = self.chat.with_structured_output(schema, **kwargs)
-        return await structured_llm.ainvoke(lc_messages) # type: ignore
+        with self.metrics.track("astructured_completion", self.model) as call:
+            cache_key = self._cache_key(messages, schema=schema, **kwargs)
+            if cache_key is not None and (cached := self.cache.get(cache_key)) is not None:
+                call.cache_hit()
+                return self._load_structured(schema, cached)
+
+            lc_messages = self._build_messages(messages)
+            structured_llm, caller_wants_raw = self._structured_llm(schema, **kwargs)
+            result = self._unwrap_structured(await structured_llm.ainvoke(lc_messages), call, caller_wants_raw)
+            if cache_key is not None and result is not None and not caller_wants_raw:
+                self.cache.set(cache_key, self._dump_structured(result))
+            return result # type: ignore
+    
+    async def astream_structured_completion[T: BaseModel](
+        self,
+        schema: type[T],
+        messages: list[dict[str, str]],
+        **kwargs
+    ) -> AsyncIterator[T | dict[str, Any]]:
+        """
+        Async streaming chat completion with structured output.
+        
+        Yields progressively more complete outputs as the model generates
+        them (partial dicts for dict/TypedDict schemas; Pydantic schemas may
+        only yield once parsing succeeds). The last item is the final output.
+        Token usage of the aggregated stream is recorded through a callback
+        when the model run ends.
+        
+        Args:
+            schema: Pydantic model class (or dict/TypedDict schema) for the output
+            messages: List of message dicts with 'role' and 'content'
+            **kwargs: Additional parameters
+            
+        Yields:
+            Partial outputs, ending with the complete one
+        """
+        with self.metrics.track("astream_structured_completion", self.model) as call:
+            cache_key = self._cache_key(messages, schema=schema, **kwargs)
+            if cache_key is not None and (cached := self.cache.get(cache_key)) is not None:
+                call.cache_hit()
+                yield self._load_structured(schema, cached)
+                return
+
+            lc_messages = self._build_messages(messages)
+            structured_llm = self.chat.with_structured_output(schema, **kwargs)
+            last = None
+            async for partial in structured_llm.astream(lc_messages, config={"callbacks": [_UsageRecorder(call)]}):
+                call.first_token()
+                last = partial
+                yield partial
+            if cache_key is not None and last is not None:
+                self.cache.set(cache_key, self._dump_structured(last))
     
     def structured_completion[T](
         self,
@@ -193,47 +429,201 @@ class LLMClient:
         Returns:
             Pydantic model instance with parsed response
         """
-        lc_messages = self._build_messages(messages)
-        structured_llm = self.chat.with_structured_output(schema, **kwargs)
-        return structured_llm.invoke(lc_messages)  # type: ignore
+        with self.metrics.track("structured_completion", self.model) as call:
+            cache_key = self._cache_key(messages, schema=schema, **kwargs)
+            if cache_key is not None and (cached := self.cache.get(cache_key)) is not None:
+                call.cache_hit()
+                return self._load_structured(schema, cached)
+
+            lc_messages = self._build_messages(messages)
+            structured_llm, caller_wants_raw = self._structured_llm(schema, **kwargs)
+            result = self._unwrap_structured(structured_llm.invoke(lc_messages), call, caller_wants_raw)
+            if cache_key is not None and result is not None and not caller_wants_raw:
+                self.cache.set(cache_key, self._dump_structured(result))
+            return result  # type: ignore
+
+
+class LLMClientRegistry:
+    """
+    Process-wide registry of LLM clients sharing keep-alive HTTP pools.
+    
+    Clients are keyed by (api_base, model); all clients of one API base URL
+    share a single connection pool, so many concurrent workers reuse the
+    same connections instead of opening their own.
+    
+    The async connection pools are bound to one event loop: use one registry
+    per event loop and close it (`aclose()` inside the loop, `close()` after
+    `asyncio.run()` returns) before running another loop.
+    
+    Example:
+        >>> registry = LLMClientRegistry(PoolConfig(max_connections=50))
+        >>> client = registry.get(model="qwen-plus")
+        >>> registry.get(model="qwen-plus") is client
+        True
+    """
+    
+    def __init__(self, pool_config: PoolConfig | None = None):
+        """
+        Args:
+            pool_config: Connection pool limits (defaults to PoolConfig())
+        """
+        self.pool = SharedHTTPPool(pool_config)
+        self._clients: dict[tuple[str, str], LLMClient] = {}
+        self._lock = threading.Lock()
+        # Event loop the registry has been used from, checked on every lookup
+        self._loop: asyncio.AbstractEventLoop | None = None
+    
+    def _check_loop(self) -> None:
+        """Warn when the registry is used from a second event loop without being closed in between."""
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        if self._loop is not None and self._loop is not loop:
+            logger.warning("LLM client registry used from a second event loop; its async HTTP pools are bound "
+                           "to the first one. Close the registry (reset_llm_client()) between event loops")
+        self._loop = loop
+    
+    def create(self, api_base: str | None = None, model: str | None = None, **kwargs) -> LLMClient:
+        """
+        Build a new client on the shared pool (not registered).
+        
+        Use this for clients with non-default options such as a response cache.
+        
+        Args:
+            api_base: API base URL (defaults to settings)
+            model: Model name (defaults to settings)
+            **kwargs: Other LLMClient arguments
+        """
+        self._check_loop()
+        settings = get_settings()
+        api_base = api_base or settings.api_base
+        http_client, http_async_client = self.pool.clients(api_base)
+        return LLMClient(
+            api_base=api_base, model=model, http_client=http_client, http_async_client=http_async_client, **kwargs
+        )
+    
+    def get(self, api_base: str | None = None, model: str | None = None) -> LLMClient:
+        """
+        Get the shared client for an API base URL and model, creating it on first use.
+        
+        Args:
+            api_base: API base URL (defaults to settings)
+            model: Model name (defaults to settings)
+        """
+        self._check_loop()
+        settings = get_settings()
+        key = (api_base or settings.api_base, model or settings.model_name)
+        with self._lock:
+            client = self._clients.get(key)
+            if client is None:
+                client = self._clients[key] = self.create(*key)
+            return client
+    
+    def __len__(self) -> int:
+        return len(self._clients)
+    
+    def reset(self) -> None:
+        """Forget all registered clients (the connection pools stay open)."""
+        with self._lock:
+            self._clients.clear()
+            self._loop = None
+    
+    async def aclose(self) -> None:
+        """Forget all clients and close the pooled connections."""
+        self.reset()
+        await self.pool.aclose()
+    
+    def close(self) -> None:
+        """Forget all clients and close the pooled connections from synchronous code."""
+        self.reset()
+        self.pool.close()
 
 
-# Global LLM client instance
-_llm_client: LLMClient | None = None
+# Global client registry
+_registry: LLMClientRegistry | None = None
 
 
-def get_llm_client() -> LLMClient:
-    """Get the global LLM client instance."""
-    global _llm_client
-    if _llm_client is None:
-        _llm_client = LLMClient()
-    return _llm_client
+def get_client_registry(pool_config: PoolConfig | None = None) -> LLMClientRegistry:
+    """
+    Get the global client registry.
+    
+    Args:
+        pool_config: Pool limits, only used when the registry is first created;
+            a different config for an existing registry is ignored with a warning
+            (call reset_llm_client() first to apply it)
+    """
+    global _registry
+    if _registry is None:
+        _registry = LLMClientRegistry(pool_config)
+    elif pool_config is not None and pool_config != _registry.pool.config:
+        logger.warning("Client registry already exists with %s, ignoring %s; call reset_llm_client() first",
+                       _registry.pool.config, pool_config)
+    return _registry
+
+
+def get_llm_client(api_base: str | None = None, model: str | None = None) -> LLMClient:
+    """
+    Get the shared LLM client for an API base URL and model.
+    
+    Args:
+        api_base: API base URL (defaults to settings)
+        model: Model name (defaults to settings)
+    """
+    return get_client_registry().get(api_base, model)
 
 
 def reset_llm_client() -> None:
-    """Reset the global LLM client (useful for testing)."""
-    global _llm_client
-    _llm_client = None
+    """
+    Close and drop the global client registry.
+    
+    Call it between `asyncio.run()` calls: the registry's async HTTP pools
+    are bound to the event loop that used them.
+    """
+    global _registry
+    registry, _registry = _registry, None
+    if registry is not None:
+        registry.close()
+
+
+def _as_job(call: Any) -> Any:
+    """Turn an `(async_fn, *args)` tuple into a retriable zero-argument factory."""
+    if isinstance(call, tuple) and call and callable(call[0]):
+        return partial(call[0], *call[1:])
+    return call
 
 
 async def batch_async_calls(
     coroutines: list,
-    max_concurrency: int = 10
+    max_concurrency: int = 10,
+    return_exceptions: bool = False,
+    scheduler: RateLimitedScheduler | None = None
 ) -> list[Any]:
     """
     Execute multiple async calls with concurrency limit.
     
+    Runs on RateLimitedScheduler, so a failing call no longer cancels its
+    siblings and rate-limit errors back off instead of failing the batch.
+    
     Args:
-        coroutines: List of coroutines to execute
+        coroutines: Calls to execute, each a zero-argument async callable or an
+            `(async_fn, *args)` tuple (both retried after rate-limit errors), or
+            a bare coroutine (run at most once, since it cannot be re-awaited)
         max_concurrency: Maximum concurrent executions
+        return_exceptions: Return exceptions in place of failed results instead
+            of raising the first one after all calls have finished
+        scheduler: Scheduler to use (overrides max_concurrency)
         
     Returns:
         List of results in same order as input
-    """
-    semaphore = asyncio.Semaphore(max_concurrency)
-    
-    async def bounded_call(coro):
-        async with semaphore:
-            return await coro
     
-    return await asyncio.gather(*[bounded_call(c) for c in coroutines])
+    Example:
+        >>> await batch_async_calls([(client.achat_completion, messages) for messages in batch])
+    """
+    scheduler = scheduler or RateLimitedScheduler(max_concurrency=max_concurrency)
+    results = await scheduler.map(_as_job(call) for call in coroutines)
+    if not return_exceptions:
+        for result in results:
+            if result.error is not None:
+                raise result.error
+    return [result.value if result.ok else result.error for result in results]
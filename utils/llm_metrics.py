@@ -0,0 +1,130 @@
+"""
+Per-call latency and token usage metrics for LLMClient.
+
+Every call records total latency, time-to-first-token (equal to latency for
+non-streaming calls), token usage reported by the provider (including input
+tokens read from the provider's prompt cache) and whether it was served from
+the response cache.
+"""
+
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any
+
+
+@dataclass
+class CallMetrics:
+    """Metrics of a single LLM call."""
+    method: str
+    model: str
+    started_at: float = field(default_factory=time.time)
+    latency: float = 0.0
+    ttft: float | None = None
+    input_tokens: int = 0
+    output_tokens: int = 0
+    # Input tokens served from the provider's prompt-prefix cache
+    cached_input_tokens: int = 0
+    cache_hit: bool = False
+    error: str | None = None
+
+
+class CallTracker:
+    """Context manager measuring one call; use first_token()/set_usage() while it runs."""
+
+    def __init__(self, metrics: "LLMMetrics", method: str, model: str):
+        self._metrics = metrics
+        self._started = time.perf_counter()
+        self.call = CallMetrics(method=method, model=model)
+
+    def first_token(self) -> None:
+        """Mark the arrival of the first token (only the first call counts)."""
+        if self.call.ttft is None:
+            self.call.ttft = time.perf_counter() - self._started
+
+    def set_usage(self, usage: dict[str, Any] | None) -> None:
+        """Accumulate LangChain usage_metadata from a response or stream chunk."""
+        if not usage:
+            return
+        self.call.input_tokens += usage.get("input_tokens", 0) or 0
+        self.call.output_tokens += usage.get("output_tokens", 0) or 0
+        details = usage.get("input_token_details") or {}
+        self.call.cached_input_tokens += details.get("cache_read", 0) or 0
+
+    def cache_hit(self) -> None:
+        """Mark the call as served from the response cache."""
+        self.call.cache_hit = True
+
+    def __enter__(self) -> "CallTracker":
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.call.latency = time.perf_counter() - self._started
+        if self.call.ttft is None:
+            self.call.ttft = self.call.latency
+        if exc_val is not None and not isinstance(exc_val, GeneratorExit):
+            self.call.error = f"{type(exc_val).__name__}: {exc_val}"
+        self._metrics.record(self.call)
+
+
+def _percentile(values: list[float], percent: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(percent / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+class LLMMetrics:
+    """Aggregated call metrics with a bounded history of recent calls."""
+
+    def __init__(self, max_history: int = 1000):
+        self.history: deque[CallMetrics] = deque(maxlen=max_history)
+        self.calls = 0
+        self.errors = 0
+        self.cache_hits = 0
+        self.input_tokens = 0
+        self.output_tokens = 0
+        self.cached_input_tokens = 0
+
+    def track(self, method: str, model: str) -> CallTracker:
+        """Start measuring a call."""
+        return CallTracker(self, method, model)
+
+    def record(self, call: CallMetrics) -> None:
+        """Add a finished call to the totals and history."""
+        self.history.append(call)
+        self.calls += 1
+        self.errors += call.error is not None
+        self.cache_hits += call.cache_hit
+        self.input_tokens += call.input_tokens
+        self.output_tokens += call.output_tokens
+        self.cached_input_tokens += call.cached_input_tokens
+
+    def summary(self) -> dict[str, Any]:
+        """
+        Totals plus latency/TTFT percentiles over the recent history (cache hits excluded).
+        
+        Latency is also split by whether the provider reported a prompt-cache
+        read, to compare calls with and without a cached prefix.
+        """
+        remote = [call for call in self.history if not call.cache_hit and call.error is None]
+        latencies = [call.latency for call in remote]
+        ttfts = [call.ttft for call in remote if call.ttft is not None]
+        prefix_hits = [call.latency for call in remote if call.cached_input_tokens]
+        prefix_misses = [call.latency for call in remote if not call.cached_input_tokens]
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "cache_hits": self.cache_hits,
+            "input_tokens": self.input_tokens,
+            "output_tokens": self.output_tokens,
+            "cached_input_tokens": self.cached_input_tokens,
+            "prompt_cache_ratio": self.cached_input_tokens / self.input_tokens if self.input_tokens else 0.0,
+            "latency_p50": _percentile(latencies, 50),
+            "latency_p95": _percentile(latencies, 95),
+            "latency_p50_prefix_cached": _percentile(prefix_hits, 50),
+            "latency_p50_prefix_uncached": _percentile(prefix_misses, 50),
+            "ttft_p50": _percentile(ttfts, 50),
+            "ttft_p95": _percentile(ttfts, 95),
+        }
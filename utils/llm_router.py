@@ -0,0 +1,364 @@
+"""
+Latency- and error-aware routing across several LLM backends.
+
+An LLMClient is bound to one endpoint and model, so a slow or rate-limited
+provider stalls the whole pipeline. LLMRouter spreads calls over several
+configured backends (each an LLMClient) and exposes the same call interface,
+so it can be passed wherever an LLMClient is expected:
+
+- Routes map call types to backends, e.g. a cheap fast model for filtering
+  and a stronger one for summarizing. Structured calls are routed by schema
+  class name unless a route is given explicitly.
+- Among a route's backends, each call goes to the one with the lowest
+  expected cost: EWMA latency scaled by in-flight requests, weight and EWMA
+  error rate. Rate-limited or failing backends cool down for a while.
+- A call that fails on one backend fails over to the next.
+- When the chosen backend is slower than its usual tail latency, a hedged
+  request is sent to the next backend and the first answer wins.
+"""
+
+import asyncio
+import time
+from collections import deque
+from collections.abc import Awaitable, Callable, Mapping, Sequence
+from dataclasses import dataclass, field
+from typing import Any
+
+from pydantic import BaseModel
+
+from utils.llm_client import LLMClient, get_client_registry
+from utils.llm_scheduler import is_rate_limit_error, retry_after_seconds
+from utils.logger import get_agent_logger
+
+logger = get_agent_logger()
+
+
+@dataclass
+class BackendStats:
+    """Running statistics of one backend."""
+    requests: int = 0
+    errors: int = 0
+    # Exponentially weighted moving averages of latency (seconds) and error rate
+    latency_ewma: float | None = None
+    error_ewma: float = 0.0
+    in_flight: int = 0
+    cooldown_until: float = 0.0
+    # Hedged requests sent to this backend, and how many of them answered first
+    hedges: int = 0
+    hedge_wins: int = 0
+    latencies: deque = field(default_factory=lambda: deque(maxlen=200))
+
+    def latency_quantile(self, q: float) -> float | None:
+        if not self.latencies:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+@dataclass
+class Backend:
+    """One routable LLM endpoint/model."""
+    name: str
+    client: LLMClient
+    # Relative capacity; a backend with weight 2 takes about twice the load
+    weight: float = 1.0
+    stats: BackendStats = field(default_factory=BackendStats)
+
+
+class LLMRouter:
+    """
+    Route LLM calls across several backends with failover and hedging.
+
+    Example:
+        >>> router = LLMRouter.from_configs(
+        ...     {
+        ...         "turbo": {"model": "qwen-turbo"},
+        ...         "max": {"model": "qwen-max"},
+        ...         "deepseek": {"api_base": "https://api.deepseek.com/v1", "model": "deepseek-chat"},
+        ...     },
+        ...     routes={"BatchFilterResult": ["turbo", "deepseek"], "SummaryResult": ["max", "deepseek"]},
+        ... )
+        >>> kb = KnowledgePipeline(router, "knowledge_base", single_call=False)
+        >>> router.report()
+    """
+
+    def __init__(
+        self,
+        backends: Sequence[Backend],
+        routes: Mapping[str, Sequence[str]] | None = None,
+        ewma_alpha: float = 0.2,
+        initial_latency: float = 1.0,
+        cooldown: float = 30.0,
+        max_attempts: int | None = None,
+        hedge: bool = True,
+        hedge_quantile: float = 0.95,
+        hedge_after: float = 10.0,
+        min_hedge_delay: float = 0.5,
+        min_hedge_samples: int = 20
+    ):
+        """
+        Args:
+            backends: Available backends (names must be unique)
+            routes: Route name -> backend names; unrouted calls may use every backend
+            ewma_alpha: Smoothing factor of the latency and error-rate averages
+            initial_latency: Latency assumed for backends without measurements
+            cooldown: Seconds a rate-limited or mostly failing backend is avoided
+            max_attempts: Backends tried per call before giving up (defaults to all candidates)
+            hedge: Whether to send hedged requests for the slow tail
+            hedge_quantile: Latency quantile of the primary backend after which to hedge
+            hedge_after: Hedge delay in seconds until enough latencies are measured
+            min_hedge_delay: Lower bound of the hedge delay in seconds
+            min_hedge_samples: Measured latencies needed before the quantile is used
+        """
+        self.backends = {backend.name: backend for backend in backends}
+        if len(self.backends) != len(backends):
+            raise ValueError("Backend names must be unique")
+        self.routes = {route: list(names) for route, names in (routes or {}).items()}
+        for route, names in self.routes.items():
+            unknown = set(names) - self.backends.keys()
+            if unknown:
+                raise ValueError(f"Route '{route}' references unknown backends: {', '.join(sorted(unknown))}")
+        self.ewma_alpha = ewma_alpha
+        self.initial_latency = initial_latency
+        self.cooldown = cooldown
+        self.max_attempts = max_attempts
+        self.hedge = hedge
+        self.hedge_quantile = hedge_quantile
+        self.hedge_after = hedge_after
+        self.min_hedge_delay = min_hedge_delay
+        self.min_hedge_samples = min_hedge_samples
+
+    @classmethod
+    def from_configs(
+        cls,
+        configs: Mapping[str, Mapping[str, Any]],
+        routes: Mapping[str, Sequence[str]] | None = None,
+        **kwargs
+    ) -> "LLMRouter":
+        """
+        Build a router from backend configurations.
+
+        Clients are created through the global client registry, so backends
+        on the same API base URL share one connection pool. Backends default
+        to max_retries=0: the router fails over instead of retrying in place.
+
+        Args:
+            configs: Backend name -> LLMClient arguments (api_base, model, api_key, ...)
+                plus an optional 'weight'
+            routes: Route name -> backend names
+            **kwargs: Other LLMRouter arguments
+        """
+        registry = get_client_registry()
+        backends = []
+        for name, config in configs.items():
+            config = dict(config)
+            weight = config.pop("weight", 1.0)
+            config.setdefault("max_retries", 0)
+            backends.append(Backend(name, registry.create(**config), weight))
+        return cls(backends, routes, **kwargs)
+
+    def _cost(self, backend: Backend) -> float:
+        """Expected cost of sending one more request to a backend (lower is better)."""
+        stats = backend.stats
+        latency = stats.latency_ewma if stats.latency_ewma is not None else self.initial_latency
+        return latency * (1 + stats.in_flight) / backend.weight / max(0.05, 1 - stats.error_ewma)
+
+    def candidates(self, route: str) -> list[Backend]:
+        """Backends for a route, best first; cooling-down backends only if nothing else is left."""
+        names = self.routes.get(route)
+        backends = [self.backends[name] for name in names] if names else list(self.backends.values())
+        now = time.monotonic()
+        ready = [backend for backend in backends if backend.stats.cooldown_until <= now]
+        cooling = [backend for backend in backends if backend.stats.cooldown_until > now]
+        return sorted(ready, key=self._cost) + sorted(cooling, key=lambda backend: backend.stats.cooldown_until)
+
+    def _hedge_delay(self, backend: Backend) -> float:
+        stats = backend.stats
+        if len(stats.latencies) < self.min_hedge_samples:
+            return self.hedge_after
+        return max(self.min_hedge_delay, stats.latency_quantile(self.hedge_quantile))
+
+    def _record_latency(self, backend: Backend, latency: float) -> None:
+        stats = backend.stats
+        alpha = self.ewma_alpha
+        stats.latency_ewma = latency if stats.latency_ewma is None else alpha * latency + (1 - alpha) * stats.latency_ewma
+
+    def _record_success(self, backend: Backend, latency: float) -> None:
+        stats = backend.stats
+        self._record_latency(backend, latency)
+        stats.error_ewma *= 1 - self.ewma_alpha
+        stats.latencies.append(latency)
+
+    def _record_error(self, backend: Backend, error: Exception) -> None:
+        stats = backend.stats
+        stats.errors += 1
+        stats.error_ewma = self.ewma_alpha + (1 - self.ewma_alpha) * stats.error_ewma
+        if is_rate_limit_error(error):
+            cooldown = retry_after_seconds(error) or self.cooldown
+        elif stats.error_ewma > 0.5:
+            cooldown = self.cooldown
+        else:
+            return
+        stats.cooldown_until = time.monotonic() + cooldown
+        logger.warning("Backend '%s' cooling down for %.0fs after %r", backend.name, cooldown, error)
+
+    async def _attempt[T](self, backend: Backend, call: Callable[[LLMClient], Awaitable[T]]) -> T:
+        """Run one request on a backend and update its statistics."""
+        stats = backend.stats
+        stats.requests += 1
+        stats.in_flight += 1
+        started = time.perf_counter()
+        try:
+            result = await call(backend.client)
+        except asyncio.CancelledError:
+            # Lost a hedge race: not a success, but the elapsed time is a lower bound of the latency
+            self._record_latency(backend, time.perf_counter() - started)
+            raise
+        except ValueError:
+            # Malformed structured output: the backend answered, the caller decides what to do
+            self._record_success(backend, time.perf_counter() - started)
+            raise
+        except Exception as e:
+            self._record_error(backend, e)
+            raise
+        else:
+            self._record_success(backend, time.perf_counter() - started)
+            return result
+        finally:
+            stats.in_flight -= 1
+
+    async def _hedged[T](
+        self,
+        primary: Backend,
+        secondary: Backend | None,
+        call: Callable[[LLMClient], Awaitable[T]],
+        tried: set[str]
+    ) -> T:
+        """Run a request on the primary backend, hedging on the secondary if it is slow."""
+        first = asyncio.create_task(self._attempt(primary, call))
+        if secondary is None:
+            return await first
+        done, _ = await asyncio.wait({first}, timeout=self._hedge_delay(primary))
+        if done or secondary.stats.cooldown_until > time.monotonic():
+            # Finished in time, or the secondary started cooling down while we waited
+            return await first
+
+        logger.debug("Backend '%s' is slow, hedging on '%s'", primary.name, secondary.name)
+        secondary.stats.hedges += 1
+        tried.add(secondary.name)
+        second = asyncio.create_task(self._attempt(secondary, call))
+        pending = {first, second}
+        error = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is second:
+                            secondary.stats.hedge_wins += 1
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def call[T](self, route: str, call: Callable[[LLMClient], Awaitable[T]]) -> T:
+        """
+        Run a call on the best backend of a route, failing over on errors.
+
+        Args:
+            route: Route name
+            call: Function issuing the request on a given client
+
+        Returns:
+            The first successful result
+
+        Raises:
+            ValueError: The answer could not be parsed (not retried on other backends)
+            Exception: The last backend's error when every attempt failed
+            RuntimeError: The route has no backends to try
+        """
+        candidates = self.candidates(route)
+        max_attempts = self.max_attempts or len(candidates)
+        tried: set[str] = set()
+        error = None
+        for attempt in range(max_attempts):
+            remaining = [backend for backend in candidates if backend.name not in tried]
+            if not remaining:
+                break
+            primary = remaining[0]
+            # Never hedge onto a backend that is cooling down (e.g. after a 429)
+            now = time.monotonic()
+            secondary = next((backend for backend in remaining[1:] if backend.stats.cooldown_until <= now),
+                             None) if self.hedge else None
+            tried.add(primary.name)
+            try:
+                return await self._hedged(primary, secondary, call, tried)
+            except ValueError:
+                raise
+            except Exception as e:
+                error = e
+                logger.warning("Route '%s' attempt %d on '%s' failed: %r", route, attempt + 1, primary.name, e)
+        if error is None:
+            raise RuntimeError(f"No backends available for route '{route}'")
+        raise error
+
+    async def achat_completion(
+        self,
+        messages: list[dict[str, str]],
+        temperature: float | None = None,
+        route: str = "chat",
+        **kwargs
+    ) -> str:
+        """
+        Asynchronous chat completion on the best backend.
+
+        Args:
+            messages: List of message dicts with 'role' and 'content'
+            temperature: Override default temperature
+            route: Route name
+            **kwargs: Additional parameters
+        """
+        return await self.call(route, lambda client: client.achat_completion(messages, temperature, **kwargs))
+
+    async def astructured_completion[T: BaseModel](
+        self,
+        schema: type[T],
+        messages: list[dict[str, str]],
+        route: str | None = None,
+        **kwargs
+    ) -> T:
+        """
+        Async structured completion on the best backend.
+
+        Args:
+            schema: Pydantic model class for the output
+            messages: List of message dicts with 'role' and 'content'
+            route: Route name (defaults to the schema class name)
+            **kwargs: Additional parameters
+        """
+        return await self.call(
+            route or schema.__name__, lambda client: client.astructured_completion(schema, messages, **kwargs)
+        )
+
+    def report(self) -> dict[str, dict[str, Any]]:
+        """Log and return per-backend routing statistics."""
+        report = {}
+        for name, backend in self.backends.items():
+            stats = backend.stats
+            report[name] = {
+                "model": backend.client.model,
+                "requests": stats.requests,
+                "errors": stats.errors,
+                "error_rate": stats.errors / stats.requests if stats.requests else 0.0,
+                "latency_ewma": stats.latency_ewma,
+                "latency_p95": stats.latency_quantile(0.95),
+                "hedges": stats.hedges,
+                "hedge_wins": stats.hedge_wins,
+            }
+            logger.info("Backend '%s' (%s): %d requests, %d errors, EWMA latency %s, %d hedges (%d won)",
+                        name, backend.client.model, stats.requests, stats.errors,
+                        f"{stats.latency_ewma:.2f}s" if stats.latency_ewma is not None else "n/a",
+                        stats.hedges, stats.hedge_wins)
+        return report
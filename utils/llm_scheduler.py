@@ -0,0 +1,307 @@
+"""
+Adaptive, rate-limited request scheduler for LLM calls.
+
+Combines token-bucket limits on requests/min and tokens/min with an AIMD
+(additive increase, multiplicative decrease) concurrency limit that backs off
+when the provider answers 429. Every job's outcome is captured separately, so
+one failure never cancels its siblings, and results can be streamed in
+completion order.
+"""
+
+import asyncio
+import time
+from collections.abc import AsyncIterator, Awaitable, Callable, Iterable
+from dataclasses import dataclass
+from typing import Any
+
+from utils.logger import get_agent_logger
+
+logger = get_agent_logger()
+
+# A job is a zero-argument callable returning an awaitable (retriable),
+# or a bare coroutine (run at most once).
+Job = Callable[[], Awaitable[Any]] | Awaitable[Any]
+
+
+def is_rate_limit_error(error: BaseException) -> bool:
+    """Check whether an exception is a provider rate-limit (HTTP 429) error."""
+    status = getattr(error, "status_code", None)
+    if status is None:
+        status = getattr(getattr(error, "response", None), "status_code", None)
+    return status == 429 or "RateLimit" in type(error).__name__
+
+
+def retry_after_seconds(error: BaseException) -> float | None:
+    """Read the Retry-After header from a rate-limit error, if present."""
+    headers = getattr(getattr(error, "response", None), "headers", None)
+    if not headers:
+        return None
+    value = headers.get("retry-after") or headers.get("Retry-After")
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+class TokenBucket:
+    """Token bucket refilled continuously at a per-minute rate."""
+
+    def __init__(self, rate_per_minute: float, capacity: float | None = None):
+        """
+        Initialize the bucket.
+
+        Args:
+            rate_per_minute: Refill rate (tokens per minute)
+            capacity: Burst size (defaults to one minute's worth of tokens)
+        """
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity if capacity is not None else rate_per_minute
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self, amount: float = 1) -> None:
+        """Wait until `amount` tokens are available and take them."""
+        if amount > self.capacity:
+            # A request larger than the burst can never be fully covered; take a full bucket instead.
+            logger.warning("Requested %.0f tokens exceeds bucket capacity %.0f, clamping", amount, self.capacity)
+            amount = self.capacity
+        async with self._lock:
+            self._refill()
+            while self._tokens < amount:
+                await asyncio.sleep((amount - self._tokens) / self.rate)
+                self._refill()
+            self._tokens -= amount
+
+
+class AdaptiveConcurrency:
+    """
+    AIMD concurrency limiter: +1 slot per window of successes, halve on throttling.
+
+    Requests in flight when the provider starts throttling usually all fail
+    together; only the first of those 429s cuts the limit. Requests started
+    before the last decrease are ignored, so one congestion event halves the
+    limit once.
+    """
+
+    def __init__(
+        self,
+        initial: int,
+        minimum: int = 1,
+        maximum: int | None = None,
+        decrease_factor: float = 0.5
+    ):
+        self.minimum = minimum
+        self.maximum = maximum if maximum is not None else initial
+        self.limit = max(minimum, min(initial, self.maximum))
+        self.decrease_factor = decrease_factor
+        self.in_flight = 0
+        self._successes = 0
+        # Incremented on every decrease; requests remember the epoch they started in
+        self._epoch = 0
+        self._condition = asyncio.Condition()
+
+    async def acquire(self) -> int:
+        """
+        Wait for a free slot.
+
+        Returns:
+            The current epoch, to pass to on_throttle if the request is rate limited
+        """
+        async with self._condition:
+            await self._condition.wait_for(lambda: self.in_flight < self.limit)
+            self.in_flight += 1
+            return self._epoch
+
+    async def release(self) -> None:
+        """Free a slot."""
+        async with self._condition:
+            self.in_flight -= 1
+            self._condition.notify_all()
+
+    async def on_success(self) -> None:
+        """Additive increase: one more slot after `limit` consecutive successes."""
+        async with self._condition:
+            self._successes += 1
+            if self._successes >= self.limit and self.limit < self.maximum:
+                self.limit += 1
+                self._successes = 0
+                self._condition.notify_all()
+
+    async def on_throttle(self, epoch: int | None = None) -> None:
+        """
+        Multiplicative decrease after a rate-limit response.
+
+        Args:
+            epoch: Epoch returned by acquire() for the throttled request; a request
+                started before the last decrease does not decrease the limit again
+        """
+        async with self._condition:
+            self._successes = 0
+            if epoch is not None and epoch < self._epoch:
+                return
+            self._epoch += 1
+            new_limit = max(self.minimum, int(self.limit * self.decrease_factor))
+            if new_limit != self.limit:
+                logger.info("Rate limited, concurrency %d -> %d", self.limit, new_limit)
+            self.limit = new_limit
+
+
+@dataclass
+class ScheduledResult:
+    """Outcome of one scheduled job."""
+    index: int
+    value: Any = None
+    error: BaseException | None = None
+    attempts: int = 0
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+class RateLimitedScheduler:
+    """
+    Request scheduler holding the provider's rate ceiling.
+
+    Example:
+        >>> scheduler = RateLimitedScheduler(requests_per_minute=600, tokens_per_minute=1_000_000)
+        >>> async for result in scheduler.stream(jobs, tokens=estimates):
+        ...     handle(result)
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: float | None = None,
+        tokens_per_minute: float | None = None,
+        max_concurrency: int = 10,
+        min_concurrency: int = 1,
+        initial_concurrency: int | None = None,
+        max_retries: int = 3,
+        backoff_base: float = 1.0,
+        backoff_max: float = 60.0
+    ):
+        """
+        Initialize the scheduler.
+
+        Args:
+            requests_per_minute: Request rate limit (None for unlimited)
+            tokens_per_minute: Token rate limit (None for unlimited)
+            max_concurrency: Upper bound for concurrent requests
+            min_concurrency: Lower bound the AIMD limiter backs off to
+            initial_concurrency: Starting concurrency (defaults to max_concurrency)
+            max_retries: Retries per job after rate-limit errors
+            backoff_base: Base delay in seconds for exponential backoff
+            backoff_max: Maximum backoff delay in seconds
+        """
+        self.request_bucket = TokenBucket(requests_per_minute) if requests_per_minute else None
+        self.token_bucket = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        self.concurrency = AdaptiveConcurrency(
+            initial_concurrency or max_concurrency, min_concurrency, max_concurrency
+        )
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.throttled = 0
+
+    async def _attempt(self, job: Job, tokens: int) -> Any:
+        if self.request_bucket is not None:
+            await self.request_bucket.acquire(1)
+        if self.token_bucket is not None and tokens:
+            await self.token_bucket.acquire(tokens)
+        epoch = await self.concurrency.acquire()
+        try:
+            return await (job() if callable(job) else job)
+        except Exception as e:
+            # Back off on every 429, even when the job itself cannot be retried
+            if is_rate_limit_error(e):
+                self.throttled += 1
+                await self.concurrency.on_throttle(epoch)
+            raise
+        finally:
+            await self.concurrency.release()
+
+    async def run(self, job: Job, tokens: int = 0) -> Any:
+        """
+        Run one job under the rate and concurrency limits.
+
+        Rate-limit errors shrink the concurrency limit and are retried with
+        exponential backoff (honouring Retry-After); other errors propagate.
+
+        Args:
+            job: Zero-argument callable returning an awaitable, or a coroutine
+            tokens: Estimated tokens consumed by the call
+
+        Returns:
+            The job's result
+        """
+        result = await self._run(0, job, tokens)
+        if result.error is not None:
+            raise result.error
+        return result.value
+
+    async def _run(self, index: int, job: Job, tokens: int) -> ScheduledResult:
+        result = ScheduledResult(index)
+        retriable = callable(job)
+        while True:
+            result.attempts += 1
+            try:
+                result.value = await self._attempt(job, tokens)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                if not is_rate_limit_error(e):
+                    result.error = e
+                    return result
+                if not retriable or result.attempts > self.max_retries:
+                    result.error = e
+                    return result
+                delay = retry_after_seconds(e)
+                if delay is None:
+                    delay = min(self.backoff_max, self.backoff_base * 2 ** (result.attempts - 1))
+                await asyncio.sleep(delay)
+                continue
+            await self.concurrency.on_success()
+            return result
+
+    async def stream(
+        self,
+        jobs: Iterable[Job],
+        tokens: Iterable[int] | None = None
+    ) -> AsyncIterator[ScheduledResult]:
+        """
+        Run jobs concurrently and yield their results in completion order.
+
+        Args:
+            jobs: Jobs to run
+            tokens: Estimated tokens per job (same order as jobs)
+
+        Yields:
+            ScheduledResult per job; failures are captured in `error`
+        """
+        jobs = list(jobs)
+        token_list = list(tokens) if tokens is not None else [0] * len(jobs)
+        tasks = [
+            asyncio.create_task(self._run(index, job, token_list[index]))
+            for index, job in enumerate(jobs)
+        ]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def map(
+        self,
+        jobs: Iterable[Job],
+        tokens: Iterable[int] | None = None
+    ) -> list[ScheduledResult]:
+        """Run jobs concurrently and return their results in input order."""
+        results = [result async for result in self.stream(jobs, tokens)]
+        return sorted(results, key=lambda result: result.index)
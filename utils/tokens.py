@@ -0,0 +1,78 @@
+"""
+Local token counting.
+
+Uses tiktoken when it is installed and its encoding can be loaded (the
+encoding file is downloaded on first use); otherwise falls back to a fast
+estimate that counts each CJK character as one token and every ~4 other
+characters as one token, which is close enough for budgeting prompts.
+"""
+
+import re
+
+try:
+    import tiktoken
+except ImportError:  # optional dependency
+    tiktoken = None
+
+from utils.logger import get_agent_logger
+
+logger = get_agent_logger()
+
+_CJK_RE = re.compile(r"[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uf900-\ufaff\uff00-\uffef]")
+# Sentinel cached when tiktoken is missing or its encoding cannot be loaded
+_UNAVAILABLE = object()
+_encoding = None
+
+
+def _get_encoding():
+    global _encoding
+    if _encoding is None:
+        _encoding = _UNAVAILABLE
+        if tiktoken is not None:
+            try:
+                _encoding = tiktoken.get_encoding("cl100k_base")
+            except Exception as e:
+                # e.g. no network access to download the encoding file
+                logger.warning("Could not load tiktoken encoding, using token estimates: %r", e)
+    return None if _encoding is _UNAVAILABLE else _encoding
+
+
+def count_tokens(text: str) -> int:
+    """
+    Count (or estimate) the number of tokens in a text.
+
+    Args:
+        text: Input text
+
+    Returns:
+        Token count
+    """
+    if not text:
+        return 0
+    encoding = _get_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    cjk = len(_CJK_RE.findall(text))
+    return cjk + (len(text) - cjk + 3) // 4
+
+
+def truncate_to_tokens(text: str, max_tokens: int, marker: str = "\n...[truncated]") -> str:
+    """
+    Truncate a text so that it fits in roughly max_tokens tokens.
+
+    Args:
+        text: Input text
+        max_tokens: Token budget
+        marker: Appended when the text is cut
+
+    Returns:
+        The original text if it fits, otherwise a truncated copy ending with marker
+    """
+    total = count_tokens(text)
+    if total <= max_tokens:
+        return text
+    # Scale by the observed chars/token ratio, then trim until it fits
+    keep = max(0, int(len(text) * max_tokens / total))
+    while keep > 0 and count_tokens(text[:keep]) > max_tokens:
+        keep = int(keep * 0.9)
+    return text[:keep] + marker